@@ -2,6 +2,7 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "python-dotenv",
 # ]
 # ///
@@ -45,8 +46,11 @@ import os
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from urllib import request
-from urllib.error import URLError, HTTPError
+
+from utils import json_codec
+from utils.discord_webhook import DiscordWebhook
+from utils.notifications import format_event, report_to_breaker
+from utils.outbox import Outbox, batch_progress, payload_digest
 
 try:
     from dotenv import load_dotenv
@@ -54,6 +58,15 @@ try:
 except ImportError:
     pass  # dotenv is optional
 
+# Discord rejects embed descriptions longer than this
+DISCORD_DESCRIPTION_LIMIT = 4096
+
+# Without a coalescing window, whatever is pending is still sent in one message
+PENDING_BATCH_KEY = 'pending'
+
+# Webhook client per URL, reused by the delivery worker
+_webhooks = {}
+
 
 def format_notification_message(input_data: dict, emoji: str = None) -> tuple[str, str]:
     """
@@ -66,45 +79,50 @@ def format_notification_message(input_data: dict, emoji: str = None) -> tuple[st
     Returns:
         tuple[str, str]: (title, message)
     """
-    hook_event = input_data.get('hook_event_name', 'Unknown')
-
-    # Default emoji mapping
-    emoji_map = {
-        'Notification': '🔔',
-        'Stop': '✅',
-        'SubagentStop': '🤖',
-        'SessionStart': '🚀',
-        'SessionEnd': '🛑',
-        'PreCompact': '📦',
-    }
-    icon = emoji or emoji_map.get(hook_event, '📬')
+    return format_event(input_data, emoji)
 
-    if hook_event == 'Notification':
-        message = input_data.get('message', 'Claude Code notification')
-        return (f"{icon} Claude Code", message)
 
-    elif hook_event == 'Stop':
-        return (f"{icon} Task Completed", "Claude Code has finished responding")
+def build_embed(title: str, message: str, color: int = 5814783, timestamp: str = None) -> dict:
+    """
+    Build a Discord embed for one notification.
 
-    elif hook_event == 'SubagentStop':
-        description = input_data.get('description', 'Subagent task')
-        return (f"{icon} Subagent Complete", description)
+    Args:
+        title: Notification title
+        message: Notification message
+        color: Embed color (default: blue 5814783)
+        timestamp: ISO 8601 event time shown on the embed (default: now)
 
-    elif hook_event == 'SessionStart':
-        source = input_data.get('source', 'unknown')
-        return (f"{icon} Session Started", f"Claude Code session started ({source})")
+    Returns:
+        dict: Discord embed object
+    """
+    if len(message) > DISCORD_DESCRIPTION_LIMIT:
+        message = message[:DISCORD_DESCRIPTION_LIMIT - 3] + "..."
+    return {
+        "title": title,
+        "description": message,
+        "color": color,
+        "timestamp": timestamp or datetime.now(timezone.utc).isoformat(),
+        "footer": {
+            "text": "Claude Code"
+        }
+    }
 
-    elif hook_event == 'SessionEnd':
-        reason = input_data.get('reason', 'unknown')
-        return (f"{icon} Session Ended", f"Claude Code session ended ({reason})")
 
-    else:
-        # Fallback for unknown event types
-        message = input_data.get('message', f'Event: {hook_event}')
-        return (f"{icon} Claude Code", message)
+def get_webhook(webhook_url: str) -> DiscordWebhook:
+    """Return the webhook client for a URL, reused across sends in the worker."""
+    webhook = _webhooks.get(webhook_url)
+    if webhook is None:
+        webhook = _webhooks[webhook_url] = DiscordWebhook(webhook_url)
+    return webhook
 
 
-def send_discord_notification(webhook_url: str, title: str, message: str, color: int = 5814783) -> bool:
+def send_discord_notification(
+    webhook_url: str,
+    title: str,
+    message: str,
+    color: int = 5814783,
+    timestamp: str = None
+) -> tuple[bool, float | None]:
     """
     Send notification to Discord via webhook.
 
@@ -113,52 +131,113 @@ def send_discord_notification(webhook_url: str, title: str, message: str, color:
         title: Notification title
         message: Notification message
         color: Embed color (default: blue 5814783)
+        timestamp: ISO 8601 event time shown on the embed (default: now)
 
     Returns:
-        bool: True if sent successfully, False otherwise
+        tuple[bool, float | None]: (sent successfully, Retry-After seconds if rate limited)
     """
     try:
-        # Create Discord embed payload
-        payload = {
-            "embeds": [{
-                "title": title,
-                "description": message,
-                "color": color,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "footer": {
-                    "text": "Claude Code"
-                }
-            }]
-        }
+        return get_webhook(webhook_url).send_embeds([build_embed(title, message, color, timestamp)])
+    except Exception as e:
+        print(f"Error sending Discord notification: {e}", file=sys.stderr)
+        return False, None
 
-        # Send HTTP POST request
-        # Discord requires User-Agent header to prevent blocking
-        req = request.Request(
-            webhook_url,
-            data=json.dumps(payload).encode('utf-8'),
-            headers={
-                'Content-Type': 'application/json',
-                'User-Agent': 'ClaudeCode-DiscordNotifier/1.0'
-            },
-            method='POST'
-        )
 
-        with request.urlopen(req, timeout=5) as response:
-            if response.status == 204:  # Discord returns 204 No Content on success
-                return True
-            else:
-                print(f"Discord API returned status {response.status}", file=sys.stderr)
-                return False
-
-    except HTTPError as e:
-        print(f"Discord webhook HTTP error: {e.code} - {e.reason}", file=sys.stderr)
-        return False
-    except URLError as e:
-        print(f"Discord webhook URL error: {e.reason}", file=sys.stderr)
-        return False
+def deliver_queued_notification(payload: dict) -> tuple[bool, float | None]:
+    """
+    Deliver one notification from the outbox (runs in the background worker).
+
+    Args:
+        payload: Queued notification (title, message, color, timestamp, input_data)
+
+    Returns:
+        tuple[bool, float | None]: (sent successfully, Retry-After seconds if rate limited)
+    """
+    webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
+    if not webhook_url:
+        return False, None
+
+    sent, retry_after = send_discord_notification(
+        webhook_url,
+        payload['title'],
+        payload['message'],
+        payload.get('color', 5814783),
+        payload.get('timestamp')
+    )
+    if sent:
+        log_notification(payload['input_data'], payload['title'], payload['message'], True, webhook_url)
+    return sent, retry_after
+
+
+def deliver_queued_batch(payloads: list[dict]) -> tuple[bool, float | None]:
+    """
+    Deliver pending notifications together, one embed each, up to 10 per message.
+
+    Args:
+        payloads: Queued notifications in the order they were raised
+
+    Returns:
+        tuple[bool, float | None]: (sent successfully, Retry-After seconds if rate limited)
+    """
+    webhook_url = os.getenv('DISCORD_WEBHOOK_URL')
+    if not webhook_url:
+        return False, None
+
+    embeds = [
+        build_embed(
+            payload['title'],
+            payload['message'],
+            payload.get('color', 5814783),
+            payload.get('timestamp')
+        )
+        for payload in payloads
+    ]
+    try:
+        # A retry skips messages already delivered, unless the group has changed since
+        sent, retry_after = get_webhook(webhook_url).send_embeds(embeds, progress=batch_progress(payloads, embeds))
     except Exception as e:
         print(f"Error sending Discord notification: {e}", file=sys.stderr)
-        return False
+        return False, None
+
+    if sent:
+        for payload in payloads:
+            log_notification(payload['input_data'], payload['title'], payload['message'], True, webhook_url)
+    return sent, retry_after
+
+
+def queue_notification(
+    input_data: dict,
+    title: str,
+    message: str,
+    color: int = 5814783,
+    coalesce_window: float = 0.0
+) -> None:
+    """
+    Queue a notification for the background worker and make sure one is running.
+
+    Args:
+        input_data: Hook input data from stdin
+        title: Notification title
+        message: Notification message
+        color: Embed color
+        coalesce_window: Seconds to collect events of the same session into one message
+    """
+    outbox = Outbox('discord')
+    session_id = input_data.get('session_id', '')
+    outbox.enqueue({
+        'title': title,
+        'message': message,
+        'color': color,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'input_data': {
+            'hook_event_name': input_data.get('hook_event_name', 'Unknown'),
+            'session_id': session_id,
+        },
+    }, coalesce_key=session_id if coalesce_window > 0 else PENDING_BATCH_KEY,
+        coalesce_window=coalesce_window,
+        dedupe_key=payload_digest([session_id, title, message]),
+        session_id=session_id)
+    outbox.spawn_worker([sys.executable, str(Path(__file__).resolve()), '--drain-outbox'])
 
 
 def log_notification(
@@ -188,8 +267,8 @@ def log_notification(
         # Read existing log or initialize empty array
         if log_file.exists():
             try:
-                with open(log_file, 'r') as f:
-                    log_data = json.load(f)
+                with open(log_file, 'rb') as f:
+                    log_data = json_codec.load(f)
                     if not isinstance(log_data, list):
                         log_data = []
             except (json.JSONDecodeError, ValueError):
@@ -214,8 +293,8 @@ def log_notification(
         # Append and write back
         log_data.append(entry)
 
-        with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        with open(log_file, 'wb') as f:
+            json_codec.dump(log_data, f, indent=True)
 
     except Exception as e:
         # Don't block on logging errors
@@ -249,11 +328,34 @@ def main():
             action='store_true',
             help='Disable notifications (log only)'
         )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Send inline instead of queueing for the background worker'
+        )
+        parser.add_argument(
+            '--coalesce-window',
+            type=float,
+            default=float(os.getenv('NOTIFY_COALESCE_WINDOW', '2.0')),
+            help='Seconds to collect events of one session into a single message, 0 to disable (default: 2.0)'
+        )
+        parser.add_argument(
+            '--drain-outbox',
+            action='store_true',
+            help=argparse.SUPPRESS  # Internal: run the background delivery worker
+        )
 
         args = parser.parse_args()
 
+        if args.drain_outbox:
+            Outbox('discord').run_worker(
+                report_to_breaker('discord', deliver_queued_notification),
+                report_to_breaker('discord', deliver_queued_batch)
+            )
+            sys.exit(0)
+
         # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = json_codec.load(sys.stdin.buffer)
 
         # Check if disabled via flag or environment variable
         if args.disable or os.getenv('DISCORD_NOTIFICATIONS_ENABLED', 'true').lower() == 'false':
@@ -268,16 +370,17 @@ def main():
         # Format notification message
         title, message = format_notification_message(input_data, args.emoji)
 
-        # Send notification (unless dry-run)
-        sent = False
-        if not args.dry_run:
-            sent = send_discord_notification(webhook_url, title, message, args.color)
-        else:
+        if args.dry_run:
             print(f"[DRY RUN] Title: {title} | Message: {message}", file=sys.stderr)
-            sent = True  # Mark as sent for logging purposes
-
-        # Log the notification
-        log_notification(input_data, title, message, sent, webhook_url)
+            log_notification(input_data, title, message, True, webhook_url)
+        elif args.sync:
+            sent, _ = send_discord_notification(webhook_url, title, message, args.color)
+            log_notification(input_data, title, message, sent, webhook_url)
+        else:
+            # Queue for the background worker so a slow webhook never delays Claude Code;
+            # the worker logs the notification once it is delivered. Events of the
+            # same session arriving within the window share one webhook message
+            queue_notification(input_data, title, message, args.color, args.coalesce_window)
 
         # Always exit successfully to prevent blocking Claude Code
         sys.exit(0)
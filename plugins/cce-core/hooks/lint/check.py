@@ -10,9 +10,18 @@ import subprocess
 import shutil
 from pathlib import Path
 
+# Paths of linters found in PATH by this run; missing ones are looked up
+# again, so a linter installed meanwhile is picked up
+_tools = {}
+
 def check_command_exists(command):
     """Check if a command exists in PATH."""
-    return shutil.which(command) is not None
+    if command not in _tools:
+        path = shutil.which(command)
+        if path is None:
+            return False
+        _tools[command] = path
+    return True
 
 def run_linter(linter_cmd, file_path, linter_name):
     """Run a linter command and report results."""
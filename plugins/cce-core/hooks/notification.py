@@ -2,6 +2,7 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "python-dotenv",
 # ]
 # ///
@@ -10,10 +11,13 @@ import argparse
 import json
 import os
 import sys
-import subprocess
 import random
 from pathlib import Path
 
+from utils import json_codec
+from utils.coalesce import claim_announcement
+from utils.speech import speak
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -50,6 +54,23 @@ def get_tts_script_path():
     return None
 
 
+def get_notification_message():
+    """Return the spoken notification, addressing ENGINEER_NAME 30% of the time."""
+    engineer_name = os.getenv('ENGINEER_NAME', '').strip()
+    if engineer_name and random.random() < 0.3:
+        return f"{engineer_name}, your agent needs your input"
+    return "Your agent needs your input"
+
+
+def get_notification_messages():
+    """Return every variant of the spoken notification (for pre-warming the audio cache)."""
+    engineer_name = os.getenv('ENGINEER_NAME', '').strip()
+    messages = ["Your agent needs your input"]
+    if engineer_name:
+        messages.append(f"{engineer_name}, your agent needs your input")
+    return messages
+
+
 def announce_notification():
     """Announce that the agent needs user input."""
     try:
@@ -57,26 +78,11 @@ def announce_notification():
         if not tts_script:
             return  # No TTS scripts available
         
-        # Get engineer name if available
-        engineer_name = os.getenv('ENGINEER_NAME', '').strip()
-        
-        # Create notification message with 30% chance to include name
-        if engineer_name and random.random() < 0.3:
-            notification_message = f"{engineer_name}, your agent needs your input"
-        else:
-            notification_message = "Your agent needs your input"
+        notification_message = get_notification_message()
         
-        # Call the TTS script with the notification message
-        subprocess.run([
-            "uv", "run", tts_script, notification_message
-        ], 
-        capture_output=True,  # Suppress output
-        timeout=10  # 10-second timeout
-        )
+        # Queue the message for the background player and return
+        speak(notification_message, tts_script)
         
-    except (subprocess.TimeoutExpired, subprocess.SubprocessError, FileNotFoundError):
-        # Fail silently if TTS encounters issues
-        pass
     except Exception:
         # Fail silently for any other errors
         pass
@@ -91,7 +97,7 @@ def main():
         args = parser.parse_args()
         
         # Read JSON input from stdin
-        input_data = json.loads(sys.stdin.read())
+        input_data = json_codec.load(sys.stdin.buffer)
         
         # Ensure log directory exists
         import os
@@ -101,9 +107,9 @@ def main():
         
         # Read existing log data or initialize empty list
         if os.path.exists(log_file):
-            with open(log_file, 'r') as f:
+            with open(log_file, 'rb') as f:
                 try:
-                    log_data = json.load(f)
+                    log_data = json_codec.load(f)
                 except (json.JSONDecodeError, ValueError):
                     log_data = []
         else:
@@ -113,12 +119,17 @@ def main():
         log_data.append(input_data)
         
         # Write back to file with formatting
-        with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        with open(log_file, 'wb') as f:
+            json_codec.dump(log_data, f, indent=True)
         
         # Announce notification via TTS only if --notify flag is set
-        # Skip TTS for the generic "Claude is waiting for your input" message
-        if args.notify and input_data.get('message') != 'Claude is waiting for your input':
+        # Skip TTS for the generic "Claude is waiting for your input" message,
+        # and for repeats within the same burst of events
+        if (
+            args.notify
+            and input_data.get('message') != 'Claude is waiting for your input'
+            and claim_announcement(input_data.get('session_id', ''))
+        ):
             announce_notification()
         
         sys.exit(0)
@@ -0,0 +1,338 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "orjson",
+#     "slack_sdk",
+#     "python-dotenv",
+# ]
+# ///
+
+"""
+Notification Engine Hook for Claude Code
+
+Formats a hook event once and delivers it to every enabled channel (Slack,
+Discord, OSC terminal notifications, TTS) concurrently, replacing a chain of
+per-channel hooks that each re-read and re-format the event in series.
+
+Slack and Discord are queued for their background delivery workers (see
+slack_notification.py / discord_notification.py), which retry, coalesce and
+log. TTS utterances are queued for the background player (see
+utils/speech.py). The hook itself only waits for these local queue writes;
+the workers report delivery failures to the channel's circuit breaker (see
+utils/notifications.py), and while it is open the hook skips the channel.
+OSC is written inline, bounded by its timeout and breaker.
+
+Environment Variables:
+    NOTIFY_CHANNELS: Comma-separated default channels (default: discord,tts, the
+        channels the Notification hooks used before; add slack or osc to opt in)
+    NOTIFY_TIMEOUT_<CHANNEL>: Seconds the hook waits for a channel's inline work or
+        queue write (e.g. NOTIFY_TIMEOUT_OSC=2)
+    NOTIFY_COALESCE_WINDOW: Digest window for Slack/Discord in seconds (default: 2.0)
+    Plus each channel's own configuration (SLACK_BOT_TOKEN, DISCORD_WEBHOOK_URL, ...);
+    unconfigured channels are skipped.
+
+Usage:
+    # In ${CLAUDE_PLUGIN_ROOT}/hooks/hooks.json:
+    {
+      "hooks": {
+        "Notification": [{
+          "hooks": [{"type": "command", "command": "uv run ${CLAUDE_PLUGIN_ROOT}/hooks/notify.py"}]
+        }],
+        "Stop": [{
+          "hooks": [{"type": "command", "command": "uv run ${CLAUDE_PLUGIN_ROOT}/hooks/notify.py --channels discord"}]
+        }]
+      }
+    }
+
+Testing:
+    echo '{"hook_event_name":"Notification","message":"Test","session_id":"test"}' | \\
+      uv run ${CLAUDE_PLUGIN_ROOT}/hooks/notify.py --dry-run
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from utils import json_codec
+from utils.coalesce import claim_announcement
+from utils.notifications import Channel, notify, run_in_thread
+from utils.speech import speak
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # dotenv is optional
+
+DEFAULT_CHANNELS = 'discord,tts'
+
+
+class SlackChannel(Channel):
+    """Queue a Slack DM for the Slack delivery worker."""
+
+    name = 'slack'
+    timeout = 2.0
+    queued = True
+
+    def __init__(self, flush_timeout: float, coalesce_window: float):
+        self.flush_timeout = flush_timeout
+        self.coalesce_window = coalesce_window
+
+    def enabled(self) -> bool:
+        if not (os.getenv('SLACK_BOT_TOKEN') and os.getenv('SLACK_USER_ID')):
+            return False
+        try:
+            import slack_notification
+        except ImportError:
+            return False
+        return slack_notification.WebClient is not None
+
+    async def send(self, event: dict) -> None:
+        import slack_notification
+        await run_in_thread(
+            slack_notification.queue_notification,
+            event['input_data'],
+            event['emoji'],
+            self.flush_timeout,
+            self.coalesce_window
+        )
+
+
+class DiscordChannel(Channel):
+    """Queue a Discord embed for the Discord delivery worker."""
+
+    name = 'discord'
+    timeout = 2.0
+    queued = True
+
+    def __init__(self, color: int, coalesce_window: float):
+        self.color = color
+        self.coalesce_window = coalesce_window
+
+    def enabled(self) -> bool:
+        if os.getenv('DISCORD_NOTIFICATIONS_ENABLED', 'true').lower() == 'false':
+            return False
+        if not os.getenv('DISCORD_WEBHOOK_URL'):
+            return False
+        try:
+            import discord_notification  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    async def send(self, event: dict) -> None:
+        import discord_notification
+        await run_in_thread(
+            discord_notification.queue_notification,
+            event['input_data'],
+            event['title'],
+            event['message'],
+            self.color,
+            self.coalesce_window
+        )
+
+
+class OscChannel(Channel):
+    """Terminal notification via OSC escape sequences."""
+
+    name = 'osc'
+    timeout = 1.0
+
+    def enabled(self) -> bool:
+        if os.getenv('OSC_NOTIFICATIONS_ENABLED', 'true').lower() == 'false':
+            return False
+        try:
+            import ssh_osc777_notification  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    async def send(self, event: dict) -> None:
+        import ssh_osc777_notification
+        sent = await run_in_thread(
+            ssh_osc777_notification.send_osc_notification,
+            event['title'],
+            event['message'],
+            event['input_data'].get('session_id', '')
+        )
+        if not sent:
+            raise RuntimeError('OSC write failed')
+
+
+class TtsChannel(Channel):
+    """Spoken announcement through the best available TTS script."""
+
+    name = 'tts'
+    timeout = 2.0
+    queued = True
+
+    def enabled(self) -> bool:
+        try:
+            import notification
+        except ImportError:
+            return False
+        return notification.get_tts_script_path() is not None
+
+    def announcement(self, input_data: dict) -> str | None:
+        """Return the text to speak, or None to stay quiet."""
+        import notification
+        hook_event = input_data.get('hook_event_name', '')
+        if hook_event == 'Notification':
+            # Skip TTS for the generic "Claude is waiting for your input" message
+            if input_data.get('message') == 'Claude is waiting for your input':
+                return None
+            text = notification.get_notification_message()
+        elif hook_event == 'Stop':
+            text = "Task complete"
+        elif hook_event == 'SubagentStop':
+            text = "Subagent complete"
+        else:
+            return None
+
+        # Only the first announcement of a burst is spoken; Stop always is
+        if not claim_announcement(input_data.get('session_id', ''), force=hook_event == 'Stop'):
+            return None
+        return text
+
+    async def send(self, event: dict) -> None:
+        import notification
+        text = self.announcement(event['input_data'])
+        if not text:
+            return
+
+        # Queued for the background player; playback does not hold up the hook
+        if not await run_in_thread(speak, text, notification.get_tts_script_path()):
+            raise RuntimeError("TTS queue unavailable")
+
+
+def build_channels(names: list[str], args) -> list[Channel]:
+    """Instantiate the requested channel backends."""
+    factories = {
+        'slack': lambda: SlackChannel(args.flush_timeout, args.coalesce_window),
+        'discord': lambda: DiscordChannel(args.color, args.coalesce_window),
+        'osc': OscChannel,
+        'tts': TtsChannel,
+    }
+    channels = []
+    for name in names:
+        factory = factories.get(name)
+        if factory is None:
+            print(f"Warning: unknown notification channel '{name}'", file=sys.stderr)
+            continue
+        channels.append(factory())
+    return channels
+
+
+def log_notification(input_data: dict, results: dict) -> None:
+    """
+    Log the delivery status per channel to logs/notify.json.
+
+    Args:
+        input_data: Hook input data from stdin
+        results: Delivery status per channel name
+    """
+    try:
+        log_dir = Path('logs')
+        log_dir.mkdir(exist_ok=True)
+        log_file = log_dir / 'notify.json'
+
+        if log_file.exists():
+            try:
+                with open(log_file, 'rb') as f:
+                    log_data = json_codec.load(f)
+                    if not isinstance(log_data, list):
+                        log_data = []
+            except (json.JSONDecodeError, ValueError):
+                log_data = []
+        else:
+            log_data = []
+
+        log_data.append({
+            'hook_event': input_data.get('hook_event_name', 'Unknown'),
+            'session_id': input_data.get('session_id', ''),
+            'channels': results,
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        })
+
+        with open(log_file, 'wb') as f:
+            json_codec.dump(log_data, f, indent=True)
+
+    except Exception as e:
+        # Don't block on logging errors
+        print(f"Warning: Failed to log notification: {e}", file=sys.stderr)
+
+
+def main():
+    """Main hook execution logic."""
+    try:
+        parser = argparse.ArgumentParser(
+            description='Deliver Claude Code events to all notification channels concurrently'
+        )
+        parser.add_argument(
+            '--channels',
+            default=os.getenv('NOTIFY_CHANNELS', DEFAULT_CHANNELS),
+            help=f'Comma-separated channels: slack, discord, osc, tts (default: {DEFAULT_CHANNELS})'
+        )
+        parser.add_argument(
+            '--emoji',
+            help='Custom emoji to use for this event (overrides default)'
+        )
+        parser.add_argument(
+            '--color',
+            type=int,
+            default=5814783,
+            help='Discord embed color (default: 5814783 = blue)'
+        )
+        parser.add_argument(
+            '--flush-timeout',
+            type=float,
+            default=0.6,
+            help='Seconds Slack waits for the final assistant entry to reach the transcript (default: 0.6)'
+        )
+        parser.add_argument(
+            '--coalesce-window',
+            type=float,
+            default=float(os.getenv('NOTIFY_COALESCE_WINDOW', '2.0')),
+            help='Seconds to collect Slack/Discord events of one session into a digest (default: 2.0)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Log only, do not deliver'
+        )
+        args = parser.parse_args()
+
+        # Read JSON input from stdin
+        input_data = json_codec.load(sys.stdin.buffer)
+
+        names = [name.strip() for name in args.channels.split(',') if name.strip()]
+        channels = build_channels(names, args)
+
+        if args.dry_run:
+            results = {
+                channel.name: 'dry run' if channel.enabled() else 'disabled'
+                for channel in channels
+            }
+            print(f"[DRY RUN] {results}", file=sys.stderr)
+        else:
+            results = notify(input_data, channels, args.emoji)
+
+        log_notification(input_data, results)
+
+        # Always exit successfully to prevent blocking Claude Code
+        sys.exit(0)
+
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON input - {e}", file=sys.stderr)
+        sys.exit(0)
+    except Exception as e:
+        print(f"Unexpected error in notification engine: {e}", file=sys.stderr)
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,21 @@
 #!/usr/bin/env -S uv run --script
 # /// script
-# requires-python = ">=3.8"
+# requires-python = ">=3.11"
+# dependencies = [
+#     "orjson",
+# ]
 # ///
 
 import json
 import sys
 from pathlib import Path
 
+from utils import json_codec
+
 def main():
     try:
         # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = json_codec.load(sys.stdin.buffer)
         
         # Ensure log directory exists
         log_dir = Path.cwd() / 'logs'
@@ -19,9 +24,9 @@ def main():
         
         # Read existing log data or initialize empty list
         if log_path.exists():
-            with open(log_path, 'r') as f:
+            with open(log_path, 'rb') as f:
                 try:
-                    log_data = json.load(f)
+                    log_data = json_codec.load(f)
                 except (json.JSONDecodeError, ValueError):
                     log_data = []
         else:
@@ -31,8 +36,8 @@ def main():
         log_data.append(input_data)
         
         # Write back to file with formatting
-        with open(log_path, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        with open(log_path, 'wb') as f:
+            json_codec.dump(log_data, f, indent=True)
         
         sys.exit(0)
         
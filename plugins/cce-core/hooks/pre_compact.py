@@ -2,16 +2,18 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "python-dotenv",
 # ]
 # ///
 
 import argparse
 import json
-import os
 import sys
 from pathlib import Path
-from datetime import datetime
+
+from utils import json_codec
+from utils.transcript_backups import backup_transcript, prune_backups
 
 try:
     from dotenv import load_dotenv
@@ -29,9 +31,9 @@ def log_pre_compact(input_data):
     
     # Read existing log data or initialize empty list
     if log_file.exists():
-        with open(log_file, 'r') as f:
+        with open(log_file, 'rb') as f:
             try:
-                log_data = json.load(f)
+                log_data = json_codec.load(f)
             except (json.JSONDecodeError, ValueError):
                 log_data = []
     else:
@@ -41,33 +43,8 @@ def log_pre_compact(input_data):
     log_data.append(input_data)
     
     # Write back to file with formatting
-    with open(log_file, 'w') as f:
-        json.dump(log_data, f, indent=2)
-
-
-def backup_transcript(transcript_path, trigger):
-    """Create a backup of the transcript before compaction."""
-    try:
-        if not os.path.exists(transcript_path):
-            return
-        
-        # Create backup directory
-        backup_dir = Path("logs") / "transcript_backups"
-        backup_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Generate backup filename with timestamp and trigger type
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        session_name = Path(transcript_path).stem
-        backup_name = f"{session_name}_pre_compact_{trigger}_{timestamp}.jsonl"
-        backup_path = backup_dir / backup_name
-        
-        # Copy transcript to backup
-        import shutil
-        shutil.copy2(transcript_path, backup_path)
-        
-        return str(backup_path)
-    except Exception:
-        return None
+    with open(log_file, 'wb') as f:
+        json_codec.dump(log_data, f, indent=True)
 
 
 def main():
@@ -78,10 +55,14 @@ def main():
                           help='Create backup of transcript before compaction')
         parser.add_argument('--verbose', action='store_true',
                           help='Print verbose output')
+        parser.add_argument('--keep-days', type=float, default=30,
+                          help='Remove transcript backups older than this many days (default: 30)')
+        parser.add_argument('--max-snapshots', type=int, default=None,
+                          help='Maximum transcript snapshots kept per session')
         args = parser.parse_args()
         
         # Read JSON input from stdin
-        input_data = json.loads(sys.stdin.read())
+        input_data = json_codec.load(sys.stdin.buffer)
         
         # Extract fields
         session_id = input_data.get('session_id', 'unknown')
@@ -95,7 +76,16 @@ def main():
         # Create backup if requested
         backup_path = None
         if args.backup and transcript_path:
-            backup_path = backup_transcript(transcript_path, trigger)
+            try:
+                snapshot = backup_transcript(transcript_path, trigger)
+                if snapshot:
+                    backup_path = (
+                        f"logs/transcript_backups/{snapshot['session']} "
+                        f"(snapshot {snapshot['id']})"
+                    )
+                prune_backups(keep_days=args.keep_days, max_snapshots=args.max_snapshots)
+            except Exception:
+                pass  # Never block compaction on backup errors
         
         # Provide feedback based on trigger type
         if args.verbose:
@@ -1,6 +1,6 @@
 #!/usr/bin/env -S uv run --script
 # /// script
-# requires-python = ">=3.8"
+# requires-python = ">=3.11"
 # ///
 
 import json
@@ -8,6 +8,8 @@ import sys
 import re
 from pathlib import Path
 
+from utils import json_codec
+
 def is_dangerous_rm_command(command):
     """
     Comprehensive detection of dangerous rm commands.
@@ -84,7 +86,7 @@ def is_env_file_access(tool_name, tool_input):
 def main():
     try:
         # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = json_codec.load(sys.stdin.buffer)
         
         tool_name = input_data.get('tool_name', '')
         tool_input = input_data.get('tool_input', {})
@@ -111,9 +113,9 @@ def main():
         
         # Read existing log data or initialize empty list
         if log_path.exists():
-            with open(log_path, 'r') as f:
+            with open(log_path, 'rb') as f:
                 try:
-                    log_data = json.load(f)
+                    log_data = json_codec.load(f)
                 except (json.JSONDecodeError, ValueError):
                     log_data = []
         else:
@@ -123,8 +125,8 @@ def main():
         log_data.append(input_data)
         
         # Write back to file with formatting
-        with open(log_path, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        with open(log_path, 'wb') as f:
+            json_codec.dump(log_data, f, indent=True)
         
         sys.exit(0)
         
@@ -2,23 +2,53 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "python-dotenv",
 # ]
 # ///
 
 import argparse
+import hashlib
 import json
+import os
+import shutil
 import sys
 import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+from utils import json_codec, session_state
+from utils.git_state import git_state
+from utils.speech import speak
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
 except ImportError:
     pass  # dotenv is optional
 
+SESSION_MESSAGES = {
+    "startup": "Claude Code session started",
+    "resume": "Resuming previous session",
+    "clear": "Starting fresh session"
+}
+
+ISSUES_CACHE = Path("logs") / ".cache" / "gh_issues.json"
+DEFAULT_ISSUES_TTL = 600
+ISSUES_REFRESH_TIMEOUT = 30
+
+# Project-specific files whose beginning is added to the session context
+CONTEXT_FILES = [
+    "${CLAUDE_PLUGIN_ROOT}/CONTEXT.md",
+    "${CLAUDE_PLUGIN_ROOT}/TODO.md",
+    "TODO.md",
+    ".github/ISSUE_TEMPLATE.md"
+]
+CONTEXT_FILE_CHARS = 1000
+CONTEXT_CACHE = Path("logs") / ".cache" / "context.json"
+
 
 def log_session_start(input_data):
     """Log session start event to logs directory."""
@@ -29,9 +59,9 @@ def log_session_start(input_data):
     
     # Read existing log data or initialize empty list
     if log_file.exists():
-        with open(log_file, 'r') as f:
+        with open(log_file, 'rb') as f:
             try:
-                log_data = json.load(f)
+                log_data = json_codec.load(f)
             except (json.JSONDecodeError, ValueError):
                 log_data = []
     else:
@@ -41,105 +71,272 @@ def log_session_start(input_data):
     log_data.append(input_data)
     
     # Write back to file with formatting
-    with open(log_file, 'w') as f:
-        json.dump(log_data, f, indent=2)
+    with open(log_file, 'wb') as f:
+        json_codec.dump(log_data, f, indent=True)
 
 
 def get_git_status():
-    """Get current git status information."""
+    """Get the current branch, uncommitted changes count and HEAD commit (see utils/git_state.py)."""
     try:
-        # Get current branch
-        branch_result = subprocess.run(
-            ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        current_branch = branch_result.stdout.strip() if branch_result.returncode == 0 else "unknown"
-        
-        # Get uncommitted changes count
-        status_result = subprocess.run(
-            ['git', 'status', '--porcelain'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if status_result.returncode == 0:
-            changes = status_result.stdout.strip().split('\n') if status_result.stdout.strip() else []
-            uncommitted_count = len(changes)
-        else:
-            uncommitted_count = 0
-        
-        return current_branch, uncommitted_count
+        state = git_state()
+        if state is None:
+            return None, None, None
+        return state['branch'] or "unknown", state['changed'], state['head']
     except Exception:
-        return None, None
+        return None, None, None
 
 
-def get_recent_issues():
-    """Get recent GitHub issues if gh CLI is available."""
+def issues_ttl():
+    """Seconds a cached `gh issue list` result is served before it is refreshed."""
+    try:
+        return float(os.getenv('GH_ISSUES_TTL', DEFAULT_ISSUES_TTL))
+    except ValueError:
+        return DEFAULT_ISSUES_TTL
+
+
+def fetch_recent_issues():
+    """Run `gh issue list` and cache its output (None if gh is unavailable, fails or finds none)."""
+    if not shutil.which('gh'):
+        return None
+    # Failures and timeouts are cached too, so a repo without GitHub issues
+    # (or an offline machine) does not wait for gh on every start
     try:
-        # Check if gh is available
-        gh_check = subprocess.run(['which', 'gh'], capture_output=True)
-        if gh_check.returncode != 0:
-            return None
-        
-        # Get recent open issues
         result = subprocess.run(
             ['gh', 'issue', 'list', '--limit', '5', '--state', 'open'],
             capture_output=True,
             text=True,
             timeout=10
         )
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip()
+        issues = (result.stdout.strip() or None) if result.returncode == 0 else None
     except Exception:
+        issues = None
+
+    try:
+        ISSUES_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = ISSUES_CACHE.parent / f".{ISSUES_CACHE.name}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'fetched': time.time(), 'issues': issues}, f)
+        os.replace(tmp_path, ISSUES_CACHE)
+    except OSError:
+        pass
+    return issues
+
+
+def spawn_issues_refresh():
+    """Refresh the issues cache in a background process (at most one at a time)."""
+    marker = ISSUES_CACHE.parent / '.gh_issues.refreshing'
+    try:
+        if time.time() - marker.stat().st_mtime < ISSUES_REFRESH_TIMEOUT:
+            return  # A refresh is already running
+    except FileNotFoundError:
+        pass
+    try:
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), '--refresh-issues'],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except OSError:
+        pass
+
+
+def get_recent_issues():
+    """
+    Get recent GitHub issues if gh CLI is available.
+
+    The `gh issue list` output is cached in logs/.cache/gh_issues.json for
+    GH_ISSUES_TTL seconds (default 600). A stale result is still returned
+    while a background process refreshes it; gh is only waited for when
+    there is no cached result at all.
+    """
+    try:
+        with open(ISSUES_CACHE, 'r') as f:
+            cached = json.load(f)
+        if time.time() - cached['fetched'] > issues_ttl():
+            spawn_issues_refresh()
+        return cached['issues']
+    except (OSError, ValueError, KeyError, TypeError):
+        return fetch_recent_issues()
+
+
+def read_head(file_path, limit=CONTEXT_FILE_CHARS):
+    """Read the first `limit` characters of a file, skipping leading whitespace."""
+    with open(file_path, 'r', errors='replace') as f:
+        content = f.read(limit).lstrip()
+        while len(content) < limit:
+            more = f.read(limit - len(content))
+            if not more:
+                return content.rstrip()  # Whole file read
+            content = (content + more).lstrip()
+    return content
+
+
+def context_files_key():
+    """Modification time and size of each context file (None for missing files)."""
+    key = []
+    for file_path in CONTEXT_FILES:
+        try:
+            stat = os.stat(file_path)
+            key.append([file_path, stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            key.append([file_path, None])
+    return key
+
+
+def load_cached_context(key):
+    """Return the cached context if it was built for the same key."""
+    try:
+        with open(CONTEXT_CACHE, 'r') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached['context']
+    except (OSError, ValueError, KeyError, AttributeError):
         pass
     return None
 
 
-def load_development_context(source):
-    """Load relevant development context based on session source."""
+def save_cached_context(key, context):
+    try:
+        CONTEXT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = CONTEXT_CACHE.parent / f".{CONTEXT_CACHE.name}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'key': key, 'context': context}, f)
+        os.replace(tmp_path, CONTEXT_CACHE)
+    except OSError:
+        pass
+
+
+def build_context(branch, changes, issues):
+    """Assemble the git, context file and issues sections of the session context."""
     context_parts = []
-    
-    # Add timestamp
-    context_parts.append(f"Session started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    context_parts.append(f"Session source: {source}")
-    
+
     # Add git information
-    branch, changes = get_git_status()
     if branch:
         context_parts.append(f"Git branch: {branch}")
         if changes > 0:
             context_parts.append(f"Uncommitted changes: {changes} files")
-    
+
     # Load project-specific context files if they exist
-    context_files = [
-        "${CLAUDE_PLUGIN_ROOT}/CONTEXT.md",
-        "${CLAUDE_PLUGIN_ROOT}/TODO.md",
-        "TODO.md",
-        ".github/ISSUE_TEMPLATE.md"
-    ]
-    
-    for file_path in context_files:
+    for file_path in CONTEXT_FILES:
         if Path(file_path).exists():
             try:
-                with open(file_path, 'r') as f:
-                    content = f.read().strip()
-                    if content:
-                        context_parts.append(f"\n--- Content from {file_path} ---")
-                        context_parts.append(content[:1000])  # Limit to first 1000 chars
+                content = read_head(file_path)  # Limit to first 1000 chars
+                if content:
+                    context_parts.append(f"\n--- Content from {file_path} ---")
+                    context_parts.append(content)
             except Exception:
                 pass
-    
+
     # Add recent issues if available
-    issues = get_recent_issues()
     if issues:
         context_parts.append("\n--- Recent GitHub Issues ---")
         context_parts.append(issues)
-    
+
     return "\n".join(context_parts)
 
 
+def load_development_context(source, session_id=''):
+    """
+    Load relevant development context based on session source.
+
+    Everything after the timestamp and source lines is cached in the
+    session state (a resumed session finds it there) and in
+    logs/.cache/context.json, and reused while the context files (by mtime
+    and size), git HEAD, branch, changes count and GitHub issues are unchanged.
+    """
+    context_parts = []
+
+    # Add timestamp
+    context_parts.append(f"Session started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    context_parts.append(f"Session source: {source}")
+
+    # Probe git and GitHub concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        git_status = executor.submit(get_git_status)
+        recent_issues = executor.submit(get_recent_issues)
+        branch, changes, head = git_status.result()
+        issues = recent_issues.result()
+
+    key = {
+        'files': context_files_key(),
+        'head': head,
+        'branch': branch,
+        'changes': changes,
+        'issues': hashlib.sha256((issues or '').encode('utf-8')).hexdigest(),
+    }
+    cached = session_state.load(session_id).get('context') or {}
+    context = cached.get('context') if cached.get('key') == key else None
+    if context is None:
+        context = load_cached_context(key)
+        if context is None:
+            context = build_context(branch, changes, issues)
+            save_cached_context(key, context)
+        session_state.update(session_id, context={'key': key, 'context': context})
+
+    if context:
+        context_parts.append(context)
+    return "\n".join(context_parts)
+
+
+def preload_llm():
+    """
+    Load the Ollama model in the background so the first completion message
+    of the session does not wait for it (see utils/llm/ollama.py).
+    """
+    if os.getenv('OLLAMA_PRELOAD', 'true').lower() == 'false':
+        return
+
+    ollama_script = Path(__file__).parent / "utils" / "llm" / "ollama.py"
+    if not ollama_script.exists():
+        return
+    try:
+        subprocess.Popen(
+            ["uv", "run", str(ollama_script), "--preload"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except OSError:
+        pass
+
+
+def prewarm_tts():
+    """
+    Render the hooks' fixed spoken messages into the TTS audio cache in the
+    background, so announcements play a cached clip (see utils/tts/audio_cache.py).
+    """
+    phrases = list(SESSION_MESSAGES.values()) + ["Session started"]
+    try:
+        import notification
+        import stop
+        import subagent_stop
+    except ImportError:
+        tts_script = Path(__file__).parent / "utils" / "tts" / "pyttsx3_tts.py"
+    else:
+        tts_script = notification.get_tts_script_path()
+        phrases += notification.get_notification_messages()
+        phrases += stop.get_completion_messages()
+        phrases += subagent_stop.get_completion_messages()
+
+    if not tts_script or not Path(tts_script).exists():
+        return
+    try:
+        subprocess.Popen(
+            ["uv", "run", str(tts_script), "--prewarm", *dict.fromkeys(phrases)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except OSError:
+        pass
+
+
 def main():
     try:
         # Parse command line arguments
@@ -148,20 +345,41 @@ def main():
                           help='Load development context at session start')
         parser.add_argument('--announce', action='store_true',
                           help='Announce session start via TTS')
+        parser.add_argument('--refresh-issues', action='store_true',
+                          help='Refresh the cached GitHub issues and exit')
         args = parser.parse_args()
+
+        if args.refresh_issues:
+            try:
+                fetch_recent_issues()
+            finally:
+                (ISSUES_CACHE.parent / '.gh_issues.refreshing').unlink(missing_ok=True)
+            sys.exit(0)
         
         # Read JSON input from stdin
-        input_data = json.loads(sys.stdin.read())
+        input_data = json_codec.load(sys.stdin.buffer)
 
         # Extract fields
         source = input_data.get('source', 'unknown')  # "startup", "resume", or "clear"
+        session_id = input_data.get('session_id', '')
         
         # Log the session start event
         log_session_start(input_data)
+
+        # Record the transcript path for the session's later hooks
+        session_state.record_transcript(session_id, input_data.get('transcript_path', ''))
+        state = session_state.load(session_id)
+
+        # Warm the local model and the TTS audio cache while the session starts
+        # (a resumed session's phrases were already rendered when it started)
+        preload_llm()
+        if not (source == 'resume' and state.get('tts_prewarmed')):
+            prewarm_tts()
+            session_state.update(session_id, tts_prewarmed=time.time())
         
         # Load development context if requested
         if args.load_context:
-            context = load_development_context(source)
+            context = load_development_context(source, session_id)
             if context:
                 # Using JSON output to add context
                 output = {
@@ -181,18 +399,10 @@ def main():
                 tts_script = script_dir / "utils" / "tts" / "pyttsx3_tts.py"
                 
                 if tts_script.exists():
-                    messages = {
-                        "startup": "Claude Code session started",
-                        "resume": "Resuming previous session",
-                        "clear": "Starting fresh session"
-                    }
-                    message = messages.get(source, "Session started")
+                    message = SESSION_MESSAGES.get(source, "Session started")
                     
-                    subprocess.run(
-                        ["uv", "run", str(tts_script), message],
-                        capture_output=True,
-                        timeout=5
-                    )
+                    # Queue the announcement for the background player
+                    speak(message, tts_script)
             except Exception:
                 pass
         
@@ -2,6 +2,7 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "slack_sdk",
 #     "python-dotenv",
 # ]
@@ -34,11 +35,16 @@ Usage:
 import argparse
 import json
 import os
-import re
 import sys
-import time
 from pathlib import Path
 
+from utils import json_codec
+from utils.mrkdwn import to_mrkdwn
+from utils.notifications import report_to_breaker
+from utils.outbox import Outbox, batch_progress
+from utils import session_state
+from utils.transcript import assistant_text, last_assistant_entry, wait_for_entry
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -49,86 +55,88 @@ try:
     from slack_sdk import WebClient
     from slack_sdk.errors import SlackApiError
 except ImportError:
-    # If slack_sdk is not available, log and exit gracefully
-    print("Error: slack_sdk not installed", file=sys.stderr)
-    sys.exit(0)
+    # Reported by main(); the notification engine skips the channel
+    WebClient = None
+
+    class SlackApiError(Exception):
+        pass
+
+# IM channel IDs (and per-session thread timestamps of sessions started
+# before they moved to the session state)
+THREADS_FILE = Path("logs") / ".slack-threads.json"
+MAX_THREADS = 500
+
+# Slack truncates message text beyond 40,000 characters and renders long
+# messages poorly; long responses are split into replies of this size
+SLACK_CHUNK_SIZE = 3900
+
+# WebClient per bot token, reused by the delivery worker
+_clients = {}
 
 
-def get_last_assistant_message(transcript_path: str, max_length: int = 3000, max_retries: int = 3) -> str:
+def get_last_assistant_message(
+    transcript_path: str,
+    max_length: int | None = None,
+    flush_timeout: float = 0.6,
+    session_id: str | None = None
+) -> str:
     """
     Extract the last assistant message from the transcript.
 
+    The offset of the last assistant entry is kept in the session state
+    (see utils/session_state.py), so later events of the session scan the
+    transcript from there instead of from the beginning.
+
     Args:
         transcript_path: Path to the JSONL transcript file
-        max_length: Maximum length of the message to return
-        max_retries: Number of times to retry reading (for timing issues)
+        max_length: Maximum length of the message to return (default: no limit;
+            long messages are sent in chunks)
+        flush_timeout: Seconds to wait for a final assistant entry still being written
+        session_id: Claude Code session ID, to use the session's recorded
+            transcript path and index
 
     Returns:
         The last assistant message text, or empty string if not found
     """
     try:
-        # Workaround: Claude Code sometimes passes stale transcript_path in resumed sessions
-        # Try to read the cached transcript path from SessionStart hook
-        cache_file = Path("logs") / ".current-transcript"
-        if cache_file.exists():
-            try:
-                cached_path = cache_file.read_text().strip()
-                if cached_path and os.path.exists(cached_path):
-                    transcript_path = cached_path
-            except Exception:
-                pass  # Fall back to provided path
+        # Workaround: Claude Code sometimes passes stale transcript_path in resumed sessions,
+        # so prefer the path recorded by the SessionStart hook
+        transcript_path = session_state.transcript_path(session_id, transcript_path)
 
-        if not os.path.exists(transcript_path):
+        if not transcript_path or not os.path.exists(transcript_path):
             return ""
 
-        last_message = ""
-        initial_message = ""
-
-        # Try multiple times with delays to handle transcript write timing
-        for attempt in range(max_retries):
-            with open(transcript_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    try:
-                        entry = json.loads(line)
-
-                        # Look for assistant messages (nested under 'message' key)
-                        message = entry.get('message', entry)
-                        if message.get('role') == 'assistant':
-                            # Extract text content from the content array
-                            content = message.get('content', [])
-                            if isinstance(content, list):
-                                # Concatenate all text blocks (skip thinking blocks)
-                                text_parts = []
-                                for block in content:
-                                    if isinstance(block, dict) and block.get('type') == 'text':
-                                        text_parts.append(block.get('text', ''))
-
-                                if text_parts:
-                                    last_message = '\n'.join(text_parts)
-                            elif isinstance(content, str):
-                                last_message = content
-
-                    except json.JSONDecodeError:
-                        continue
-
-            # Store the first attempt's result
-            if attempt == 0:
-                initial_message = last_message
-
-            # If message changed from previous attempt, we got a new one - use it
-            if last_message and last_message != initial_message:
-                break
-
-            # Wait a bit before retrying (except on last attempt)
-            if attempt < max_retries - 1:
-                time.sleep(0.3)
+        index = session_state.load(session_id).get('transcript_index') or {}
+        start = 0
+        if (
+            index.get('path') == transcript_path
+            and index.get('entry') is not None
+            and os.path.getsize(transcript_path) >= index.get('end', 0)
+        ):
+            start = index['entry']
+
+        last_message, entry_offset, offset = last_assistant_entry(transcript_path, start)
+        if last_message is None and start:
+            # The indexed entry is gone (transcript rewritten): scan everything
+            last_message, entry_offset, offset = last_assistant_entry(transcript_path)
+        last_message = last_message or ""
+        if session_id and entry_offset is not None:
+            session_state.update(session_id, transcript_index={
+                'path': transcript_path, 'entry': entry_offset, 'end': offset
+            })
+
+        # Claude Code may still be writing the final assistant entry when the
+        # hook fires; wait for it instead of sleeping a fixed amount
+        new_entries, _ = wait_for_entry(
+            transcript_path, offset, assistant_text, timeout=flush_timeout
+        )
+        for entry in new_entries:
+            text = assistant_text(entry)
+            if text:
+                last_message = text
 
         # Truncate if too long
-        if len(last_message) > max_length:
+        if max_length is not None and len(last_message) > max_length:
             last_message = last_message[:max_length] + "\n\n... (message truncated)"
 
         return last_message
@@ -140,12 +148,11 @@ def get_last_assistant_message(transcript_path: str, max_length: int = 3000, max
 
 def convert_markdown_to_slack(text: str) -> str:
     """
-    Convert standard markdown to Slack's markdown format.
+    Convert standard markdown to Slack's mrkdwn format.
 
-    Slack uses different markdown syntax:
-    - *text* for bold (not **text**)
-    - _text_ for italic (not *text*)
-    - Code blocks and inline code are the same
+    See utils/mrkdwn.py: bold, italic, strikethrough, links, headers, lists
+    and tables are converted in a single pass, code is left untouched and
+    &, < and > are escaped.
 
     Args:
         text: Text with standard markdown
@@ -153,20 +160,17 @@ def convert_markdown_to_slack(text: str) -> str:
     Returns:
         Text with Slack-compatible markdown
     """
-    # Convert **text** to *text* (bold)
-    # Use a negative lookbehind/lookahead to avoid matching already single asterisks
-    text = re.sub(r'(?<!\*)\*\*(?!\*)(.+?)(?<!\*)\*\*(?!\*)', r'*\1*', text)
+    return to_mrkdwn(text)
 
-    return text
 
-
-def format_message(input_data: dict, event_emoji: str = None) -> str:
+def format_message(input_data: dict, event_emoji: str = None, flush_timeout: float = 0.6) -> str:
     """
     Format a Slack message based on hook event type.
 
     Args:
         input_data: Hook input data from stdin
         event_emoji: Optional emoji to use instead of default
+        flush_timeout: Seconds to wait for the transcript's final assistant entry
 
     Returns:
         Formatted message string
@@ -194,7 +198,9 @@ def format_message(input_data: dict, event_emoji: str = None) -> str:
     elif hook_event == 'Stop':
         # Include the last assistant response
         transcript_path = input_data.get('transcript_path', '')
-        last_response = get_last_assistant_message(transcript_path)
+        last_response = get_last_assistant_message(
+            transcript_path, flush_timeout=flush_timeout, session_id=input_data.get('session_id')
+        )
 
         if last_response:
             # Convert markdown to Slack format
@@ -206,7 +212,9 @@ def format_message(input_data: dict, event_emoji: str = None) -> str:
     elif hook_event == 'SubagentStop':
         # Include the last assistant response
         transcript_path = input_data.get('transcript_path', '')
-        last_response = get_last_assistant_message(transcript_path)
+        last_response = get_last_assistant_message(
+            transcript_path, flush_timeout=flush_timeout, session_id=input_data.get('session_id')
+        )
 
         description = input_data.get('description', 'Subagent task')
 
@@ -245,38 +253,282 @@ def format_message(input_data: dict, event_emoji: str = None) -> str:
         return f"{emoji} *Claude Code*\n{message}"
 
 
-def send_slack_message(token: str, user_id: str, message: str) -> bool:
+def load_threads() -> dict:
+    """Load the cached IM channel and per-session thread map."""
+    try:
+        with open(THREADS_FILE, 'rb') as f:
+            threads = json_codec.load(f)
+            if isinstance(threads, dict):
+                threads.setdefault('channels', {})
+                threads.setdefault('sessions', {})
+                return threads
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        pass
+    return {'channels': {}, 'sessions': {}}
+
+
+def save_threads(threads: dict) -> None:
+    """Atomically write the thread map, keeping only the newest sessions."""
+    sessions = threads['sessions']
+    if len(sessions) > MAX_THREADS:
+        # Insertion order is session start order
+        threads['sessions'] = dict(list(sessions.items())[-MAX_THREADS:])
+    THREADS_FILE.parent.mkdir(exist_ok=True)
+    tmp_file = THREADS_FILE.parent / f"{THREADS_FILE.name}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        json_codec.dump(threads, f)
+    os.replace(tmp_file, THREADS_FILE)
+
+
+def get_client(token: str):
+    """Return a WebClient for the token, reused across sends in the worker."""
+    client = _clients.get(token)
+    if client is None:
+        client = _clients[token] = WebClient(token=token)
+    return client
+
+
+def chunk_message(text: str, limit: int = SLACK_CHUNK_SIZE) -> list[str]:
+    """
+    Split a long message into chunks of at most `limit` characters.
+
+    Splits on line boundaries where possible. A code block cut in two is
+    closed at the end of one chunk and reopened at the start of the next, so
+    every chunk renders on its own.
+
+    Args:
+        text: Message text
+        limit: Maximum chunk length
+
+    Returns:
+        list[str]: Chunks in order (a single chunk for short messages)
+    """
+    if len(text) <= limit:
+        return [text]
+
+    # Leave room for the fences added around a split code block
+    budget = limit - 8
+    lines = []
+    for line in text.split('\n'):
+        # Hard-split lines that do not fit in a chunk on their own
+        while len(line) > budget:
+            lines.append(line[:budget])
+            line = line[budget:]
+        lines.append(line)
+
+    chunks = []
+    current, size, in_code = [], 0, False
+    for line in lines:
+        if current and size + len(line) + 1 > budget:
+            chunks.append('\n'.join(current) + ('\n```' if in_code else ''))
+            current, size = (['```'], 4) if in_code else ([], 0)
+        current.append(line)
+        size += len(line) + 1
+        if line.lstrip().startswith('```'):
+            in_code = not in_code
+
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def send_slack_message(
+    token: str,
+    user_id: str,
+    message: str,
+    session_id: str = None,
+    progress: dict = None
+) -> tuple[bool, float | None]:
     """
-    Send a direct message to a Slack user.
+    Send a direct message to a Slack user, threaded per session.
+
+    The first message of a session starts a thread in the user's DM and later
+    messages of the same session are posted as replies. The IM channel ID is
+    cached in logs/.slack-threads.json and each session's thread timestamp in
+    its session state (logs/sessions/<session_id>.json).
+    Long messages are sent as several replies.
 
     Args:
         token: Slack bot token
         user_id: Slack user ID (e.g., U123456)
         message: Message text to send
+        session_id: Claude Code session ID to thread by (None for a top-level message)
+        progress: Optional dict recording how many chunks were already sent, so
+            a retry resumes after the last delivered chunk
 
     Returns:
-        True if message sent successfully, False otherwise
+        tuple[bool, float | None]: (sent successfully, Retry-After seconds if rate limited)
     """
+    progress = {} if progress is None else progress
+    threads = load_threads()
     try:
-        client = WebClient(token=token)
-
-        # Send message to user's DM
-        response = client.chat_postMessage(
-            channel=user_id,
-            text=message,
-            unfurl_links=False,
-            unfurl_media=False
-        )
+        client = get_client(token)
+
+        # Post to the cached IM channel; the first post resolves it from the user ID
+        channel = threads['channels'].get(user_id, user_id)
+        thread_ts = None
+        if session_id:
+            thread_ts = (session_state.load(session_id).get('notification_threads') or {}).get('slack')
+            thread_ts = thread_ts or threads['sessions'].get(session_id)  # Threads started before session state
+
+        chunks = chunk_message(message)
+        for index in range(progress.get('chunks_sent', 0), len(chunks)):
+            response = client.chat_postMessage(
+                channel=channel,
+                text=chunks[index],
+                thread_ts=thread_ts,
+                unfurl_links=False,
+                unfurl_media=False
+            )
+            if not response.get('ok', False):
+                return False, None
 
-        return response.get('ok', False)
+            progress['chunks_sent'] = index + 1
+            if channel != response.get('channel', channel):
+                channel = threads['channels'][user_id] = response['channel']
+                save_threads(threads)
+            if session_id and thread_ts is None:
+                # Remaining chunks and later events reply in this thread
+                thread_ts = response['ts']
+                session_state.update(session_id, notification_threads={'slack': thread_ts})
+
+        return True, None
 
     except SlackApiError as e:
         error_message = e.response.get('error', 'unknown error')
         print(f"Slack API error: {error_message}", file=sys.stderr)
-        return False
+        if error_message in ('channel_not_found', 'thread_not_found'):
+            # Thread or DM deleted: start over with a fresh lookup on retry
+            threads['channels'].pop(user_id, None)
+            threads['sessions'].pop(session_id, None)
+            save_threads(threads)
+            if session_id:
+                session_state.update(session_id, notification_threads={'slack': None})
+        retry_after = None
+        if e.response.status_code == 429:
+            try:
+                retry_after = float(e.response.headers.get('Retry-After', 1))
+            except (TypeError, ValueError):
+                retry_after = 1.0
+        return False, retry_after
     except Exception as e:
         print(f"Unexpected error sending Slack message: {e}", file=sys.stderr)
-        return False
+        return False, None
+
+
+def deliver_queued_notification(payload: dict) -> tuple[bool, float | None]:
+    """
+    Deliver one notification from the outbox (runs in the background worker).
+
+    The message is formatted on the first attempt, which is also when the
+    transcript is read, and kept in the payload for any retries.
+
+    Args:
+        payload: Queued notification (input_data, event_emoji, flush_timeout)
+
+    Returns:
+        tuple[bool, float | None]: (sent successfully, Retry-After seconds if rate limited)
+    """
+    slack_token = os.getenv('SLACK_BOT_TOKEN')
+    slack_user_id = os.getenv('SLACK_USER_ID')
+    if not slack_token or not slack_user_id:
+        return False, None
+
+    if 'message' not in payload:
+        payload['message'] = format_message(
+            payload['input_data'],
+            payload.get('event_emoji'),
+            payload.get('flush_timeout', 0.6)
+        )
+
+    sent, retry_after = send_slack_message(
+        slack_token,
+        slack_user_id,
+        payload['message'],
+        payload['input_data'].get('session_id') if payload.get('threads', True) else None,
+        progress=payload
+    )
+    if sent:
+        log_notification(payload['input_data'], True, payload['message'])
+    return sent, retry_after
+
+
+def deliver_queued_batch(payloads: list[dict]) -> tuple[bool, float | None]:
+    """
+    Deliver a burst of coalesced notifications for one session as a single digest.
+
+    Args:
+        payloads: Queued notifications in the order they were raised
+
+    Returns:
+        tuple[bool, float | None]: (sent successfully, Retry-After seconds if rate limited)
+    """
+    slack_token = os.getenv('SLACK_BOT_TOKEN')
+    slack_user_id = os.getenv('SLACK_USER_ID')
+    if not slack_token or not slack_user_id:
+        return False, None
+
+    messages = []
+    for payload in payloads:
+        if 'message' not in payload:
+            payload['message'] = format_message(
+                payload['input_data'],
+                payload.get('event_emoji'),
+                payload.get('flush_timeout', 0.6)
+            )
+        # Repeated events (e.g. several identical SubagentStops) are listed once
+        if payload['message'] not in messages:
+            messages.append(payload['message'])
+
+    if len(messages) == 1:
+        digest = messages[0]
+    else:
+        digest = f"📬 *{len(payloads)} Claude Code events*\n\n" + "\n\n".join(messages)
+
+    # Chunks sent by an earlier attempt are skipped only if the digest is unchanged
+    first = payloads[0]
+    sent, retry_after = send_slack_message(
+        slack_token,
+        slack_user_id,
+        digest,
+        first['input_data'].get('session_id') if first.get('threads', True) else None,
+        progress=batch_progress(payloads, digest)
+    )
+    if sent:
+        log_notification(payloads[0]['input_data'], True, digest)
+    return sent, retry_after
+
+
+def queue_notification(
+    input_data: dict,
+    event_emoji: str = None,
+    flush_timeout: float = 0.6,
+    coalesce_window: float = 0.0,
+    threads: bool = True
+) -> None:
+    """
+    Queue a notification for the background worker and make sure one is running.
+
+    The worker reads the transcript, sends and logs, so neither the transcript
+    wait nor Slack delays Claude Code.
+
+    Args:
+        input_data: Hook input data from stdin
+        event_emoji: Optional custom emoji override
+        flush_timeout: Seconds the worker waits for the final assistant entry
+        coalesce_window: Seconds to collect events of the same session into one digest
+        threads: Post as a reply in the session's thread
+    """
+    outbox = Outbox('slack')
+    session_id = input_data.get('session_id', '')
+    outbox.enqueue({
+        'input_data': input_data,
+        'event_emoji': event_emoji,
+        'flush_timeout': flush_timeout,
+        'threads': threads,
+    }, coalesce_key=session_id if coalesce_window > 0 else None,
+        coalesce_window=coalesce_window, session_id=session_id)
+    outbox.spawn_worker([sys.executable, str(Path(__file__).resolve()), '--drain-outbox'])
 
 
 def log_notification(input_data: dict, sent: bool, message: str):
@@ -295,9 +547,9 @@ def log_notification(input_data: dict, sent: bool, message: str):
 
         # Read existing log data
         if log_file.exists():
-            with open(log_file, 'r') as f:
+            with open(log_file, 'rb') as f:
                 try:
-                    log_data = json.load(f)
+                    log_data = json_codec.load(f)
                 except (json.JSONDecodeError, ValueError):
                     log_data = []
         else:
@@ -313,8 +565,8 @@ def log_notification(input_data: dict, sent: bool, message: str):
         log_data.append(log_entry)
 
         # Write back to file
-        with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        with open(log_file, 'wb') as f:
+            json_codec.dump(log_data, f, indent=True)
 
     except Exception as e:
         print(f"Error logging notification: {e}", file=sys.stderr)
@@ -322,6 +574,11 @@ def log_notification(input_data: dict, sent: bool, message: str):
 
 def main():
     """Main entry point for the Slack notification hook."""
+    if WebClient is None:
+        # If slack_sdk is not available, log and exit gracefully
+        print("Error: slack_sdk not installed", file=sys.stderr)
+        sys.exit(0)
+
     try:
         # Parse command-line arguments
         parser = argparse.ArgumentParser(
@@ -336,25 +593,57 @@ def main():
             action='store_true',
             help='Log only, do not send Slack message'
         )
+        parser.add_argument(
+            '--flush-timeout',
+            type=float,
+            default=0.6,
+            help='Seconds to wait for the final assistant entry to reach the transcript (default: 0.6)'
+        )
         parser.add_argument(
             '--cache-only',
             action='store_true',
             help='For SessionStart: only cache transcript path, do not send notification'
         )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Send inline instead of queueing for the background worker'
+        )
+        parser.add_argument(
+            '--no-threads',
+            dest='threads',
+            action='store_false',
+            help='Post every event as a top-level DM instead of threading by session'
+        )
+        parser.add_argument(
+            '--coalesce-window',
+            type=float,
+            default=float(os.getenv('NOTIFY_COALESCE_WINDOW', '2.0')),
+            help='Seconds to collect events of one session into a single digest, 0 to disable (default: 2.0)'
+        )
+        parser.add_argument(
+            '--drain-outbox',
+            action='store_true',
+            help=argparse.SUPPRESS  # Internal: run the background delivery worker
+        )
         args = parser.parse_args()
 
+        if args.drain_outbox:
+            Outbox('slack').run_worker(
+                report_to_breaker('slack', deliver_queued_notification),
+                report_to_breaker('slack', deliver_queued_batch)
+            )
+            sys.exit(0)
+
         # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = json_codec.load(sys.stdin.buffer)
 
         # Handle SessionStart: cache the transcript path for later use
         hook_event = input_data.get('hook_event_name', '')
         if hook_event == 'SessionStart':
-            transcript_path = input_data.get('transcript_path', '')
-            if transcript_path:
-                cache_dir = Path("logs")
-                cache_dir.mkdir(exist_ok=True)
-                cache_file = cache_dir / ".current-transcript"
-                cache_file.write_text(transcript_path)
+            session_state.record_transcript(
+                input_data.get('session_id', ''), input_data.get('transcript_path', '')
+            )
 
             # If --cache-only flag is set, exit without sending notification
             if args.cache_only:
@@ -374,19 +663,25 @@ def main():
             log_notification(input_data, False, "Missing credentials")
             sys.exit(0)
 
-        # Format the message
-        message = format_message(input_data, args.event_emoji)
-
-        # Send Slack message (unless dry-run)
-        sent = False
-        if not args.dry_run:
-            sent = send_slack_message(slack_token, slack_user_id, message)
-        else:
+        if args.dry_run:
+            message = format_message(input_data, args.event_emoji, args.flush_timeout)
             print(f"[DRY RUN] Would send: {message}")
-            sent = True  # Mark as sent for logging purposes
-
-        # Log the notification
-        log_notification(input_data, sent, message)
+            log_notification(input_data, True, message)
+        elif args.sync:
+            message = format_message(input_data, args.event_emoji, args.flush_timeout)
+            session_id = input_data.get('session_id') if args.threads else None
+            sent, _ = send_slack_message(slack_token, slack_user_id, message, session_id)
+            log_notification(input_data, sent, message)
+        else:
+            # Queue for the background worker; events of the same session
+            # arriving within the window share one digest
+            queue_notification(
+                input_data,
+                args.event_emoji,
+                args.flush_timeout,
+                args.coalesce_window,
+                args.threads
+            )
 
         # Always exit successfully to not block Claude Code
         sys.exit(0)
@@ -2,6 +2,7 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "python-dotenv",
 # ]
 # ///
@@ -10,15 +11,22 @@
 SSH OSC 777 Notification Hook for Claude Code
 
 Sends notifications over SSH using OSC (Operating System Command) 777 escape sequences.
-Automatically detects terminal type (iTerm2, Warp, VS Code) and sends appropriate sequences.
+Automatically detects terminal type and sends appropriate sequences straight to the
+session's controlling TTY. The TTY and terminal capability are detected once per
+session and cached in logs/osc/<session_id>.json; rapid events are rate-limited.
 
 Supports:
-- iTerm2: Full OSC 777 notification support
+- iTerm2, Ghostty: Full OSC 777 notification support
+- WezTerm, Windows Terminal: OSC 9 notifications
+- kitty: OSC 99 notifications
 - Warp, VS Code, Generic: Window title + bell fallback
+- SSH sessions: Bell only (unless OSC_CAPABILITY is set)
 
 Environment Variables (optional):
     OSC_NOTIFICATIONS_ENABLED: Enable/disable notifications (default: true)
-    OSC_TERMINAL_TYPE: Force specific terminal type (iterm2|warp|vscode|generic)
+    OSC_TERMINAL_TYPE: Force specific terminal type (iterm2|ghostty|wezterm|kitty|windows-terminal|warp|vscode|generic)
+    OSC_CAPABILITY: Force the sequence type (osc777|osc9|osc99|title|bell)
+    OSC_MIN_INTERVAL: Minimum seconds between notifications on one terminal (default: 1.0)
     OSC_EMOJI_NOTIFICATION: Custom emoji for Notification events (default: 🔔)
     OSC_EMOJI_STOP: Custom emoji for Stop events (default: ✅)
     OSC_EMOJI_SUBAGENT: Custom emoji for SubagentStop events (default: 🤖)
@@ -58,6 +66,18 @@ import sys
 from datetime import datetime, timezone
 from pathlib import Path
 
+from utils import json_codec
+from utils.notifications import EVENT_EMOJI, format_event
+from utils.osc import (
+    claim_write_slot,
+    deliver_queued,
+    generate_sequence,
+    session_terminal,
+    write_stdout,
+    write_tty,
+)
+from utils.outbox import Outbox
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -65,63 +85,9 @@ except ImportError:
     pass  # dotenv is optional
 
 
-def detect_terminal_type() -> str:
-    """
-    Detect terminal type from environment variables.
-
-    Returns:
-        str: Terminal type ('iterm2', 'warp', 'vscode', or 'generic')
-    """
-    term_program = os.getenv('TERM_PROGRAM', '').lower()
-    term = os.getenv('TERM', '').lower()
-
-    # Check for specific terminal programs
-    if 'iterm' in term_program:
-        return 'iterm2'
-    elif 'warp' in term_program:
-        return 'warp'
-    elif 'vscode' in term_program:
-        return 'vscode'
-    else:
-        return 'generic'
-
-
-def generate_osc_notification(terminal_type: str, title: str, message: str) -> str:
-    """
-    Generate appropriate OSC escape sequence for terminal type.
-
-    Args:
-        terminal_type: Terminal type from detect_terminal_type()
-        title: Notification title
-        message: Notification message
-
-    Returns:
-        str: OSC escape sequence to write to stdout
-    """
-    # Sanitize text to prevent OSC injection (remove control characters)
-    def sanitize(text: str) -> str:
-        # Remove control characters except newline/tab, truncate to 200 chars
-        cleaned = ''.join(char for char in text if ord(char) >= 32 or char in '\n\t')
-        cleaned = cleaned.replace('\x1b', '')  # Remove escape sequences
-        return cleaned[:200]
-
-    title = sanitize(title)
-    message = sanitize(message)
-
-    if terminal_type == 'iterm2':
-        # iTerm2 supports full OSC 777 notifications
-        # Format: ESC ] 777 ; notify ; title ; message BEL
-        return f'\x1b]777;notify;{title};{message}\x07'
-    else:
-        # Fallback: Use window title change + double bell for emphasis
-        # Format: ESC ] 0 ; text BEL
-        combined = f"{title}: {message}"
-        return f'\x1b]0;{combined}\x07\x07'
-
-
 def format_notification_message(input_data: dict, emoji: str = None) -> tuple[str, str]:
     """
-    Format notification title and message based on event type.
+    Format notification title and message, honoring the OSC_EMOJI_* overrides.
 
     Args:
         input_data: Hook input data from stdin
@@ -130,67 +96,52 @@ def format_notification_message(input_data: dict, emoji: str = None) -> tuple[st
     Returns:
         tuple[str, str]: (title, message)
     """
-    hook_event = input_data.get('hook_event_name', 'Unknown')
-
-    # Default emoji mapping (can be overridden by env vars or CLI arg)
     emoji_map = {
+        **EVENT_EMOJI,
         'Notification': os.getenv('OSC_EMOJI_NOTIFICATION', '🔔'),
         'Stop': os.getenv('OSC_EMOJI_STOP', '✅'),
         'SubagentStop': os.getenv('OSC_EMOJI_SUBAGENT', '🤖'),
     }
-    icon = emoji or emoji_map.get(hook_event, '📬')
-
-    if hook_event == 'Notification':
-        message = input_data.get('message', 'Claude Code notification')
-        return (f"{icon} Claude Code", message)
-
-    elif hook_event == 'Stop':
-        return (f"{icon} Task Completed", "Claude Code has finished responding")
-
-    elif hook_event == 'SubagentStop':
-        description = input_data.get('description', 'Subagent task')
-        return (f"{icon} Subagent Complete", description)
-
-    else:
-        # Fallback for unknown event types
-        message = input_data.get('message', f'Event: {hook_event}')
-        return (f"{icon} Claude Code", message)
+    return format_event(input_data, emoji, emoji_map)
 
 
-def send_osc_notification(terminal_type: str, title: str, message: str) -> bool:
+def send_osc_notification(title: str, message: str, session_id: str, force_terminal: str = None) -> bool:
     """
-    Send OSC notification by writing to stdout.
+    Send an OSC notification to the session's terminal.
 
-    Note: Over SSH, OSC sequences may not work reliably because:
-    - TERM_PROGRAM doesn't pass through SSH
-    - OSC sequences go to remote stdout, not local terminal
-    - Writing to TTY devices can freeze SSH sessions
-
-    For SSH sessions, consider using bell-only mode or the slack_notification.py hook.
+    The sequence is written straight to the controlling TTY (found and cached
+    once per session, see utils/osc.py). Events arriving faster than
+    OSC_MIN_INTERVAL are queued and shown together by a background worker.
+    Sessions without a TTY fall back to writing to stdout.
 
     Args:
-        terminal_type: Terminal type from detect_terminal_type()
         title: Notification title
         message: Notification message
+        session_id: Claude Code session ID
+        force_terminal: Terminal type overriding detection
 
     Returns:
-        bool: True if sent successfully, False otherwise
+        bool: True if sent or queued successfully, False otherwise
     """
     try:
-        # Check if we're in an SSH session
-        ssh_tty = os.getenv('SSH_TTY')
-
-        if ssh_tty:
-            # Over SSH: Just use terminal bell (safest option)
-            # OSC sequences don't work reliably over SSH anyway
-            sys.stdout.write('\x07')  # Single bell
-            sys.stdout.flush()
-        else:
-            # Local session: Use full OSC sequences
-            osc_sequence = generate_osc_notification(terminal_type, title, message)
-            sys.stdout.write(osc_sequence)
-            sys.stdout.flush()
-
+        terminal = session_terminal(session_id, force_terminal)
+        tty = terminal['tty']
+        if not tty:
+            return write_stdout(generate_sequence(terminal['capability'], title, message))
+
+        wait = claim_write_slot(tty)
+        if not wait:
+            return write_tty(tty, generate_sequence(terminal['capability'], title, message))
+
+        # Rate limited: queue until the TTY's next write slot
+        outbox = Outbox('osc')
+        outbox.enqueue({
+            'tty': tty,
+            'capability': terminal['capability'],
+            'title': title,
+            'message': message,
+        }, coalesce_key=tty, coalesce_window=wait, session_id=session_id)
+        outbox.spawn_worker([sys.executable, str(Path(__file__).resolve()), '--drain-outbox'])
         return True
 
     except Exception as e:
@@ -225,8 +176,8 @@ def log_notification(
         # Read existing log or initialize empty array
         if log_file.exists():
             try:
-                with open(log_file, 'r') as f:
-                    log_data = json.load(f)
+                with open(log_file, 'rb') as f:
+                    log_data = json_codec.load(f)
                     if not isinstance(log_data, list):
                         log_data = []
             except (json.JSONDecodeError, ValueError):
@@ -248,8 +199,8 @@ def log_notification(
         # Append and write back
         log_data.append(entry)
 
-        with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        with open(log_file, 'wb') as f:
+            json_codec.dump(log_data, f, indent=True)
 
     except Exception as e:
         # Don't block on logging errors
@@ -274,7 +225,7 @@ def main():
         )
         parser.add_argument(
             '--force-terminal',
-            choices=['iterm2', 'warp', 'vscode', 'generic'],
+            choices=['iterm2', 'ghostty', 'wezterm', 'kitty', 'windows-terminal', 'warp', 'vscode', 'generic'],
             help='Force specific terminal type (bypass detection)'
         )
         parser.add_argument(
@@ -283,21 +234,26 @@ def main():
             help='Disable notifications (log only)'
         )
 
+        parser.add_argument(
+            '--drain-outbox',
+            action='store_true',
+            help=argparse.SUPPRESS  # Internal: write rate-limited notifications
+        )
+
         args = parser.parse_args()
 
+        if args.drain_outbox:
+            Outbox('osc').run_worker(lambda payload: deliver_queued([payload]), deliver_queued)
+            sys.exit(0)
+
         # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = json_codec.load(sys.stdin.buffer)
 
         # Check if disabled via flag or environment variable
         if args.disable or os.getenv('OSC_NOTIFICATIONS_ENABLED', 'true').lower() == 'false':
             sys.exit(0)
 
-        # Detect terminal type (or use forced/env override)
-        terminal_type = (
-            args.force_terminal or
-            os.getenv('OSC_TERMINAL_TYPE') or
-            detect_terminal_type()
-        )
+        session_id = input_data.get('session_id', '')
 
         # Format notification message
         title, message = format_notification_message(input_data, args.emoji)
@@ -305,12 +261,18 @@ def main():
         # Send notification (unless dry-run)
         sent = False
         if not args.dry_run:
-            sent = send_osc_notification(terminal_type, title, message)
+            sent = send_osc_notification(title, message, session_id, args.force_terminal)
         else:
-            print(f"[DRY RUN] Terminal: {terminal_type} | Title: {title} | Message: {message}", file=sys.stderr)
+            terminal = session_terminal(session_id, args.force_terminal)
+            print(
+                f"[DRY RUN] Terminal: {terminal['terminal_type']} ({terminal['capability']}, "
+                f"tty {terminal['tty']}) | Title: {title} | Message: {message}",
+                file=sys.stderr
+            )
             sent = True  # Mark as sent for logging purposes
 
-        # Log the notification
+        # Log the notification (terminal detection is cached per session)
+        terminal_type = session_terminal(session_id, args.force_terminal)['terminal_type']
         log_notification(input_data, terminal_type, title, message, sent)
 
         # Always exit successfully to prevent blocking Claude Code
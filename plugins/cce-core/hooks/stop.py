@@ -2,6 +2,7 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "python-dotenv",
 # ]
 # ///
@@ -11,9 +12,14 @@ import json
 import os
 import sys
 import random
-import subprocess
 from pathlib import Path
 
+from utils import json_codec
+from utils.coalesce import claim_announcement
+from utils.llm.message_pool import completion_kind, pop_message
+from utils.speech import speak
+from utils.transcript import export_chat
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -63,32 +69,21 @@ def get_tts_script_path():
 
 def get_llm_completion_message():
     """
-    Generate completion message using available LLM services.
-    Priority order: Ollama (local) > fallback to random message
-    
+    Get a completion message without waiting for an LLM.
+
+    Pops a pre-generated message from the message pool, which is refilled in
+    the background by whichever LLM provider answers fastest when it runs low
+    (see utils/llm/message_pool.py and utils/llm/router.py).
+    Falls back to a random predefined message while the pool is empty.
+
     Returns:
-        str: Generated or fallback completion message
+        str: Pre-generated or fallback completion message
     """
-    # Get current script directory and construct utils/llm path
-    script_dir = Path(__file__).parent
-    llm_dir = script_dir / "utils" / "llm"
-    
-    # Try Ollama first (highest priority - local model)
-    ollama_script = llm_dir / "ollama.py"
-    if ollama_script.exists():
-        try:
-            result = subprocess.run([
-                "uv", "run", str(ollama_script), "--completion"
-            ], 
-            capture_output=True,
-            text=True,
-            timeout=5
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return result.stdout.strip()
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError):
-            pass
-    
+    kind = completion_kind(os.getenv("ENGINEER_NAME", "").strip())
+    message = pop_message(kind)
+    if message:
+        return message
+
     # Fallback to random predefined message
     messages = get_completion_messages()
     return random.choice(messages)
@@ -103,17 +98,9 @@ def announce_completion():
         # Get completion message (LLM-generated or fallback)
         completion_message = get_llm_completion_message()
         
-        # Call the TTS script with the completion message
-        subprocess.run([
-            "uv", "run", tts_script, completion_message
-        ], 
-        capture_output=True,  # Suppress output
-        timeout=10  # 10-second timeout
-        )
+        # Queue the message for the background player and return
+        speak(completion_message, tts_script)
         
-    except (subprocess.TimeoutExpired, subprocess.SubprocessError, FileNotFoundError):
-        # Fail silently if TTS encounters issues
-        pass
     except Exception:
         # Fail silently for any other errors
         pass
@@ -123,11 +110,11 @@ def main():
     try:
         # Parse command line arguments
         parser = argparse.ArgumentParser()
-        parser.add_argument('--chat', action='store_true', help='Copy transcript to chat.json')
+        parser.add_argument('--chat', action='store_true', help='Export transcript to logs/chat/<session_id>.jsonl')
         args = parser.parse_args()
         
         # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = json_codec.load(sys.stdin.buffer)
 
         # Ensure log directory exists
         log_dir = os.path.join(os.getcwd(), "logs")
@@ -136,9 +123,9 @@ def main():
 
         # Read existing log data or initialize empty list
         if os.path.exists(log_path):
-            with open(log_path, 'r') as f:
+            with open(log_path, 'rb') as f:
                 try:
-                    log_data = json.load(f)
+                    log_data = json_codec.load(f)
                 except (json.JSONDecodeError, ValueError):
                     log_data = []
         else:
@@ -148,33 +135,25 @@ def main():
         log_data.append(input_data)
         
         # Write back to file with formatting
-        with open(log_path, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        with open(log_path, 'wb') as f:
+            json_codec.dump(log_data, f, indent=True)
         
-        # Handle --chat switch
+        # Handle --chat switch: append only the new transcript entries
         if args.chat and 'transcript_path' in input_data:
             transcript_path = input_data['transcript_path']
             if os.path.exists(transcript_path):
-                # Read .jsonl file and convert to JSON array
-                chat_data = []
                 try:
-                    with open(transcript_path, 'r') as f:
-                        for line in f:
-                            line = line.strip()
-                            if line:
-                                try:
-                                    chat_data.append(json.loads(line))
-                                except json.JSONDecodeError:
-                                    pass  # Skip invalid lines
-                    
-                    # Write to logs/chat.json
-                    chat_file = os.path.join(log_dir, 'chat.json')
-                    with open(chat_file, 'w') as f:
-                        json.dump(chat_data, f, indent=2)
+                    export_chat(
+                        transcript_path,
+                        input_data.get('session_id', 'unknown'),
+                        log_dir
+                    )
                 except Exception:
                     pass  # Fail silently
 
-        # Announce completion via TTS
+        # Announce completion via TTS; the final Stop is always spoken and
+        # silences subagent announcements still trailing in
+        claim_announcement(input_data.get('session_id', ''), force=True)
         announce_completion()
 
         sys.exit(0)
@@ -2,6 +2,7 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "python-dotenv",
 # ]
 # ///
@@ -10,10 +11,15 @@ import argparse
 import json
 import os
 import sys
-import subprocess
 import random
 from pathlib import Path
 
+from utils import json_codec
+from utils.coalesce import claim_announcement
+from utils.llm.message_pool import pop_message
+from utils.speech import speak
+from utils.transcript import export_chat
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -61,68 +67,28 @@ def get_completion_messages():
     ]
 
 
-def get_llm_completion_message(input_data):
+def get_llm_completion_message():
     """
-    Generate completion message using available LLM services.
-    Priority order: Ollama (local) > fallback to random message
-    
-    Args:
-        input_data (dict): Input data from Claude Code containing subagent info
-    
+    Get a subagent completion message without waiting for an LLM.
+
+    Pops a pre-generated message from the message pool, which is refilled in
+    the background by whichever LLM provider answers fastest when it runs low
+    (see utils/llm/message_pool.py and utils/llm/router.py).
+    Subagent names vary per call, so the pooled messages are generic.
+
     Returns:
-        str: Generated or fallback completion message
+        str: Pre-generated or fallback completion message
     """
-    # Extract subagent information from input data
-    subagent_name = None
-    task_info = None
-    
-    # Try to extract subagent name from various possible fields
-    if 'subagent_type' in input_data:
-        subagent_name = input_data['subagent_type']
-    elif 'agent_type' in input_data:
-        subagent_name = input_data['agent_type']
-    elif 'tool_name' in input_data:
-        subagent_name = input_data['tool_name']
-    
-    # Try to extract task information
-    if 'description' in input_data:
-        task_info = input_data['description']
-    elif 'task' in input_data:
-        task_info = input_data['task']
-    elif 'prompt' in input_data:
-        task_info = input_data['prompt'][:50] + "..." if len(input_data['prompt']) > 50 else input_data['prompt']
-    
-    # Get current script directory and construct utils/llm path
-    script_dir = Path(__file__).parent
-    llm_dir = script_dir / "utils" / "llm"
-    
-    # Try Ollama script with subagent completion mode
-    ollama_script = llm_dir / "ollama.py"
-    if ollama_script.exists():
-        try:
-            cmd = ["uv", "run", str(ollama_script), "--subagent-completion"]
-            if subagent_name:
-                cmd.append(subagent_name)
-            if task_info:
-                cmd.append(task_info)
-                
-            result = subprocess.run(
-                cmd, 
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return result.stdout.strip()
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError):
-            pass
-    
+    message = pop_message('subagent')
+    if message:
+        return message
+
     # Fallback to random predefined message
     messages = get_completion_messages()
     return random.choice(messages)
 
 
-def announce_subagent_completion(input_data):
+def announce_subagent_completion():
     """Announce subagent completion using the best available TTS service."""
     try:
         tts_script = get_tts_script_path()
@@ -130,19 +96,11 @@ def announce_subagent_completion(input_data):
             return  # No TTS scripts available
         
         # Get completion message (LLM-generated or fallback)
-        completion_message = get_llm_completion_message(input_data)
+        completion_message = get_llm_completion_message()
         
-        # Call the TTS script with the completion message
-        subprocess.run([
-            "uv", "run", tts_script, completion_message
-        ], 
-        capture_output=True,  # Suppress output
-        timeout=10  # 10-second timeout
-        )
+        # Queue the message for the background player and return
+        speak(completion_message, tts_script)
         
-    except (subprocess.TimeoutExpired, subprocess.SubprocessError, FileNotFoundError):
-        # Fail silently if TTS encounters issues
-        pass
     except Exception:
         # Fail silently for any other errors
         pass
@@ -152,11 +110,11 @@ def main():
     try:
         # Parse command line arguments
         parser = argparse.ArgumentParser()
-        parser.add_argument('--chat', action='store_true', help='Copy transcript to chat.json')
+        parser.add_argument('--chat', action='store_true', help='Export transcript to logs/chat/<session_id>.jsonl')
         args = parser.parse_args()
         
         # Read JSON input from stdin
-        input_data = json.load(sys.stdin)
+        input_data = json_codec.load(sys.stdin.buffer)
 
         # Ensure log directory exists
         log_dir = os.path.join(os.getcwd(), "logs")
@@ -165,9 +123,9 @@ def main():
 
         # Read existing log data or initialize empty list
         if os.path.exists(log_path):
-            with open(log_path, 'r') as f:
+            with open(log_path, 'rb') as f:
                 try:
-                    log_data = json.load(f)
+                    log_data = json_codec.load(f)
                 except (json.JSONDecodeError, ValueError):
                     log_data = []
         else:
@@ -177,34 +135,25 @@ def main():
         log_data.append(input_data)
         
         # Write back to file with formatting
-        with open(log_path, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        with open(log_path, 'wb') as f:
+            json_codec.dump(log_data, f, indent=True)
         
-        # Handle --chat switch (same as stop.py)
+        # Handle --chat switch: append only the new transcript entries
         if args.chat and 'transcript_path' in input_data:
             transcript_path = input_data['transcript_path']
             if os.path.exists(transcript_path):
-                # Read .jsonl file and convert to JSON array
-                chat_data = []
                 try:
-                    with open(transcript_path, 'r') as f:
-                        for line in f:
-                            line = line.strip()
-                            if line:
-                                try:
-                                    chat_data.append(json.loads(line))
-                                except json.JSONDecodeError:
-                                    pass  # Skip invalid lines
-                    
-                    # Write to logs/chat.json
-                    chat_file = os.path.join(log_dir, 'chat.json')
-                    with open(chat_file, 'w') as f:
-                        json.dump(chat_data, f, indent=2)
+                    export_chat(
+                        transcript_path,
+                        input_data.get('session_id', 'unknown'),
+                        log_dir
+                    )
                 except Exception:
                     pass  # Fail silently
 
-        # Announce subagent completion via TTS
-        announce_subagent_completion(input_data)
+        # Announce subagent completion via TTS, once per burst of subagents
+        if claim_announcement(input_data.get('session_id', '')):
+            announce_subagent_completion()
 
         sys.exit(0)
 
@@ -2,6 +2,7 @@
 # /// script
 # requires-python = ">=3.11"
 # dependencies = [
+#     "orjson",
 #     "python-dotenv",
 # ]
 # ///
@@ -11,6 +12,8 @@ import json
 import sys
 from pathlib import Path
 
+from utils import json_codec
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -27,9 +30,9 @@ def log_user_prompt(session_id, input_data):
     
     # Read existing log data or initialize empty list
     if log_file.exists():
-        with open(log_file, 'r') as f:
+        with open(log_file, 'rb') as f:
             try:
-                log_data = json.load(f)
+                log_data = json_codec.load(f)
             except (json.JSONDecodeError, ValueError):
                 log_data = []
     else:
@@ -39,8 +42,8 @@ def log_user_prompt(session_id, input_data):
     log_data.append(input_data)
     
     # Write back to file with formatting
-    with open(log_file, 'w') as f:
-        json.dump(log_data, f, indent=2)
+    with open(log_file, 'wb') as f:
+        json_codec.dump(log_data, f, indent=True)
 
 
 def validate_prompt(prompt):
@@ -74,7 +77,7 @@ def main():
         args = parser.parse_args()
         
         # Read JSON input from stdin
-        input_data = json.loads(sys.stdin.read())
+        input_data = json_codec.load(sys.stdin.buffer)
         
         # Extract session_id and prompt
         session_id = input_data.get('session_id', 'unknown')
@@ -0,0 +1,59 @@
+"""
+Per-session throttle for spoken (TTS) announcements.
+
+Subagent-heavy sessions raise many SubagentStop and Notification events within
+a few seconds. Queued Slack and Discord messages are merged into digests by the
+outbox worker; TTS plays immediately, so instead only the first announcement of
+a burst is spoken and the rest of the burst is skipped.
+
+The window defaults to NOTIFY_COALESCE_WINDOW (seconds, default 2.0), shared
+with the Slack and Discord hooks.
+"""
+
+import os
+import time
+from pathlib import Path
+
+from utils.transcript import safe_session_name
+
+COALESCE_DIR = Path("logs") / ".coalesce"
+DEFAULT_WINDOW = 2.0
+
+
+def coalesce_window() -> float:
+    """Return the configured coalescing window in seconds."""
+    try:
+        return float(os.getenv('NOTIFY_COALESCE_WINDOW', DEFAULT_WINDOW))
+    except ValueError:
+        return DEFAULT_WINDOW
+
+
+def claim_announcement(session_id: str, window: float | None = None, force: bool = False) -> bool:
+    """
+    Decide whether an announcement for this session should be spoken now.
+
+    Args:
+        session_id: Claude Code session ID
+        window: Seconds during which later announcements are skipped
+            (default: coalesce_window())
+        force: Always announce (e.g. the final Stop), still starting a new window
+
+    Returns:
+        bool: True if the caller should announce
+    """
+    window = coalesce_window() if window is None else window
+    if window <= 0:
+        return True
+
+    marker = COALESCE_DIR / f"tts-{safe_session_name(session_id)}"
+    now = time.time()
+    try:
+        if not force and now - marker.stat().st_mtime < window:
+            return False
+    except FileNotFoundError:
+        pass
+
+    COALESCE_DIR.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+    os.utime(marker, (now, now))
+    return True
@@ -0,0 +1,174 @@
+"""
+Rate-limit-aware Discord webhook client.
+
+Keeps one HTTPS connection open for its lifetime, so the outbox worker sends
+a burst of notifications over a single TLS session. Discord's rate-limit
+headers (X-RateLimit-Remaining / X-RateLimit-Reset-After) are tracked per
+bucket, and a request that would exhaust the bucket waits for the reset
+instead of collecting a 429. Embeds are packed up to 10 per message, within
+Discord's 6000-character total.
+"""
+
+import http.client
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+USER_AGENT = 'ClaudeCode-DiscordNotifier/1.0'
+
+# Longest pre-emptive wait; a longer reset is left to the outbox retry
+MAX_PREEMPTIVE_WAIT = 5.0
+
+
+def embed_size(embed: dict) -> int:
+    """Characters of an embed counted towards Discord's per-message limit."""
+    return (
+        len(embed.get('title', ''))
+        + len(embed.get('description', ''))
+        + len(embed.get('footer', {}).get('text', ''))
+    )
+
+
+def pack_embeds(embeds: list[dict]) -> list[list[dict]]:
+    """Split embeds into messages of at most MAX_EMBEDS embeds and MAX_EMBED_CHARS characters."""
+    messages = []
+    current, size = [], 0
+    for embed in embeds:
+        length = embed_size(embed)
+        if current and (len(current) == MAX_EMBEDS or size + length > MAX_EMBED_CHARS):
+            messages.append(current)
+            current, size = [], 0
+        current.append(embed)
+        size += length
+    if current:
+        messages.append(current)
+    return messages
+
+
+class DiscordWebhook:
+    """A webhook with a persistent connection and rate-limit bookkeeping."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.path = parts.path + (f'?{parts.query}' if parts.query else '')
+        self.timeout = timeout
+        self.connection = None
+        # Rate-limit state from the last response
+        self.remaining = None
+        self.reset_at = 0.0
+
+    def _connect(self):
+        if self.connection is None:
+            connection_class = (
+                http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            )
+            self.connection = connection_class(self.host, timeout=self.timeout)
+        return self.connection
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _wait_for_bucket(self) -> float | None:
+        """
+        Sleep until the bucket resets if the last response left it empty.
+
+        Returns:
+            Seconds still to wait if the reset is too far away to block on, else None
+        """
+        if self.remaining is None or self.remaining > 0:
+            return None
+        wait = self.reset_at - time.monotonic()
+        if wait <= 0:
+            return None
+        if wait > MAX_PREEMPTIVE_WAIT:
+            return wait
+        time.sleep(wait)
+        return None
+
+    def _update_limits(self, response) -> None:
+        remaining = response.getheader('X-RateLimit-Remaining')
+        reset_after = response.getheader('X-RateLimit-Reset-After')
+        try:
+            self.remaining = int(remaining) if remaining is not None else None
+            if reset_after is not None:
+                self.reset_at = time.monotonic() + float(reset_after)
+        except ValueError:
+            self.remaining = None
+
+    def _request(self, body: bytes):
+        """POST the body, reconnecting once if the kept-alive connection was closed."""
+        headers = {'Content-Type': 'application/json', 'User-Agent': USER_AGENT}
+        for attempt in range(2):
+            connection = self._connect()
+            try:
+                connection.request('POST', self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                return response, response.read()
+            except (http.client.RemoteDisconnected, ConnectionError, http.client.CannotSendRequest):
+                self.close()
+                if attempt:
+                    raise
+
+    def post(self, payload: dict) -> tuple[bool, float | None]:
+        """
+        Execute the webhook with a JSON payload.
+
+        Returns:
+            tuple[bool, float | None]: (sent successfully, seconds to wait before retrying if rate limited)
+        """
+        wait = self._wait_for_bucket()
+        if wait is not None:
+            return False, wait
+
+        try:
+            response, data = self._request(json.dumps(payload).encode('utf-8'))
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            print(f"Discord webhook connection error: {e}", file=sys.stderr)
+            return False, None
+
+        self._update_limits(response)
+        if response.status in (200, 204):
+            return True, None
+
+        if response.status == 429:
+            retry_after = response.getheader('Retry-After')
+            try:
+                retry_after = float(retry_after) if retry_after else float(json.loads(data).get('retry_after', 1.0))
+            except (ValueError, TypeError, AttributeError):
+                retry_after = 1.0
+            scope = 'global' if response.getheader('X-RateLimit-Global') else 'webhook'
+            print(f"Discord {scope} rate limit, retrying in {retry_after:.1f}s", file=sys.stderr)
+            return False, retry_after
+
+        print(f"Discord webhook HTTP error: {response.status} - {response.reason}", file=sys.stderr)
+        return False, None
+
+    def send_embeds(self, embeds: list[dict], progress: dict = None) -> tuple[bool, float | None]:
+        """
+        Send embeds, packed into as few messages as Discord's limits allow.
+
+        Args:
+            embeds: Discord embed objects
+            progress: Optional dict recording how many messages were already
+                sent, so a retry resumes after the last delivered one
+
+        Returns:
+            tuple[bool, float | None]: (all sent, seconds to wait before retrying if rate limited)
+        """
+        progress = {} if progress is None else progress
+        messages = pack_embeds(embeds)
+        for index in range(progress.get('messages_sent', 0), len(messages)):
+            sent, retry_after = self.post({'embeds': messages[index]})
+            if not sent:
+                return False, retry_after
+            progress['messages_sent'] = index + 1
+        return True, None
@@ -0,0 +1,300 @@
+"""
+Cheap git branch and dirty-state lookups for hooks.
+
+`git status --porcelain` on a large repository scans the whole working tree
+and prints every changed path, although hooks only need the branch and a few
+counts. git_state() instead:
+
+- runs `git status --porcelain=v2 --branch -z --no-renames` with the
+  untracked cache enabled (core.untrackedCache) and, where git has a built-in
+  file system monitor (macOS and Windows, git >= 2.37), core.fsmonitor, so
+  git only looks at paths that changed since its last run
+- counts the records as they are read from the pipe instead of building a
+  list of file names
+- caches the result in logs/.cache/git_state.json, keyed by the repository,
+  the index file's mtime and size, and HEAD; a cached result is reused while
+  the key is unchanged and it is younger than GIT_STATE_MAX_AGE seconds
+  (default 10), since edits to tracked files do not touch the index until
+  git next runs
+- caches the fsmonitor probe (`git version` and `git config core.fsmonitor`)
+  in the same file until the git config files or the git binary change, so
+  a refresh runs only `git rev-parse` and `git status`
+
+GIT_FSMONITOR=false keeps git's file system monitor daemon from being started.
+
+Usage:
+    from utils.git_state import git_state
+    state = git_state()
+    if state and state['dirty']:
+        print(f"{state['branch']}: {state['changed']} changed files")
+"""
+
+import json
+import os
+import selectors
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+CACHE_FILE = Path("logs") / ".cache" / "git_state.json"
+DEFAULT_MAX_AGE = 10.0
+STATUS_TIMEOUT = 5
+READ_SIZE = 65536
+
+
+def max_age() -> float:
+    """Seconds a cached state is trusted while the index is unchanged."""
+    try:
+        return float(os.getenv('GIT_STATE_MAX_AGE', DEFAULT_MAX_AGE))
+    except ValueError:
+        return DEFAULT_MAX_AGE
+
+
+def _git_dirs(cwd: str) -> tuple[str, str] | None:
+    """Return (toplevel, git dir) of the repository containing cwd, or None."""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--show-toplevel', '--absolute-git-dir'],
+            cwd=cwd, capture_output=True, text=True, timeout=STATUS_TIMEOUT
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    lines = result.stdout.splitlines()
+    if result.returncode != 0 or len(lines) != 2:
+        return None
+    return lines[0], lines[1]
+
+
+def _stat_key(path: Path) -> list | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def cache_key(toplevel: str, git_dir: str) -> list:
+    """Identity of the repository state: the index and HEAD, as seen by stat()."""
+    git_dir = Path(git_dir)
+    try:
+        head = (git_dir / 'HEAD').read_text().strip()
+    except OSError:
+        head = None
+    ref = _stat_key(git_dir / head[5:]) if head and head.startswith('ref: ') else None
+    return [
+        toplevel,
+        _stat_key(git_dir / 'index'),
+        head,
+        ref,
+        _stat_key(git_dir / 'packed-refs'),
+    ]
+
+
+def _fsmonitor_supported() -> bool:
+    """Whether git's built-in fsmonitor daemon may be used on this machine."""
+    try:
+        version = subprocess.run(['git', 'version'], capture_output=True, text=True, timeout=2).stdout
+        major, minor = (int(part) for part in version.split()[2].split('.')[:2])
+    except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+        return False
+    return (major, minor) >= (2, 37)
+
+
+def _probe_key(git_dir: str) -> list:
+    """Identity of what the fsmonitor probe depends on: git config files and the git binary."""
+    git = shutil.which('git')
+    return [
+        _stat_key(Path(git_dir) / 'config'),
+        _stat_key(Path.home() / '.gitconfig'),
+        git,
+        _stat_key(Path(git)) if git else None,
+    ]
+
+
+def fsmonitor_probe(toplevel: str, git_dir: str, cached: dict | None = None) -> dict | None:
+    """
+    Decide whether `git status` should enable the built-in fsmonitor daemon.
+
+    Args:
+        toplevel: Repository root
+        git_dir: Repository git directory
+        cached: Probe returned by an earlier call, reused while its key matches
+
+    Returns:
+        dict: {'key': ..., 'enabled': bool}, or None where fsmonitor is never
+            used (other platforms, GIT_FSMONITOR=false), without running git
+    """
+    if os.getenv('GIT_FSMONITOR', 'true').lower() == 'false':
+        return None
+    if sys.platform not in ('darwin', 'win32'):
+        return None
+    key = _probe_key(git_dir)
+    if isinstance(cached, dict) and cached.get('key') == key:
+        return cached
+
+    enabled = False
+    if _fsmonitor_supported():
+        try:
+            configured = subprocess.run(
+                ['git', '-C', toplevel, 'config', '--get', 'core.fsmonitor'],
+                capture_output=True, text=True, timeout=2
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            configured = ''
+        # Respect an explicit setting (including a hook script); otherwise use the built-in daemon
+        enabled = not configured
+    return {'key': key, 'enabled': enabled}
+
+
+def status_command(toplevel: str, fsmonitor: bool = False) -> list[str]:
+    """`git status` command line, enabling the untracked cache (and fsmonitor if asked)."""
+    command = ['git', '-C', toplevel, '-c', 'core.untrackedCache=true']
+    if fsmonitor:
+        command += ['-c', 'core.fsmonitor=true']
+    return command + ['status', '--porcelain=v2', '--branch', '-z', '--no-renames']
+
+
+def read_status(toplevel: str, fsmonitor: bool = False) -> dict | None:
+    """
+    Run `git status` and count its records without keeping the file list.
+
+    Args:
+        toplevel: Repository root
+        fsmonitor: Enable git's built-in fsmonitor daemon
+
+    Returns:
+        dict: Branch, upstream, ahead/behind and staged/unstaged/untracked/conflicted
+            counts, or None if git failed
+    """
+    state = {
+        'branch': None, 'head': None, 'upstream': None, 'ahead': 0, 'behind': 0,
+        'staged': 0, 'unstaged': 0, 'untracked': 0, 'conflicted': 0, 'changed': 0,
+    }
+    try:
+        process = subprocess.Popen(
+            status_command(toplevel, fsmonitor),
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+
+    # Read the pipe unbuffered, waiting no longer than the deadline for
+    # output, so a stalled git (index.lock, slow file system) cannot hang the hook
+    deadline = time.monotonic() + STATUS_TIMEOUT
+    partial = b''
+    fd = process.stdout.fileno()
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not selector.select(remaining):
+                    process.kill()
+                    process.wait()
+                    return None
+                chunk = os.read(fd, READ_SIZE)
+                if not chunk:
+                    break
+                records = (partial + chunk).split(b'\0')
+                partial = records.pop()
+                for record in records:
+                    _count(state, record)
+        if partial:
+            _count(state, partial)
+        if process.wait(timeout=max(0.1, deadline - time.monotonic())) != 0:
+            return None
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        return None
+    finally:
+        process.stdout.close()
+
+    state['dirty'] = state['changed'] > 0
+    return state
+
+
+def _count(state: dict, record: bytes) -> None:
+    """Add one porcelain v2 record to the state."""
+    kind = record[:1]
+    if kind in (b'1', b'?', b'u'):
+        state['changed'] += 1  # Files, whether staged, unstaged or both
+    if kind == b'1':
+        # "1 XY ...": X is the staged status, Y the unstaged one
+        if record[2:3] != b'.':
+            state['staged'] += 1
+        if record[3:4] != b'.':
+            state['unstaged'] += 1
+    elif kind == b'?':
+        state['untracked'] += 1
+    elif kind == b'u':
+        state['conflicted'] += 1
+    elif kind == b'#':
+        header = record.decode('utf-8', 'replace').split(' ')
+        if header[1:2] == ['branch.head']:
+            state['branch'] = header[2] if len(header) > 2 else None
+        elif header[1:2] == ['branch.oid']:
+            state['head'] = header[2] if len(header) > 2 and header[2] != '(initial)' else None
+        elif header[1:2] == ['branch.upstream'] and len(header) > 2:
+            state['upstream'] = header[2]
+        elif header[1:2] == ['branch.ab'] and len(header) > 3:
+            state['ahead'], state['behind'] = abs(int(header[2])), abs(int(header[3]))
+
+
+def _load_cache() -> dict:
+    try:
+        with open(CACHE_FILE, 'r') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache: dict) -> None:
+    try:
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = CACHE_FILE.parent / f".{CACHE_FILE.name}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, CACHE_FILE)
+    except OSError:
+        pass
+
+
+def git_state(cwd: str = '.', use_cache: bool = True) -> dict | None:
+    """
+    Branch and dirty state of the repository containing cwd.
+
+    Args:
+        cwd: Directory inside the repository
+        use_cache: Reuse a cached result while the index and HEAD are unchanged
+
+    Returns:
+        dict: branch, head, upstream, ahead, behind, staged, unstaged,
+            untracked and conflicted counts, changed (files with any change) and
+            dirty; None outside a repository
+    """
+    dirs = _git_dirs(cwd)
+    if dirs is None:
+        return None
+    toplevel, git_dir = dirs
+
+    cache = _load_cache() if use_cache else {}
+    entry = cache.get(toplevel)
+    if (entry and entry.get('key') == cache_key(toplevel, git_dir)
+            and time.time() - entry.get('time', 0) < max_age()):
+        return entry['state']
+
+    probe = fsmonitor_probe(toplevel, git_dir, (entry or {}).get('fsmonitor'))
+    state = read_status(toplevel, bool(probe and probe['enabled']))
+    if state is None:
+        return None
+
+    # git status may refresh the index, so the key is taken afterwards
+    cache[toplevel] = {'key': cache_key(toplevel, git_dir), 'time': time.time(), 'state': state}
+    if probe is not None:
+        cache[toplevel]['fsmonitor'] = probe
+    _save_cache(cache)
+    return state
@@ -0,0 +1,203 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "orjson",
+#     "msgspec",
+# ]
+# ///
+
+"""
+JSON codec shared by the hooks.
+
+Uses orjson or msgspec when installed and falls back to the standard library
+otherwise. Decode errors are always raised as json.JSONDecodeError, so
+existing handlers keep working whichever backend is active.
+
+Hooks list "orjson" in their uv inline script metadata; the stdlib fallback
+covers an interpreter where its import fails. The pre_tool_use security
+guard deliberately does not depend on it, so it starts even without the wheel.
+
+Set HOOKS_JSON_BACKEND=json|orjson|msgspec to force a backend.
+
+Benchmark the backends on real transcripts:
+    ./json_codec.py --benchmark ~/.claude/projects/my-project/*.jsonl
+"""
+
+import json
+import os
+import sys
+import time
+
+
+def _stdlib_loads(data):
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj, indent=False):
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _load_orjson():
+    import orjson
+
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj, indent=False):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        except TypeError:
+            # Non-string keys or integers beyond 64 bits
+            return _stdlib_dumps(obj, indent)
+
+    return loads, dumps
+
+
+def _load_msgspec():
+    import msgspec
+
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+
+    def loads(data):
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise json.JSONDecodeError(str(e), '', 0) from e
+
+    def dumps(obj, indent=False):
+        try:
+            data = encoder.encode(obj)
+        except (TypeError, OverflowError):
+            return _stdlib_dumps(obj, indent)
+        return msgspec.json.format(data, indent=2) if indent else data
+
+    return loads, dumps
+
+
+_LOADERS = {
+    'orjson': _load_orjson,
+    'msgspec': _load_msgspec,
+}
+
+
+def available_backends() -> dict:
+    """Return {name: (loads, dumps)} for every importable backend, fastest first."""
+    backends = {}
+    for name, loader in _LOADERS.items():
+        try:
+            backends[name] = loader()
+        except ImportError:
+            continue
+    backends['json'] = (_stdlib_loads, _stdlib_dumps)
+    return backends
+
+
+def _select_backend():
+    forced = os.getenv('HOOKS_JSON_BACKEND', '').strip().lower()
+    if forced in _LOADERS:
+        try:
+            return forced, _LOADERS[forced]()
+        except ImportError:
+            pass
+    elif forced == 'json':
+        return 'json', (_stdlib_loads, _stdlib_dumps)
+
+    for name, loader in _LOADERS.items():
+        try:
+            return name, loader()
+        except ImportError:
+            continue
+    return 'json', (_stdlib_loads, _stdlib_dumps)
+
+
+BACKEND, (_loads, _dumps) = _select_backend()
+
+
+def loads(data):
+    """
+    Parse JSON from str or bytes.
+
+    Raises:
+        json.JSONDecodeError: If the data is not valid JSON
+    """
+    return _loads(data)
+
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """
+    Serialize an object to UTF-8 JSON bytes.
+
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with two-space indentation (like json.dump(indent=2))
+    """
+    return _dumps(obj, indent)
+
+
+def load(fp):
+    """Parse JSON from a file object opened in text or binary mode (e.g. sys.stdin.buffer)."""
+    return _loads(fp.read())
+
+
+def dump(obj, fp, indent: bool = False) -> None:
+    """Serialize an object to a file object opened in binary mode."""
+    fp.write(_dumps(obj, indent))
+
+
+def benchmark(paths, rounds: int = 3) -> None:
+    """Compare backends on transcript parsing and indented log writes."""
+    lines = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            lines.extend(line for line in f if line.strip())
+    if not lines:
+        print("No transcript lines found")
+        return
+
+    total_mb = sum(len(line) for line in lines) / 1e6
+    print(f"{len(lines):,} transcript lines ({total_mb:.1f} MB) from {len(paths)} file(s), best of {rounds}\n")
+    print(f"{'backend':<8} {'parse':>10} {'log write':>10} {'speedup':>8}")
+
+    baseline = None
+    results = []
+    for name, (backend_loads, backend_dumps) in available_backends().items():
+        parse_times, write_times = [], []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            entries = []
+            for line in lines:
+                try:
+                    entries.append(backend_loads(line))
+                except json.JSONDecodeError:
+                    pass
+            parse_times.append(time.perf_counter() - start)
+
+            # Hooks rewrite their whole log array with indentation on every event
+            start = time.perf_counter()
+            backend_dumps(entries, True)
+            write_times.append(time.perf_counter() - start)
+
+        results.append((name, min(parse_times), min(write_times)))
+        if name == 'json':
+            baseline = min(parse_times) + min(write_times)
+
+    for name, parse_time, write_time in results:
+        speedup = baseline / (parse_time + write_time)
+        print(f"{name:<8} {parse_time * 1000:>8.1f}ms {write_time * 1000:>8.1f}ms {speedup:>7.1f}x")
+
+
+def main():
+    """Command line interface for the benchmark."""
+    if len(sys.argv) > 2 and sys.argv[1] == '--benchmark':
+        benchmark(sys.argv[2:])
+    else:
+        print(f"Active backend: {BACKEND}")
+        print("Usage: ./json_codec.py --benchmark transcript.jsonl [...]")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "requests",
+#     "python-dotenv",
+#     "anthropic",
+#     "openai",
+#     "elevenlabs",
+# ]
+# ///
+
+"""
+Latency benchmark for the LLM and TTS utils (utils/llm/*.py, utils/tts/*.py).
+
+Runs every util against local stand-ins served from this process: a fake
+Ollama with streamed tokens and fake Anthropic, OpenAI (chat and speech)
+and ElevenLabs endpoints, each answering after a configurable latency. The
+utils are pointed at them through OLLAMA_HOST, ANTHROPIC_BASE_URL,
+OPENAI_BASE_URL and ELEVENLABS_BASE_URL; the LLM prompt cache and the
+audio cache are bypassed so every iteration reaches the server.
+
+Two measurements per util:
+    cold   the script as a hook runs it (uv run ... --completion / --prewarm),
+           including interpreter start-up and imports
+    warm   the util's function called in-process with a reused client
+
+For each, the time to the server's first byte and the total time are
+reported as percentiles (p50, p90, p95, p99) in JSON. With --compare, the
+p50/p95 values are checked against an earlier report and the run fails if
+any grew by more than --tolerance.
+
+Usage:
+    ./latency_benchmark.py --iterations 50 --output bench.json
+    ./latency_benchmark.py --compare bench.json --tolerance 0.25
+    ./latency_benchmark.py --serve          # only run the stub servers
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+UTILS_DIR = Path(__file__).resolve().parent
+PERCENTILES = (50, 90, 95, 99)
+FAKE_MP3_CHUNK = b'\xff\xfb\x90\x64' + bytes(412)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers the Ollama, Anthropic, OpenAI and ElevenLabs endpoints the utils call."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _delay(self):
+        config = self.server.config
+        latency = config['latency_ms'] + random.uniform(-config['jitter_ms'], config['jitter_ms'])
+        time.sleep(max(0.0, latency) / 1000)
+
+    def _first_byte(self):
+        self.server.first_bytes.append(time.time())
+
+    def _json(self, body):
+        data = json.dumps(body).encode('utf-8')
+        self._delay()
+        self._first_byte()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, chunks, content_type):
+        self._delay()
+        self._first_byte()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(self.server.config['chunk_delay_ms'] / 1000)
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            body = {}
+        text = "All done, ready for the next task!"
+
+        try:
+            if self.path.startswith('/api/generate'):
+                if 'prompt' not in body:
+                    return self._json({'model': body.get('model'), 'response': '', 'done': True})
+                tokens = [word + ' ' for word in text.split()]
+                chunks = [json.dumps({'response': token, 'done': False}).encode() + b'\n' for token in tokens]
+                chunks.append(json.dumps({'response': '', 'done': True}).encode() + b'\n')
+                return self._stream(chunks, 'application/x-ndjson')
+            if self.path.endswith('/messages'):
+                return self._json({
+                    'id': 'msg_bench', 'type': 'message', 'role': 'assistant', 'model': body.get('model'),
+                    'content': [{'type': 'text', 'text': text}], 'stop_reason': 'end_turn',
+                    'stop_sequence': None, 'usage': {'input_tokens': 50, 'output_tokens': 8},
+                })
+            if self.path.endswith('/chat/completions'):
+                return self._json({
+                    'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': int(time.time()),
+                    'model': body.get('model'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': 50, 'completion_tokens': 8, 'total_tokens': 58},
+                })
+            if self.path.endswith('/audio/speech') or '/text-to-speech/' in self.path:
+                return self._stream([FAKE_MP3_CHUNK] * self.server.config['audio_chunks'], 'audio/mpeg')
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def start_stub_server(config: dict) -> ThreadingHTTPServer:
+    """Serve the stub endpoints on a free local port in a background thread."""
+    server = ThreadingHTTPServer(('127.0.0.1', config.get('port', 0)), StubHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.first_bytes = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stub_environment(server: ThreadingHTTPServer, cache_dir: str) -> dict:
+    """Environment pointing every util at the stub server, with caches bypassed."""
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return {
+        'OLLAMA_HOST': base,
+        'OLLAMA_KEEP_ALIVE': '5m',
+        'ANTHROPIC_API_KEY': 'bench',
+        'ANTHROPIC_BASE_URL': base,
+        'OPENAI_API_KEY': 'bench',
+        'OPENAI_DEV_PLATFORM_EDITOR': 'bench',
+        'OPENAI_BASE_URL': f"{base}/v1",
+        'ELEVENLABS_API_KEY': 'bench',
+        'ELEVENLABS_BASE_URL': base,
+        'LLM_CACHE': 'off',
+        'TTS_RESIDENT': 'false',
+        'XDG_CACHE_HOME': cache_dir,
+    }
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Summary statistics of latency samples, in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    summary = {
+        f"p{p}": round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000, 2)
+        for p in PERCENTILES
+    }
+    summary['min'] = round(ordered[0] * 1000, 2)
+    summary['max'] = round(ordered[-1] * 1000, 2)
+    summary['mean'] = round(sum(ordered) / len(ordered) * 1000, 2)
+    return summary
+
+
+def measure(server: ThreadingHTTPServer, call, iterations: int) -> dict:
+    """
+    Time `call(iteration)` repeatedly.
+
+    Returns:
+        dict: Percentiles of the first-byte and total latency plus the error count
+    """
+    first_byte, total, errors = [], [], 0
+    for iteration in range(iterations):
+        seen = len(server.first_bytes)
+        started = time.time()
+        try:
+            ok = call(iteration)
+        except Exception:
+            ok = False
+        finished = time.time()
+        if not ok:
+            errors += 1
+            continue
+        total.append(finished - started)
+        if len(server.first_bytes) > seen:
+            first_byte.append(server.first_bytes[seen] - started)
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'first_byte_ms': percentiles(first_byte),
+        'total_ms': percentiles(total),
+    }
+
+
+def runner() -> list[str]:
+    """How hooks run the scripts: uv when installed, else this interpreter."""
+    return ['uv', 'run', '--quiet'] if shutil.which('uv') else [sys.executable]
+
+
+def cold_call(script: Path, args, env: dict, workdir: str):
+    """A call running the script in a fresh process, as a hook does."""
+    def call(iteration):
+        arguments = args(iteration) if callable(args) else args
+        result = subprocess.run(
+            runner() + [str(script)] + arguments,
+            cwd=workdir, env=env, capture_output=True, timeout=60
+        )
+        return result.returncode == 0 and b'Error' not in result.stdout
+    return call
+
+
+def warm_calls() -> dict:
+    """In-process calls of each util, importing it once (so clients are reused)."""
+    for directory in ('llm', 'tts'):
+        path = str(UTILS_DIR / directory)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    def llm(module_name):
+        def call(iteration):
+            module = __import__(module_name)
+            return bool(module.prompt_llm(f"Benchmark prompt {iteration}"))
+        return call
+
+    def elevenlabs(iteration):
+        import elevenlabs_tts
+        client = elevenlabs_tts.get_client(os.environ['ELEVENLABS_API_KEY'])
+        return elevenlabs_tts.synthesize(client, f"Benchmark phrase {iteration} {time.time()}").exists()
+
+    loop = asyncio.new_event_loop()
+
+    def openai_speech(iteration):
+        import openai_tts
+        client = openai_tts.get_client(os.environ['OPENAI_DEV_PLATFORM_EDITOR'])
+        clip = loop.run_until_complete(openai_tts.synthesize(client, f"Benchmark phrase {iteration} {time.time()}"))
+        return clip.exists()
+
+    return {
+        'llm/ollama': llm('ollama'),
+        'llm/anth': llm('anth'),
+        'llm/oai': llm('oai'),
+        'tts/elevenlabs': elevenlabs,
+        'tts/openai': openai_speech,
+    }
+
+
+def cold_targets() -> dict:
+    """Scripts and arguments of each util as the hooks invoke them."""
+    def phrase(iteration):
+        return ['--prewarm', f"Benchmark phrase {iteration} {time.time()}"]
+
+    return {
+        'llm/ollama': (UTILS_DIR / 'llm' / 'ollama.py', ['--completion']),
+        'llm/anth': (UTILS_DIR / 'llm' / 'anth.py', ['--completion']),
+        'llm/oai': (UTILS_DIR / 'llm' / 'oai.py', ['--completion']),
+        'tts/elevenlabs': (UTILS_DIR / 'tts' / 'elevenlabs_tts.py', phrase),
+        'tts/openai': (UTILS_DIR / 'tts' / 'openai_tts.py', phrase),
+        'tts/pyttsx3': (UTILS_DIR / 'tts' / 'pyttsx3_tts.py', phrase),
+    }
+
+
+def run(args) -> dict:
+    """Run the benchmark and return the report."""
+    config = {
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'chunk_delay_ms': args.chunk_delay_ms,
+        'audio_chunks': args.audio_chunks,
+    }
+    server = start_stub_server(config)
+    selected = [name.strip() for name in args.only.split(',')] if args.only else None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        stub_env = stub_environment(server, workdir)
+        os.environ.update(stub_env)
+        env = {**os.environ, **stub_env}
+        results = {}
+
+        for name, (script, script_args) in cold_targets().items():
+            if selected and name not in selected:
+                continue
+            print(f"cold  {name} ...", file=sys.stderr)
+            results.setdefault(name, {})['cold'] = measure(
+                server, cold_call(script, script_args, env, workdir), args.cold_iterations
+            )
+
+        for name, call in warm_calls().items():
+            if selected and name not in selected:
+                continue
+            print(f"warm  {name} ...", file=sys.stderr)
+            try:
+                call(-1)  # Import the util and open its connection outside the timing
+            except Exception as e:
+                results.setdefault(name, {})['warm'] = {'iterations': 0, 'errors': 1, 'error': str(e)}
+                continue
+            results.setdefault(name, {})['warm'] = measure(server, call, args.iterations)
+
+    server.shutdown()
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': sys.version.split()[0],
+        'runner': runner()[0],
+        'stub': config,
+        'results': results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Find p50/p95 latencies that grew by more than `tolerance` since the baseline.
+
+    Returns:
+        list[str]: One line per regression
+    """
+    regressions = []
+    for name, modes in report['results'].items():
+        for mode, result in modes.items():
+            before = baseline.get('results', {}).get(name, {}).get(mode)
+            if not before:
+                continue
+            for metric in ('first_byte_ms', 'total_ms'):
+                for percentile in ('p50', 'p95'):
+                    old = before.get(metric, {}).get(percentile)
+                    new = result.get(metric, {}).get(percentile)
+                    if old and new and new > old * (1 + tolerance):
+                        regressions.append(
+                            f"{name} {mode} {metric} {percentile}: {old:.1f} -> {new:.1f} ms (+{(new / old - 1) * 100:.0f}%)"
+                        )
+    return regressions
+
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description='Benchmark the LLM and TTS utils against local stub servers')
+    parser.add_argument('--iterations', type=int, default=20, help='In-process calls per util (default: 20)')
+    parser.add_argument('--cold-iterations', type=int, default=5, help='Script runs per util (default: 5)')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Stub time to first byte (default: 50)')
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help='Random +/- variation of the latency (default: 10)')
+    parser.add_argument('--chunk-delay-ms', type=float, default=5.0, help='Delay between streamed chunks (default: 5)')
+    parser.add_argument('--audio-chunks', type=int, default=20, help='Chunks per synthesized clip (default: 20)')
+    parser.add_argument('--only', help='Comma-separated utils to run (e.g. llm/ollama,tts/openai)')
+    parser.add_argument('--output', help='Write the JSON report to a file instead of stdout')
+    parser.add_argument('--compare', help='Earlier JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p50/p95 growth for --compare (default: 0.2)')
+    parser.add_argument('--serve', action='store_true', help='Only run the stub servers (port 11435)')
+    args = parser.parse_args()
+
+    if args.serve:
+        server = start_stub_server({
+            'port': 11435, 'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms,
+            'chunk_delay_ms': args.chunk_delay_ms, 'audio_chunks': args.audio_chunks,
+        })
+        print(json.dumps(stub_environment(server, tempfile.gettempdir()), indent=2))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
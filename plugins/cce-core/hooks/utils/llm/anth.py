@@ -11,6 +11,22 @@ import os
 import sys
 from dotenv import load_dotenv
 
+import prompt_cache
+
+MODEL = "claude-3-5-haiku-20241022"  # Fastest Anthropic model
+
+# Reused by every request of this process (keeps the HTTP connection pool warm)
+_client = None
+
+
+def get_client(api_key):
+    """Return the process-wide Anthropic client."""
+    global _client
+    if _client is None:
+        import anthropic
+        _client = anthropic.Anthropic(api_key=api_key)
+    return _client
+
 
 def prompt_llm(prompt_text):
     """
@@ -28,34 +44,46 @@ def prompt_llm(prompt_text):
     if not api_key:
         return None
 
-    try:
-        import anthropic
+    def generate():
+        try:
+            client = get_client(api_key)
 
-        client = anthropic.Anthropic(api_key=api_key)
+            message = client.messages.create(
+                model=MODEL,
+                max_tokens=100,
+                temperature=0.7,
+                messages=[{"role": "user", "content": prompt_text}],
+            )
 
-        message = client.messages.create(
-            model="claude-3-5-haiku-20241022",  # Fastest Anthropic model
-            max_tokens=100,
-            temperature=0.7,
-            messages=[{"role": "user", "content": prompt_text}],
-        )
+            return message.content[0].text.strip()
 
-        return message.content[0].text.strip()
+        except Exception:
+            return None
 
-    except Exception:
-        return None
+    return prompt_cache.cached("anthropic", MODEL, prompt_text, generate)
 
 
-def generate_completion_message():
+def generate_completion_message(engineer_name=None, personalized=None):
     """
     Generate a completion message using Anthropic LLM.
 
+    Args:
+        engineer_name (str): Name to address (default: ENGINEER_NAME)
+        personalized (bool): Always (True) or never (False) include the name;
+            None lets the model include it about 30% of the time
+
     Returns:
         str: A natural language completion message, or None if error
     """
-    engineer_name = os.getenv("ENGINEER_NAME", "").strip()
-
-    if engineer_name:
+    if engineer_name is None:
+        engineer_name = os.getenv("ENGINEER_NAME", "").strip()
+    if personalized is False:
+        engineer_name = ""
+
+    if engineer_name and personalized:
+        name_instruction = f"Always include the engineer's name '{engineer_name}' in a natural way."
+        examples = f"""Examples of the style: "{engineer_name}, all set!", "Ready for you, {engineer_name}!", "Complete, {engineer_name}!", "{engineer_name}, we're done!" """
+    elif engineer_name:
         name_instruction = f"Sometimes (about 30% of the time) include the engineer's name '{engineer_name}' in a natural way."
         examples = f"""Examples of the style: 
 - Standard: "Work complete!", "All done!", "Task finished!", "Ready for your next move!"
@@ -0,0 +1,251 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#     "requests",
+#     "python-dotenv",
+#     "anthropic",
+#     "openai",
+# ]
+# ///
+
+"""
+Pool of pre-generated completion messages for the Stop and SubagentStop hooks.
+
+Generating a phrase with an LLM takes seconds, so the hooks pop a ready-made
+message from a pool file instead and, when a pool runs low, start a detached
+refill that asks the fastest available LLM (see router.py) for more. An empty
+pool falls back to the hook's fixed messages, so a hook never waits for the
+LLM. When a refill cannot generate anything (no LLM reachable), no new one is
+started for REFILL_BACKOFF seconds.
+
+Pools (one list per kind) are stored in
+$XDG_CACHE_HOME/claude-code-extensions/message_pool.json:
+
+    completion              Stop
+    subagent                SubagentStop
+    personalized:<name>     Stop, addressing ENGINEER_NAME
+
+Usage:
+    ./message_pool.py --refill completion
+    ./message_pool.py --show
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+POOL_SIZE = 20
+LOW_WATER = 5
+MAX_FAILED_GENERATIONS = 3
+REFILL_BACKOFF = 600  # Seconds between refills after one generated nothing
+
+
+def cache_dir():
+    """Directory holding the pool, under XDG_CACHE_HOME."""
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'claude-code-extensions'
+
+
+def pool_file():
+    return cache_dir() / 'message_pool.json'
+
+
+def completion_kind(engineer_name=None):
+    """Pick the pool for a Stop message, personalized about 30% of the time."""
+    if engineer_name and random.random() < 0.3:
+        return f"personalized:{engineer_name}"
+    return 'completion'
+
+
+class FileLock:
+    """Exclusive lock on a file for a read-modify-write of the pool."""
+
+    def __init__(self, path, blocking=True):
+        self.path = path
+        self.blocking = blocking
+        self.file = None
+        self.acquired = False
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, 'a+')
+        if fcntl is None:
+            self.acquired = True
+            return self
+        flags = fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(self.file, flags)
+            self.acquired = True
+        except OSError:
+            self.acquired = False
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+
+def _load():
+    try:
+        with open(pool_file(), 'r') as f:
+            pools = json.load(f)
+            return pools if isinstance(pools, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        return {}
+
+
+def _save(pools):
+    path = pool_file()
+    tmp_path = path.parent / f".{path.name}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(pools, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def pop_message(kind):
+    """
+    Take one message from a pool, starting a background refill when it runs low.
+
+    Args:
+        kind: Pool name ('completion', 'subagent' or 'personalized:<name>')
+
+    Returns:
+        str: A message, or None if the pool is empty (the caller uses its fallback)
+    """
+    try:
+        with FileLock(cache_dir() / 'message_pool.lock'):
+            pools = _load()
+            messages = pools.get(kind, [])
+            message = messages.pop(0) if messages else None
+            if message is not None:
+                _save(pools)
+        if len(messages) < LOW_WATER:
+            spawn_refill(kind)
+        return message
+    except OSError:
+        return None
+
+
+def _failed_marker(kind):
+    """File whose mtime records the last refill of a kind that generated nothing."""
+    return cache_dir() / f'refill-{_safe(kind)}.failed'
+
+
+def spawn_refill(kind):
+    """
+    Start a detached refill of a pool unless one is already running, or the
+    last one failed less than REFILL_BACKOFF seconds ago.
+    """
+    try:
+        if time.time() - _failed_marker(kind).stat().st_mtime < REFILL_BACKOFF:
+            return
+    except OSError:
+        pass  # No failed refill recorded
+
+    with FileLock(cache_dir() / f'refill-{_safe(kind)}.lock', blocking=False) as lock:
+        if not lock.acquired:
+            return  # A refill holds the lock
+
+    kwargs = {}
+    if os.name == 'posix':
+        kwargs['start_new_session'] = True
+    else:
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    try:
+        subprocess.Popen(
+            ["uv", "run", str(Path(__file__).resolve()), "--refill", kind],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            **kwargs
+        )
+    except OSError:
+        pass
+
+
+def _safe(kind):
+    return ''.join(char if char.isalnum() else '_' for char in kind)
+
+
+def _generate(kind):
+    """Ask the fastest available LLM for one message of a kind (runs in the refill process)."""
+    import router
+
+    if kind == 'subagent':
+        return router.generate('generate_subagent_completion_message')
+    if kind.startswith('personalized:'):
+        return router.generate('generate_completion_message', engineer_name=kind.split(':', 1)[1], personalized=True)
+    return router.generate('generate_completion_message', personalized=False)
+
+
+def refill(kind, size=POOL_SIZE):
+    """
+    Top a pool up to `size` messages with freshly generated ones.
+
+    Returns:
+        int: Number of messages added
+    """
+    with FileLock(cache_dir() / f'refill-{_safe(kind)}.lock', blocking=False) as lock:
+        if not lock.acquired:
+            return 0
+
+        # Ask the LLM every time (the prompt cache would repeat its variants), but store the answers
+        if os.getenv('LLM_CACHE', 'on').strip().lower() != 'off':
+            os.environ['LLM_CACHE'] = 'refresh'
+
+        with FileLock(cache_dir() / 'message_pool.lock'):
+            existing = list(_load().get(kind, []))
+
+        fresh = []
+        failures = 0
+        while len(existing) + len(fresh) < size and failures < MAX_FAILED_GENERATIONS:
+            message = _generate(kind)
+            if not message or message in existing or message in fresh:
+                failures += 1
+                continue
+            fresh.append(message)
+
+        if fresh:
+            with FileLock(cache_dir() / 'message_pool.lock'):
+                pools = _load()
+                pools[kind] = pools.get(kind, []) + fresh
+                _save(pools)
+
+        # Hooks stop spawning refills for a while after one that generated nothing
+        marker = _failed_marker(kind)
+        try:
+            if fresh or len(existing) >= size:
+                marker.unlink(missing_ok=True)
+            else:
+                marker.touch()
+        except OSError:
+            pass
+        return len(fresh)
+
+
+def main():
+    """Command line interface for refilling and inspecting the pools."""
+    if len(sys.argv) > 2 and sys.argv[1] == '--refill':
+        added = refill(sys.argv[2])
+        print(f"Added {added} message(s) to '{sys.argv[2]}'")
+    elif len(sys.argv) > 1 and sys.argv[1] == '--show':
+        for kind, messages in _load().items():
+            print(f"{kind} ({len(messages)}):")
+            for message in messages:
+                print(f"  {message}")
+    else:
+        print("Usage: ./message_pool.py --refill <completion|subagent|personalized:NAME> or ./message_pool.py --show")
+
+
+if __name__ == '__main__':
+    main()
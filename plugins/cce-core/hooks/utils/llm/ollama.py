@@ -7,63 +7,161 @@
 # ]
 # ///
 
+"""
+Ollama client for short completion phrases from a local model.
+
+Model residency is managed explicitly: every request asks Ollama to keep the
+model loaded for OLLAMA_KEEP_ALIVE (default 30m), and SessionStart preloads
+it (--preload) so the first Stop of a session does not pay the load time.
+Responses are streamed and, for one-line phrases, the request is closed as
+soon as the first line is complete. Within one process (e.g. a message pool
+refill) requests share a pooled HTTP session. Responses are cached (see
+prompt_cache.py).
+
+Environment Variables:
+    OLLAMA_HOST: Ollama server (default: http://localhost:11434)
+    OLLAMA_MODEL: Model name (default: qwen3:0.6b)
+    OLLAMA_KEEP_ALIVE: How long Ollama keeps the model loaded (default: 30m)
+"""
+
 import os
 import sys
 import json
 import requests
 from dotenv import load_dotenv
 
+import prompt_cache
+
+DEFAULT_HOST = "http://localhost:11434"
+DEFAULT_MODEL = "qwen3:0.6b"
+DEFAULT_KEEP_ALIVE = "30m"
+
+# Reused by every request of this process (keep-alive connection pool)
+_session = None
+
+
+def get_session():
+    """Return the process-wide HTTP session."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+def ollama_url(path):
+    """Build an API URL from OLLAMA_HOST (which may omit the scheme or port)."""
+    host = os.getenv("OLLAMA_HOST", "").strip() or DEFAULT_HOST
+    if "://" not in host:
+        host = f"http://{host}"
+    if host.startswith("http://") and host.count(":") < 2:
+        host = f"{host}:11434"
+    return f"{host.rstrip('/')}{path}"
 
-def prompt_llm(prompt_text):
+
+def model_name():
+    return os.getenv("OLLAMA_MODEL", "").strip() or DEFAULT_MODEL
+
+
+def keep_alive():
+    return os.getenv("OLLAMA_KEEP_ALIVE", "").strip() or DEFAULT_KEEP_ALIVE
+
+
+def preload_model(timeout=60):
+    """
+    Load the model into memory and keep it resident for OLLAMA_KEEP_ALIVE.
+
+    A generate request without a prompt only loads the model.
+
+    Returns:
+        bool: True if the model is loaded
+    """
+    try:
+        response = get_session().post(
+            ollama_url("/api/generate"),
+            json={"model": model_name(), "keep_alive": keep_alive()},
+            timeout=timeout
+        )
+        return response.status_code == 200
+    except requests.RequestException:
+        return False
+
+
+def prompt_llm(prompt_text, first_line=False, timeout=5):
     """
     Base Ollama LLM prompting method using local Qwen3 model.
 
     Args:
         prompt_text (str): The prompt to send to the model
+        first_line (bool): Return as soon as the first non-empty line is complete
+        timeout (float): Seconds to wait for the connection and between streamed chunks
 
     Returns:
         str: The model's response text, or None if error
     """
-    try:
-        # Ollama API endpoint (default local)
-        url = "http://localhost:11434/api/generate"
-        
-        payload = {
-            "model": "qwen3:0.6b",
-            "prompt": prompt_text,
-            "stream": False,
-            "think": False,
-            "options": {
-                "temperature": 0.7,
-                "num_predict": 50,
-                "top_p": 0.9,
-            }
+    payload = {
+        "model": model_name(),
+        "prompt": prompt_text,
+        "stream": True,
+        "think": False,
+        "keep_alive": keep_alive(),
+        "options": {
+            "temperature": 0.7,
+            "num_predict": 50,
+            "top_p": 0.9,
         }
-        
-        response = requests.post(url, json=payload, timeout=5)
-        
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("response", "").strip()
-    
-    except (requests.RequestException, KeyError, ValueError, json.JSONDecodeError):
-        pass
-    
-    return None
+    }
 
+    def generate():
+        try:
+            with get_session().post(ollama_url("/api/generate"), json=payload, timeout=timeout, stream=True) as response:
+                if response.status_code != 200:
+                    return None
 
-def generate_completion_message():
+                text = ""
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    text += chunk.get("response", "")
+                    # Stop generating once the first line is complete
+                    if first_line and "\n" in text.lstrip():
+                        return text.lstrip().split("\n", 1)[0].strip()
+                    if chunk.get("done"):
+                        break
+                return text.strip()
+
+        except (requests.RequestException, KeyError, ValueError, json.JSONDecodeError):
+            pass
+
+        return None
+
+    options = {"first_line": True} if first_line else None
+    return prompt_cache.cached("ollama", model_name(), prompt_text, generate, options)
+
+
+def generate_completion_message(engineer_name=None, personalized=None):
     """
     Generate a completion message using Ollama LLM.
 
+    Args:
+        engineer_name (str): Name to address (default: ENGINEER_NAME)
+        personalized (bool): Always (True) or never (False) include the name;
+            None lets the model include it about 30% of the time
+
     Returns:
         str: A natural language completion message, or None if error
     """
     load_dotenv()
     
-    engineer_name = os.getenv("ENGINEER_NAME", "").strip()
+    if engineer_name is None:
+        engineer_name = os.getenv("ENGINEER_NAME", "").strip()
+    if personalized is False:
+        engineer_name = ""
 
-    if engineer_name:
+    if engineer_name and personalized:
+        name_instruction = f"Always include the engineer's name '{engineer_name}' at the BEGINNING of the message, never at the end."
+        examples = f"""Examples of the style: "{engineer_name}, all set!", "{engineer_name}, we're done!", "{engineer_name}, task complete!", "{engineer_name}, ready!" """
+    elif engineer_name:
         name_instruction = f"Sometimes (about 30% of the time) include the engineer's name '{engineer_name}' at the BEGINNING of the message only, never at the end."
         examples = f"""Examples of the style: 
 - Standard: "Work complete!", "All done!", "Task finished!", "Ready for your next move!"
@@ -87,7 +185,7 @@ Requirements:
 
 Generate ONE completion message:"""
 
-    response = prompt_llm(prompt)
+    response = prompt_llm(prompt, first_line=True)
 
     # Clean up response - remove quotes and extra formatting
     if response:
@@ -153,7 +251,7 @@ Requirements:
 
 Generate ONE completion message:"""
 
-    response = prompt_llm(prompt)
+    response = prompt_llm(prompt, first_line=True)
 
     # Clean up response - remove quotes and extra formatting
     if response:
@@ -169,7 +267,12 @@ Generate ONE completion message:"""
 def main():
     """Command line interface for testing."""
     if len(sys.argv) > 1:
-        if sys.argv[1] == "--completion":
+        if sys.argv[1] == "--preload":
+            if preload_model():
+                print(f"Loaded {model_name()} (keep_alive {keep_alive()})")
+            else:
+                print("Error preloading Ollama model")
+        elif sys.argv[1] == "--completion":
             message = generate_completion_message()
             if message:
                 print(message)
@@ -193,7 +296,7 @@ def main():
             else:
                 print("Error calling Ollama API")
     else:
-        print("Usage: ./ollama.py 'your prompt here' or ./ollama.py --completion or ./ollama.py --subagent-completion [subagent_name] [task_info]")
+        print("Usage: ./ollama.py 'your prompt here' or ./ollama.py --preload or ./ollama.py --completion or ./ollama.py --subagent-completion [subagent_name] [task_info]")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+"""
+Persistent prompt/response cache shared by the LLM utils.
+
+Responses are stored in SQLite at
+$XDG_CACHE_HOME/claude-code-extensions/llm_cache.sqlite3, keyed by provider,
+model and the prompt with whitespace normalized. To keep short phrases from
+repeating, each key collects up to LLM_CACHE_VARIANTS responses; until the
+LLM has answered that often a lookup misses (so it adds another variant),
+afterwards a random variant is returned. Entries expire after LLM_CACHE_TTL seconds, and the
+least recently used are evicted beyond LLM_CACHE_MAX_ENTRIES.
+
+Environment Variables:
+    LLM_CACHE: 'on' (default), 'off', or 'refresh' (always ask the LLM, store the answer)
+    LLM_CACHE_TTL: Seconds a response stays valid (default: 604800, one week)
+    LLM_CACHE_VARIANTS: Responses collected per prompt (default: 5)
+    LLM_CACHE_MAX_ENTRIES: Responses kept in total (default: 2000)
+
+Usage:
+    ./prompt_cache.py --stats
+    ./prompt_cache.py --clear
+"""
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from contextlib import closing
+
+from message_pool import cache_dir
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_VARIANTS = 5
+DEFAULT_MAX_ENTRIES = 2000
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def cache_mode():
+    mode = os.getenv('LLM_CACHE', 'on').strip().lower()
+    return mode if mode in ('on', 'off', 'refresh') else 'on'
+
+
+def cache_key(provider, model, prompt_text, options=None):
+    """Key of a prompt: provider, model, options affecting the answer and the prompt with whitespace collapsed."""
+    normalized = ' '.join(prompt_text.split())
+    return hashlib.sha256(
+        json.dumps([provider, model, options or {}, normalized], sort_keys=True).encode('utf-8')
+    ).hexdigest()
+
+
+def _connect():
+    directory = cache_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(str(directory / 'llm_cache.sqlite3'), timeout=2)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute(
+        'CREATE TABLE IF NOT EXISTS responses ('
+        ' key TEXT NOT NULL, response TEXT NOT NULL,'
+        ' provider TEXT, model TEXT, created REAL NOT NULL, last_used REAL NOT NULL,'
+        ' answers INTEGER NOT NULL DEFAULT 1,'
+        ' PRIMARY KEY (key, response))'
+    )
+    connection.execute('CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)')
+    return connection
+
+
+def get(provider, model, prompt_text, options=None):
+    """
+    Look up a cached response.
+
+    Returns:
+        str: One of the cached variants, or None on a miss (or while the LLM
+            answered fewer than LLM_CACHE_VARIANTS times)
+    """
+    if cache_mode() != 'on':
+        return None
+    key = cache_key(provider, model, prompt_text, options)
+    now = time.time()
+    try:
+        with closing(_connect()) as connection, connection:
+            connection.execute(
+                'DELETE FROM responses WHERE key = ? AND created < ?',
+                (key, now - _env_int('LLM_CACHE_TTL', DEFAULT_TTL))
+            )
+            rows = connection.execute('SELECT response, answers FROM responses WHERE key = ?', (key,)).fetchall()
+            # A model that keeps giving the same answer counts towards the variants too
+            if not rows or sum(answers for _, answers in rows) < _env_int('LLM_CACHE_VARIANTS', DEFAULT_VARIANTS):
+                return None
+            response = random.choice(rows)[0]
+            connection.execute(
+                'UPDATE responses SET last_used = ? WHERE key = ? AND response = ?',
+                (now, key, response)
+            )
+            return response
+    except sqlite3.Error:
+        return None
+
+
+def put(provider, model, prompt_text, response, options=None):
+    """Store a response as one of the variants of a prompt and evict the least recently used."""
+    if not response or cache_mode() == 'off':
+        return
+    key = cache_key(provider, model, prompt_text, options)
+    now = time.time()
+    try:
+        with closing(_connect()) as connection, connection:
+            connection.execute(
+                'INSERT INTO responses (key, response, provider, model, created, last_used) VALUES (?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT (key, response) DO UPDATE SET'
+                ' created = excluded.created, last_used = excluded.last_used, answers = answers + 1',
+                (key, response, provider, model, now, now)
+            )
+            # Keep only the newest variants of this prompt
+            connection.execute(
+                'DELETE FROM responses WHERE key = ? AND rowid NOT IN'
+                ' (SELECT rowid FROM responses WHERE key = ? ORDER BY created DESC LIMIT ?)',
+                (key, key, _env_int('LLM_CACHE_VARIANTS', DEFAULT_VARIANTS))
+            )
+            connection.execute(
+                'DELETE FROM responses WHERE rowid IN'
+                ' (SELECT rowid FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (_env_int('LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),)
+            )
+    except sqlite3.Error:
+        pass
+
+
+def cached(provider, model, prompt_text, generate, options=None):
+    """
+    Return a cached response for a prompt, or generate and store one.
+
+    Args:
+        provider: Provider name ('ollama', 'anthropic', 'openai')
+        model: Model name
+        prompt_text: The prompt
+        generate: Callable returning the LLM's response (or None on error)
+        options: Request options that change the response (part of the key)
+
+    Returns:
+        str: The response, or None if the LLM failed
+    """
+    response = get(provider, model, prompt_text, options)
+    if response is not None:
+        return response
+    response = generate()
+    put(provider, model, prompt_text, response, options)
+    return response
+
+
+def main():
+    """Command line interface for inspecting the cache."""
+    if len(sys.argv) > 1 and sys.argv[1] == '--stats':
+        with closing(_connect()) as connection, connection:
+            rows = connection.execute(
+                'SELECT provider, model, COUNT(DISTINCT key), COUNT(*) FROM responses GROUP BY provider, model'
+            ).fetchall()
+        for provider, model, prompts, responses in rows:
+            print(f"{provider:<10} {model:<28} {prompts:>5} prompts  {responses:>6} responses")
+        if not rows:
+            print("Cache is empty")
+    elif len(sys.argv) > 1 and sys.argv[1] == '--clear':
+        with closing(_connect()) as connection, connection:
+            connection.execute('DELETE FROM responses')
+        print("Cache cleared")
+    else:
+        print("Usage: ./prompt_cache.py --stats or ./prompt_cache.py --clear")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#     "requests",
+#     "python-dotenv",
+#     "anthropic",
+#     "openai",
+# ]
+# ///
+
+"""
+Latency-aware router across the LLM utils (ollama.py, anth.py, oai.py).
+
+Instead of a fixed priority, each call goes to the fastest healthy provider,
+judged by the recent latencies and failures recorded in
+$XDG_CACHE_HOME/claude-code-extensions/llm_router.json. A provider that
+failed MAX_FAILURES times in a row is skipped for FAILURE_COOLDOWN seconds.
+In race mode the two best providers are asked at once and the first answer
+wins. Either way the call gives up at the deadline.
+
+Providers without an API key (ANTHROPIC_API_KEY, OPENAI_API_KEY) or without
+the requested generator are not considered. Clients are created once per
+process, so a long-lived caller such as the message pool refill reuses them.
+
+Environment Variables:
+    LLM_ROUTER_MODE: 'fastest' (default) or 'race'
+    LLM_ROUTER_DEADLINE: Seconds before giving up (default: 8)
+
+Usage:
+    ./router.py 'your prompt here'
+    ./router.py --completion
+    ./router.py --status
+"""
+
+import importlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from message_pool import FileLock, cache_dir
+
+PROVIDERS = {
+    # module, API key variable, latency assumed before any call was measured
+    'ollama': ('ollama', None, 1.0),
+    'anthropic': ('anth', 'ANTHROPIC_API_KEY', 2.0),
+    'openai': ('oai', 'OPENAI_API_KEY', 2.0),
+}
+
+LATENCY_WINDOW = 10
+MAX_FAILURES = 3
+FAILURE_COOLDOWN = 300
+DEFAULT_DEADLINE = 8.0
+
+
+def state_file():
+    return cache_dir() / 'llm_router.json'
+
+
+def load_state():
+    """Recent latencies and failures per provider."""
+    try:
+        with open(state_file(), 'r') as f:
+            state = json.load(f)
+            return state if isinstance(state, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        return {}
+
+
+def record(provider, latency=None, ok=True):
+    """
+    Record the outcome of a call.
+
+    Args:
+        provider: Provider name
+        latency: Seconds the call took (successful calls)
+        ok: Whether the call produced an answer
+    """
+    try:
+        with FileLock(cache_dir() / 'llm_router.lock'):
+            state = load_state()
+            stats = state.setdefault(provider, {'latencies': [], 'failures': 0, 'last_failure': 0})
+            if ok:
+                stats['latencies'] = (stats['latencies'] + [round(latency, 3)])[-LATENCY_WINDOW:]
+                stats['failures'] = 0
+            else:
+                stats['failures'] += 1
+                stats['last_failure'] = time.time()
+
+            path = state_file()
+            tmp_path = path.parent / f".{path.name}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def healthy(stats, now=None):
+    """A provider is healthy unless it keeps failing and is still cooling down."""
+    now = time.time() if now is None else now
+    return stats.get('failures', 0) < MAX_FAILURES or now - stats.get('last_failure', 0) > FAILURE_COOLDOWN
+
+
+def expected_latency(provider, stats):
+    """Median of the recent latencies, or the provider's prior."""
+    latencies = sorted(stats.get('latencies', []))
+    if not latencies:
+        return PROVIDERS[provider][2]
+    return latencies[len(latencies) // 2]
+
+
+def ranked_providers(function_name):
+    """
+    Providers able to run a generator, fastest healthy first.
+
+    Unhealthy providers are kept at the end as a last resort.
+    """
+    state = load_state()
+    candidates = []
+    for provider, (module_name, key_variable, _) in PROVIDERS.items():
+        if key_variable and not os.getenv(key_variable):
+            continue
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        if not hasattr(module, function_name):
+            continue
+        stats = state.get(provider, {})
+        candidates.append((not healthy(stats), expected_latency(provider, stats), provider, module))
+    candidates.sort(key=lambda candidate: candidate[:2])
+    return [(provider, module) for _, _, provider, module in candidates]
+
+
+def _timed_call(provider, function, args, kwargs):
+    start = time.monotonic()
+    try:
+        result = function(*args, **kwargs)
+    except Exception:
+        result = None
+    if result:
+        record(provider, time.monotonic() - start)
+    else:
+        record(provider, ok=False)
+    return result
+
+
+def generate(function_name, *args, deadline=None, mode=None, **kwargs):
+    """
+    Run a generator (e.g. 'generate_completion_message') on the best provider.
+
+    Args:
+        function_name: Function every LLM util may define
+        *args, **kwargs: Passed to the function
+        deadline: Seconds before giving up (default: LLM_ROUTER_DEADLINE)
+        mode: 'fastest' tries providers in order, 'race' asks the two best at
+            once (default: LLM_ROUTER_MODE)
+
+    Returns:
+        str: The first answer, or None if no provider answered in time
+    """
+    if deadline is None:
+        deadline = float(os.getenv('LLM_ROUTER_DEADLINE', DEFAULT_DEADLINE))
+    mode = mode or os.getenv('LLM_ROUTER_MODE', 'fastest')
+    providers = ranked_providers(function_name)
+    if not providers:
+        return None
+
+    end = time.monotonic() + deadline
+    width = 2 if mode == 'race' else 1
+    answers = queue.Queue()
+
+    def call(provider, function):
+        answers.put(_timed_call(provider, function, args, kwargs))
+
+    # Calls run in daemon threads: one that misses the deadline is abandoned
+    # and does not keep the process alive once the caller is done
+    waiting = list(providers)
+    pending = 0
+    while waiting or pending:
+        while waiting and pending < width:
+            provider, module = waiting.pop(0)
+            threading.Thread(
+                target=call, args=(provider, getattr(module, function_name)),
+                name=f"llm-{provider}", daemon=True
+            ).start()
+            pending += 1
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return None
+        try:
+            answer = answers.get(timeout=remaining)
+        except queue.Empty:
+            return None
+        pending -= 1
+        if answer:
+            return answer
+    return None
+
+
+def prompt_llm(prompt_text, deadline=None, mode=None):
+    """Send a raw prompt to the best provider."""
+    return generate('prompt_llm', prompt_text, deadline=deadline, mode=mode)
+
+
+def main():
+    """Command line interface for testing."""
+    if len(sys.argv) > 1:
+        if sys.argv[1] == "--status":
+            state = load_state()
+            for provider in PROVIDERS:
+                stats = state.get(provider, {})
+                status = 'healthy' if healthy(stats) else 'cooling down'
+                print(f"{provider:<10} {expected_latency(provider, stats):>6.2f}s  {status}  ({len(stats.get('latencies', []))} samples)")
+        elif sys.argv[1] == "--completion":
+            message = generate('generate_completion_message')
+            print(message or "Error generating completion message")
+        else:
+            response = prompt_llm(" ".join(sys.argv[1:]))
+            print(response or "Error: no LLM provider answered")
+    else:
+        print("Usage: ./router.py 'your prompt here' or ./router.py --completion or ./router.py --status")
+
+
+if __name__ == "__main__":
+    main()
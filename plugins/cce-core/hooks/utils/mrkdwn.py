@@ -0,0 +1,320 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+
+"""
+Single-pass Markdown to Slack mrkdwn converter.
+
+Walks the text line by line, tracking fenced code blocks and tables, and
+converts the inline syntax of each line with one precompiled tokenizer
+regex. Code (fenced and inline) is never reformatted.
+
+    Markdown                  mrkdwn
+    **bold** / __bold__       *bold*
+    *italic*                  _italic_
+    ***both***                *_both_*
+    ~~strike~~                ~strike~
+    [text](url)               <url|text>
+    <https://url>             <https://url>
+    # Header                  *Header*
+    - item / * item           • item
+    ```lang                   ``` (Slack ignores the language)
+    | a | b | tables          aligned columns in a code block
+
+&, < and > are escaped everywhere, as Slack requires. Every code block is
+closed with ```, so runs of backticks inside a fenced block (e.g. within a
+~~~ fence) are broken up with zero-width spaces to keep it from ending early.
+
+Benchmark on real transcripts (assistant messages) or on a generated response:
+    ./mrkdwn.py --benchmark ~/.claude/projects/my-project/*.jsonl
+
+Check the converter against the golden files in fixtures/mrkdwn (each
+<name>.md input next to its expected <name>.mrkdwn output), or rewrite the
+expected outputs after an intended change:
+    ./mrkdwn.py --check
+    ./mrkdwn.py --update
+"""
+
+import difflib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+FENCE = re.compile(r'^(\s*)(```|~~~)')
+HEADER = re.compile(r'^#{1,6}\s+(.+?)\s*#*\s*$')
+BULLET = re.compile(r'^(\s*)[-*+]\s+')
+TABLE_ROW = re.compile(r'^\s*\|.*\|\s*$')
+TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+
+# One alternation per inline construct; the group that matched selects the conversion
+INLINE = re.compile(
+    r'(?P<code>`+)(?P<code_text>.+?)(?P=code)'
+    r'|\[(?P<link_text>[^\]]+)\]\((?P<url>[^)\s]+)(?:\s+"[^"]*")?\)'
+    r'|\*\*\*(?P<bold_italic>.+?)\*\*\*'
+    r'|\*\*(?P<bold>.+?)\*\*'
+    r'|__(?P<bold2>.+?)__'
+    r'|~~(?P<strike>.+?)~~'
+    r'|(?<![\w*])\*(?![\s*])(?P<italic>.+?)(?<![\s*])\*(?![\w*])'
+    r'|<(?P<autolink>(?:https?|mailto):[^\s<>]+)>'
+    r'|(?P<escape>[&<>])'
+)
+
+ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;'}
+
+# Backtick runs that Slack would read as the end of a code block
+BACKTICK_RUN = re.compile(r'`{3,}')
+ZERO_WIDTH_SPACE = '\u200b'
+
+# Lines without any of these characters need no inline conversion
+HAS_INLINE = re.compile(r'[`\[*_~&<>]').search
+
+# Slack cannot nest bold inside a bold header
+HEADER_BOLD = re.compile(r'\*\*|__')
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures' / 'mrkdwn'
+
+
+def escape(text: str) -> str:
+    """Escape the characters Slack treats as control sequences."""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _inline(match) -> str:
+    kind = match.lastgroup
+    if kind == 'code_text':
+        return f"{match['code']}{escape(match['code_text'])}{match['code']}"
+    if kind in ('link_text', 'url'):
+        return f"<{escape(match['url'])}|{convert_inline(match['link_text'])}>"
+    if kind == 'bold_italic':
+        return f"*_{convert_inline(match['bold_italic'])}_*"
+    if kind in ('bold', 'bold2'):
+        return f"*{convert_inline(match[kind])}*"
+    if kind == 'strike':
+        return f"~{convert_inline(match['strike'])}~"
+    if kind == 'italic':
+        return f"_{convert_inline(match['italic'])}_"
+    if kind == 'autolink':
+        return f"<{escape(match['autolink'])}>"
+    return ESCAPES[match['escape']]
+
+
+def convert_inline(text: str) -> str:
+    """Convert the inline Markdown of a single line."""
+    if not HAS_INLINE(text):
+        return text
+    return INLINE.sub(_inline, text)
+
+
+def _split_row(line: str) -> list[str]:
+    return [cell.strip() for cell in line.strip().strip('|').split('|')]
+
+
+def render_table(lines: list[str]) -> list[str]:
+    """Render a Markdown table as aligned columns in a code block (Slack has no tables)."""
+    rows = [_split_row(line) for line in lines if not TABLE_SEPARATOR.match(line)]
+    columns = max(len(row) for row in rows)
+    rows = [row + [''] * (columns - len(row)) for row in rows]
+    widths = [max(len(row[i]) for row in rows) for i in range(columns)]
+
+    rendered = ['```']
+    for index, row in enumerate(rows):
+        rendered.append(escape('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()))
+        if index == 0 and len(rows) > 1:
+            rendered.append('  '.join('-' * width for width in widths))
+    rendered.append('```')
+    return rendered
+
+
+def to_mrkdwn(text: str) -> str:
+    """
+    Convert standard Markdown to Slack mrkdwn in one pass.
+
+    Args:
+        text: Text with standard Markdown
+
+    Returns:
+        Text with Slack-compatible mrkdwn
+    """
+    out = []
+    fence = None
+    table = []
+
+    for line in text.split('\n'):
+        first = line.lstrip()[:1]
+
+        # Tables are buffered until their last row so columns can be aligned
+        if fence is None and first == '|' and TABLE_ROW.match(line):
+            table.append(line)
+            continue
+        if table:
+            out.extend(render_table(table) if len(table) > 1 else [convert_inline(table[0])])
+            table = []
+
+        if first in ('`', '~'):
+            fence_match = FENCE.match(line)
+            if fence_match:
+                marker = fence_match.group(2)
+                if fence is None:
+                    fence = marker
+                    out.append(f"{fence_match.group(1)}```")  # Drop the language tag
+                    continue
+                if marker == fence:
+                    fence = None
+                    out.append(f"{fence_match.group(1)}```")
+                    continue
+
+        if fence is not None:
+            line = escape(line)
+            if '```' in line:
+                line = BACKTICK_RUN.sub(lambda run: ZERO_WIDTH_SPACE.join(run.group()), line)
+            out.append(line)
+            continue
+
+        if first == '#':
+            header = HEADER.match(line)
+            if header:
+                out.append(f"*{convert_inline(HEADER_BOLD.sub('', header.group(1)))}*")
+                continue
+
+        if first in ('-', '*', '+'):
+            bullet = BULLET.match(line)
+            if bullet:
+                out.append(f"{bullet.group(1)}• {convert_inline(line[bullet.end():])}")
+                continue
+
+        if first == '>':
+            # Keep the quote marker Slack understands
+            out.append(f"> {convert_inline(line.lstrip()[1:].lstrip())}")
+            continue
+
+        out.append(convert_inline(line))
+
+    if table:
+        out.extend(render_table(table) if len(table) > 1 else [convert_inline(table[0])])
+
+    return '\n'.join(out)
+
+
+def _legacy_convert(text: str) -> str:
+    """The previous regex-only conversion, kept for the benchmark."""
+    return re.sub(r'(?<!\*)\*\*(?!\*)(.+?)(?<!\*)\*\*(?!\*)', r'*\1*', text)
+
+
+def _sample_response() -> str:
+    """A large, representative assistant response."""
+    section = (
+        "## Summary\n\n"
+        "I updated **three files** and fixed the `parse_args` bug described in "
+        "[the issue](https://github.com/example/repo/issues/42). *All tests pass*.\n\n"
+        "- Refactored `utils/transcript.py` so **offsets** persist\n"
+        "- Added ~~legacy~~ retry handling for `429` responses & timeouts\n\n"
+        "| File | Lines | Status |\n|------|------:|--------|\n"
+        "| stop.py | 120 | updated |\n| slack_notification.py | 540 | new |\n\n"
+        "```python\ndef main():\n    data = {'a': 1}  # **not bold**\n    return data['a'] < 2\n```\n\n"
+        "> Note: run `uv run stop.py --chat` to export the transcript.\n\n"
+    )
+    return section * 40
+
+
+def _assistant_messages(paths: list) -> list[str]:
+    messages = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, ValueError):
+                    continue
+                message = entry.get('message') if isinstance(entry, dict) else None
+                if not isinstance(message, dict) or message.get('role') != 'assistant':
+                    continue
+                content = message.get('content')
+                if isinstance(content, list):
+                    text = '\n'.join(
+                        block.get('text', '') for block in content
+                        if isinstance(block, dict) and block.get('type') == 'text'
+                    )
+                    if text:
+                        messages.append(text)
+    return messages
+
+
+def benchmark(paths: list, rounds: int = 5) -> None:
+    """Time the converter against the previous regex substitution."""
+    messages = _assistant_messages(paths) if paths else [_sample_response()] * 20
+    if not messages:
+        print("No assistant messages found")
+        return
+
+    total_kb = sum(len(message) for message in messages) / 1000
+    print(f"{len(messages):,} messages ({total_kb:,.0f} KB), best of {rounds}\n")
+    for name, convert in (('legacy', _legacy_convert), ('mrkdwn', to_mrkdwn)):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for message in messages:
+                convert(message)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{name:<7} {best * 1000:>8.1f}ms  {total_kb / 1000 / best:>6.1f} MB/s")
+
+
+def check_fixtures(fixtures_dir: Path = FIXTURES_DIR, update: bool = False) -> bool:
+    """
+    Compare to_mrkdwn() output with the expected output of each golden file.
+
+    Args:
+        fixtures_dir: Directory of <name>.md inputs and <name>.mrkdwn outputs
+        update: Rewrite the expected outputs instead of comparing them
+
+    Returns:
+        bool: True if every output matched (or was updated)
+    """
+    inputs = sorted(Path(fixtures_dir).glob('*.md'))
+    if not inputs:
+        print(f"No fixtures found in {fixtures_dir}")
+        return False
+
+    failed = 0
+    for source in inputs:
+        expected_path = source.with_suffix('.mrkdwn')
+        actual = to_mrkdwn(source.read_text(encoding='utf-8')) + '\n'
+        if update:
+            expected_path.write_text(actual, encoding='utf-8')
+            print(f"updated {expected_path.name}")
+            continue
+        try:
+            expected = expected_path.read_text(encoding='utf-8')
+        except OSError:
+            expected = ''
+        if actual == expected:
+            print(f"ok      {source.stem}")
+            continue
+        failed += 1
+        print(f"FAILED  {source.stem}")
+        sys.stdout.writelines(difflib.unified_diff(
+            expected.splitlines(keepends=True), actual.splitlines(keepends=True),
+            fromfile=expected_path.name, tofile='to_mrkdwn()'
+        ))
+    if failed:
+        print(f"\n{failed} of {len(inputs)} fixtures differ")
+    return not failed
+
+
+def main():
+    """Command line interface: convert stdin, run the benchmark or check the golden files."""
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark':
+        benchmark(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] in ('--check', '--update'):
+        fixtures_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else FIXTURES_DIR
+        sys.exit(0 if check_fixtures(fixtures_dir, update=sys.argv[1] == '--update') else 1)
+    else:
+        print(to_mrkdwn(sys.stdin.read()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+"""
+Notification engine shared by the notification hooks.
+
+Formats a hook event once and delivers it to every enabled channel
+concurrently with asyncio. Each channel has its own timeout and circuit
+breaker, so a channel that hangs or keeps failing never delays the others.
+
+Channels marked `queued` (Slack, Discord, TTS) only put the event in an
+outbox; their timeout bounds that local write, and the network call or
+playback happens later in the channel's background worker. Those workers
+report their outcomes to the channel's breaker (see report_to_breaker()),
+so while a service is down new events are skipped instead of piling up.
+
+Channels are pluggable: subclass Channel, implement send() (raise on failure)
+and optionally enabled(), and pass instances to notify(). Blocking work in
+send() should go through run_in_thread() rather than asyncio.to_thread():
+asyncio.run() waits for to_thread's executor threads before returning, so a
+call that outlived its timeout would still hold up the hook process.
+
+Per-channel timeouts can be overridden with NOTIFY_TIMEOUT_<CHANNEL>, e.g.
+NOTIFY_TIMEOUT_TTS=15.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+NOTIFY_DIR = Path("logs") / "notify"
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 60.0
+
+# Default emoji per hook event
+EVENT_EMOJI = {
+    'Notification': '🔔',
+    'Stop': '✅',
+    'SubagentStop': '🤖',
+    'SessionStart': '🚀',
+    'SessionEnd': '🛑',
+    'PreCompact': '📦',
+}
+
+
+def format_event(input_data: dict, emoji: str = None, emoji_map: dict = None) -> tuple[str, str]:
+    """
+    Format notification title and message based on event type.
+
+    Args:
+        input_data: Hook input data from stdin
+        emoji: Optional custom emoji override
+        emoji_map: Emoji per hook event (default: EVENT_EMOJI)
+
+    Returns:
+        tuple[str, str]: (title, message)
+    """
+    hook_event = input_data.get('hook_event_name', 'Unknown')
+    icon = emoji or (emoji_map or EVENT_EMOJI).get(hook_event, '📬')
+
+    if hook_event == 'Notification':
+        message = input_data.get('message', 'Claude Code notification')
+        return (f"{icon} Claude Code", message)
+
+    elif hook_event == 'Stop':
+        return (f"{icon} Task Completed", "Claude Code has finished responding")
+
+    elif hook_event == 'SubagentStop':
+        description = input_data.get('description', 'Subagent task')
+        return (f"{icon} Subagent Complete", description)
+
+    elif hook_event == 'SessionStart':
+        source = input_data.get('source', 'unknown')
+        return (f"{icon} Session Started", f"Claude Code session started ({source})")
+
+    elif hook_event == 'SessionEnd':
+        reason = input_data.get('reason', 'unknown')
+        return (f"{icon} Session Ended", f"Claude Code session ended ({reason})")
+
+    else:
+        # Fallback for unknown event types
+        message = input_data.get('message', f'Event: {hook_event}')
+        return (f"{icon} Claude Code", message)
+
+
+class CircuitBreaker:
+    """
+    Per-channel circuit breaker persisted across hook processes.
+
+    After `threshold` consecutive failures the breaker opens and the channel
+    is skipped for `cooldown` seconds. The first call after the cooldown is let
+    through as a trial: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN, root=NOTIFY_DIR):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.path = Path(root) / f"{name}.breaker.json"
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            return {}
+
+    def _save(self, state: dict) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.parent / f".{self.path.name}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def remaining(self) -> float:
+        """Seconds until an open breaker lets a trial call through (0 if closed)."""
+        opened_at = self._load().get('opened_at')
+        if opened_at is None:
+            return 0.0
+        return max(0.0, opened_at + self.cooldown - time.time())
+
+    def allow(self) -> bool:
+        """True if the channel may be called."""
+        return self.remaining() == 0.0
+
+    def record_success(self) -> None:
+        """Close the breaker."""
+        self.path.unlink(missing_ok=True)
+
+    def record_failure(self, error: str = None) -> None:
+        """Count a failure, opening the breaker at the threshold."""
+        state = self._load()
+        state['failures'] = state.get('failures', 0) + 1
+        state['last_error'] = error
+        if state['failures'] >= self.threshold:
+            state['opened_at'] = time.time()
+        self._save(state)
+
+
+class Channel:
+    """Base class for a notification channel backend."""
+
+    name = 'channel'
+    timeout = 5.0
+    # True if send() only queues the event for a worker that reports to the breaker
+    queued = False
+
+    def enabled(self) -> bool:
+        """True if the channel is configured (credentials, scripts, ...)."""
+        return True
+
+    async def send(self, event: dict) -> None:
+        """
+        Deliver one event, raising on failure.
+
+        Args:
+            event: Formatted event (input_data, title, message, emoji)
+        """
+        raise NotImplementedError
+
+    def channel_timeout(self) -> float:
+        """The channel's timeout, overridable with NOTIFY_TIMEOUT_<NAME>."""
+        try:
+            return float(os.getenv(f'NOTIFY_TIMEOUT_{self.name.upper()}', self.timeout))
+        except ValueError:
+            return self.timeout
+
+
+def _resolve(future: asyncio.Future, result=None, error: BaseException = None) -> None:
+    if future.done():
+        return  # The channel timed out and stopped waiting
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+async def run_in_thread(func, *args):
+    """
+    Run a blocking call in a daemon thread and await its result.
+
+    A call that is still running when its channel times out is abandoned:
+    the thread does not keep the event loop or the process from exiting.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def run():
+        try:
+            result, error = func(*args), None
+        except BaseException as e:
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+        except RuntimeError:
+            pass  # The event loop has already finished
+
+    threading.Thread(target=run, name=f"notify-{getattr(func, '__name__', 'call')}", daemon=True).start()
+    return await future
+
+
+async def _deliver(channel: Channel, event: dict) -> str:
+    """Deliver an event to one channel, returning a status for the log."""
+    breaker = CircuitBreaker(channel.name)
+    if not breaker.allow():
+        return 'circuit open'
+
+    start = time.monotonic()
+    try:
+        await asyncio.wait_for(channel.send(event), channel.channel_timeout())
+    except asyncio.TimeoutError:
+        if not channel.queued:
+            breaker.record_failure('timeout')
+        return 'timeout'
+    except Exception as e:
+        if not channel.queued:
+            breaker.record_failure(str(e))
+        return f'error: {e}'
+
+    if channel.queued:
+        return f'queued in {time.monotonic() - start:.2f}s'
+    breaker.record_success()
+    return f'sent in {time.monotonic() - start:.2f}s'
+
+
+def report_to_breaker(name: str, deliver):
+    """
+    Wrap an outbox deliver callback so its outcomes drive a channel's breaker.
+
+    Used by the background workers of queued channels, where the actual
+    delivery happens. Rate-limited attempts (a retry delay was returned) are
+    not counted as failures.
+
+    Args:
+        name: Channel name (the breaker's file name)
+        deliver: Callable taking a payload (or list of payloads) and returning (sent, retry_after)
+    """
+    breaker = CircuitBreaker(name)
+
+    def record(failed: bool, error: str = None) -> None:
+        try:
+            if failed:
+                breaker.record_failure(error)
+            else:
+                breaker.record_success()
+        except OSError:
+            pass  # The breaker must never affect delivery
+
+    def wrapped(payload):
+        try:
+            sent, retry_after = deliver(payload)
+        except Exception as e:
+            record(True, str(e))
+            raise
+        if sent or retry_after is None:
+            record(not sent, None if sent else 'delivery failed')
+        return sent, retry_after
+
+    return wrapped
+
+
+async def fan_out(event: dict, channels: list[Channel]) -> dict:
+    """
+    Deliver an event to all channels concurrently.
+
+    Args:
+        event: Formatted event (input_data, title, message, emoji)
+        channels: Enabled channel backends
+
+    Returns:
+        dict: Delivery status per channel name
+    """
+    results = await asyncio.gather(*(_deliver(channel, event) for channel in channels))
+    return {channel.name: result for channel, result in zip(channels, results)}
+
+
+def notify(input_data: dict, channels: list[Channel], emoji: str = None) -> dict:
+    """
+    Format a hook event once and deliver it to every enabled channel.
+
+    Args:
+        input_data: Hook input data from stdin
+        channels: Channel backends to try
+        emoji: Optional custom emoji override
+
+    Returns:
+        dict: Delivery status per channel name ('disabled' for unconfigured channels)
+    """
+    title, message = format_event(input_data, emoji)
+    event = {
+        'input_data': input_data,
+        'title': title,
+        'message': message,
+        'emoji': emoji,
+    }
+
+    enabled = [channel for channel in channels if channel.enabled()]
+    results = {channel.name: 'disabled' for channel in channels if channel not in enabled}
+    if enabled:
+        results.update(asyncio.run(fan_out(event, enabled)))
+    return results
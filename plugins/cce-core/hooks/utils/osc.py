@@ -0,0 +1,365 @@
+"""
+OSC (Operating System Command) escape sequences for terminal notifications.
+
+Shared by ssh_osc777_notification.py and the notification engine.
+
+Hooks run with stdout captured by Claude Code, so sequences are written
+straight to the session's controlling TTY instead, without a subprocess. The
+TTY and the terminal's notification capability are looked up once per
+session and cached in logs/osc/<session>.json:
+
+    osc777   ESC ] 777 ; notify ; title ; body BEL   (iTerm2, Ghostty, foot, urxvt)
+    osc9     ESC ] 9 ; text BEL                      (WezTerm, Windows Terminal)
+    osc99    ESC ] 99 ; ... ST                       (kitty)
+    title    window title + double bell             (Warp, VS Code, others)
+    bell     single bell                            (SSH sessions)
+
+Set OSC_CAPABILITY to force one. Writes to a TTY are spaced at least
+OSC_MIN_INTERVAL seconds apart (default 1.0); events arriving faster are
+queued and shown together.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no TTY device to write to
+    fcntl = None
+
+from utils.transcript import safe_session_name
+
+OSC_STATE_DIR = Path("logs") / "osc"
+DEFAULT_MIN_INTERVAL = 1.0
+
+# Notification capability per terminal type
+CAPABILITIES = {
+    'iterm2': 'osc777',
+    'ghostty': 'osc777',
+    'wezterm': 'osc9',
+    'windows-terminal': 'osc9',
+    'kitty': 'osc99',
+    'warp': 'title',
+    'vscode': 'title',
+    'generic': 'title',
+}
+
+
+def detect_terminal_type() -> str:
+    """
+    Detect terminal type from environment variables.
+
+    Returns:
+        str: Terminal type ('iterm2', 'ghostty', 'wezterm', 'kitty',
+            'windows-terminal', 'warp', 'vscode', or 'generic')
+    """
+    term_program = os.getenv('TERM_PROGRAM', '').lower()
+    term = os.getenv('TERM', '').lower()
+
+    # Check for specific terminal programs
+    if 'iterm' in term_program:
+        return 'iterm2'
+    elif 'ghostty' in term_program or 'ghostty' in term:
+        return 'ghostty'
+    elif 'wezterm' in term_program:
+        return 'wezterm'
+    elif 'kitty' in term or os.getenv('KITTY_WINDOW_ID'):
+        return 'kitty'
+    elif os.getenv('WT_SESSION'):
+        return 'windows-terminal'
+    elif 'warp' in term_program:
+        return 'warp'
+    elif 'vscode' in term_program:
+        return 'vscode'
+    else:
+        return 'generic'
+
+
+def detect_capability(terminal_type: str) -> str:
+    """
+    Return the notification capability to use for a terminal type.
+
+    Over SSH only a bell is sent unless OSC_CAPABILITY says otherwise, since
+    the local terminal cannot be identified from the remote environment.
+    """
+    forced = os.getenv('OSC_CAPABILITY', '').strip().lower()
+    if forced in ('osc777', 'osc9', 'osc99', 'title', 'bell'):
+        return forced
+    if os.getenv('SSH_TTY') and terminal_type == 'generic':
+        return 'bell'
+    return CAPABILITIES.get(terminal_type, 'title')
+
+
+def sanitize(text: str) -> str:
+    """Remove control characters (except newline/tab) and truncate to 200 chars."""
+    cleaned = ''.join(char for char in text if ord(char) >= 32 or char in '\n\t')
+    cleaned = cleaned.replace('\x1b', '')  # Remove escape sequences
+    return cleaned[:200]
+
+
+def generate_sequence(capability: str, title: str, message: str) -> str:
+    """
+    Generate the escape sequence for a notification capability.
+
+    Args:
+        capability: One of osc777, osc9, osc99, title, bell
+        title: Notification title
+        message: Notification message
+
+    Returns:
+        str: Escape sequence to write to the terminal
+    """
+    # Sanitize text to prevent OSC injection; ';' separates OSC 777 fields
+    title = sanitize(title)
+    message = sanitize(message)
+
+    if capability == 'osc777':
+        title = title.replace(';', ',')
+        return f'\x1b]777;notify;{title};{message}\x07'
+    elif capability == 'osc9':
+        return f'\x1b]9;{title}: {message}\x07'
+    elif capability == 'osc99':
+        # kitty: title chunk (d=0, more to come), then the body
+        return f'\x1b]99;i=cc:d=0;{title}\x1b\\\x1b]99;i=cc:d=1:p=body;{message}\x1b\\'
+    elif capability == 'bell':
+        return '\x07'
+    else:
+        # Fallback: Use window title change + double bell for emphasis
+        return f'\x1b]0;{title}: {message}\x07\x07'
+
+
+def generate_osc_notification(terminal_type: str, title: str, message: str) -> str:
+    """
+    Generate appropriate OSC escape sequence for terminal type.
+
+    Args:
+        terminal_type: Terminal type from detect_terminal_type()
+        title: Notification title
+        message: Notification message
+
+    Returns:
+        str: OSC escape sequence to write to the terminal
+    """
+    return generate_sequence(CAPABILITIES.get(terminal_type, 'title'), title, message)
+
+
+def _is_tty(path: str) -> bool:
+    return path.startswith('/dev/pts/') or path.startswith('/dev/tty')
+
+
+def _proc_stat(pid) -> list[str]:
+    """Fields of /proc/<pid>/stat after the command name (which may contain spaces)."""
+    with open(f'/proc/{pid}/stat', 'r') as f:
+        return f.read().rsplit(')', 1)[1].split()
+
+
+def _device_path(rdev: int) -> str | None:
+    """Find the /dev entry of a terminal device number."""
+    candidates = [f'/dev/pts/{os.minor(rdev)}'] if 136 <= os.major(rdev) <= 143 else []
+    candidates += [str(path) for path in Path('/dev').glob('tty*')]
+    for path in candidates:
+        try:
+            if os.stat(path).st_rdev == rdev:
+                return path
+        except OSError:
+            continue
+    return None
+
+
+def _ps_tty(pid: int) -> str | None:
+    """Ask ps for a process's terminal (macOS and BSDs have no /proc)."""
+    try:
+        result = subprocess.run(
+            ['ps', '-o', 'tty=', '-p', str(pid)],
+            capture_output=True, text=True, timeout=2
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    name = result.stdout.strip()
+    if not name or name.startswith('?') or name == '??':
+        return None
+    path = name if name.startswith('/dev/') else f'/dev/{name}'
+    return path if os.path.exists(path) else None
+
+
+def find_controlling_tty() -> str | None:
+    """
+    Find the terminal device of the Claude Code session.
+
+    Uses the controlling terminal recorded in /proc, then walks up the parent
+    processes for one whose stdin or stdout is a terminal. Without /proc
+    (macOS), asks ps once; the result is cached per session.
+
+    Returns:
+        str: TTY device path, or None if there is none
+    """
+    if fcntl is None:
+        return None
+
+    if os.path.exists('/proc/self/stat'):
+        try:
+            tty_nr = int(_proc_stat('self')[4])
+        except (OSError, IndexError, ValueError):
+            tty_nr = 0
+        if tty_nr:
+            path = _device_path(os.makedev((tty_nr >> 8) & 0xfff, (tty_nr & 0xff) | ((tty_nr >> 12) & 0xfff00)))
+            if path:
+                return path
+
+        pid = os.getppid()
+        for _ in range(10):
+            if pid <= 1:
+                break
+            for fd in (0, 1, 2):
+                try:
+                    target = os.readlink(f'/proc/{pid}/fd/{fd}')
+                except OSError:
+                    continue
+                if _is_tty(target):
+                    return target
+            try:
+                pid = int(_proc_stat(pid)[1])
+            except (OSError, IndexError, ValueError):
+                break
+        return None
+
+    return _ps_tty(os.getpid()) or _ps_tty(os.getppid())
+
+
+def session_terminal(session_id: str, force_terminal: str = None) -> dict:
+    """
+    Return the session's TTY and terminal capability, detecting them once.
+
+    Args:
+        session_id: Claude Code session ID
+        force_terminal: Terminal type overriding detection
+
+    Returns:
+        dict: {'tty', 'terminal_type', 'capability'} (tty may be None)
+    """
+    state_file = OSC_STATE_DIR / f"{safe_session_name(session_id)}.json"
+    try:
+        with open(state_file, 'r') as f:
+            cached = json.load(f)
+        if not force_terminal or cached.get('terminal_type') == force_terminal:
+            if cached.get('tty') is None or os.path.exists(cached['tty']):
+                return cached
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        pass
+
+    terminal_type = force_terminal or os.getenv('OSC_TERMINAL_TYPE') or detect_terminal_type()
+    terminal = {
+        'tty': find_controlling_tty(),
+        'terminal_type': terminal_type,
+        'capability': detect_capability(terminal_type),
+    }
+    OSC_STATE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = OSC_STATE_DIR / f".{state_file.name}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(terminal, f)
+    os.replace(tmp_file, state_file)
+    return terminal
+
+
+def write_tty(tty: str, data: str) -> bool:
+    """
+    Write to a terminal device without blocking.
+
+    A full terminal buffer (e.g. a stalled SSH connection) drops the write
+    instead of freezing the hook.
+    """
+    try:
+        fd = os.open(tty, os.O_WRONLY | os.O_NOCTTY | os.O_NONBLOCK)
+    except OSError:
+        return False
+    try:
+        os.write(fd, data.encode('utf-8'))
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def min_interval() -> float:
+    """Minimum seconds between sequences written to one TTY."""
+    try:
+        return float(os.getenv('OSC_MIN_INTERVAL', DEFAULT_MIN_INTERVAL))
+    except ValueError:
+        return DEFAULT_MIN_INTERVAL
+
+
+def claim_write_slot(tty: str, interval: float | None = None) -> float:
+    """
+    Reserve the TTY for an immediate write if the rate limit allows it.
+
+    Args:
+        tty: TTY device path
+        interval: Minimum seconds between writes (default: min_interval())
+
+    Returns:
+        float: 0 if the caller may write now (the slot is taken), otherwise
+            the seconds until the next write is allowed
+    """
+    interval = min_interval() if interval is None else interval
+    OSC_STATE_DIR.mkdir(parents=True, exist_ok=True)
+    state_file = OSC_STATE_DIR / f"tty-{safe_session_name(tty)}.json"
+
+    with open(state_file, 'a+') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        try:
+            state = json.loads(f.read() or '{}')
+        except ValueError:
+            state = {}
+
+        now = time.time()
+        wait = state.get('last_write', 0) + interval - now
+        if wait > 0:
+            return wait
+
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps({'last_write': now}))
+    return 0.0
+
+
+def deliver_queued(payloads: list[dict]) -> tuple[bool, float | None]:
+    """
+    Write queued notifications for one TTY as a single sequence.
+
+    Used as the outbox worker's deliver callback when events arrive faster
+    than the rate limit.
+
+    Args:
+        payloads: Queued notifications (tty, capability, title, message)
+
+    Returns:
+        tuple[bool, float | None]: (written, seconds until the TTY may be written again)
+    """
+    last = payloads[-1]
+    wait = claim_write_slot(last['tty'])
+    if wait:
+        return False, wait
+
+    if len(payloads) == 1:
+        title, message = last['title'], last['message']
+    else:
+        title = f"{len(payloads)} Claude Code events"
+        message = f"{last['title']}: {last['message']}"
+    return write_tty(last['tty'], generate_sequence(last['capability'], title, message)), None
+
+
+def write_stdout(sequence: str) -> bool:
+    """Fallback for sessions without a TTY: write the sequence to stdout."""
+    try:
+        sys.stdout.write(sequence)
+        sys.stdout.flush()
+        return True
+    except OSError:
+        return False
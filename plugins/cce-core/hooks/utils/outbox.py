@@ -0,0 +1,377 @@
+"""
+Durable spool-directory outbox for slow hook side effects.
+
+A hook enqueues an item (one small JSON file, written atomically) and returns
+immediately. A single background worker per channel delivers queued items,
+retrying failures with exponential backoff or the server's Retry-After delay.
+Items that still fail after MAX_ATTEMPTS are moved to failed/ rather than
+dropped, so nothing is lost. Bursts of events for one session can be
+coalesced into a single digest delivery, with duplicate payloads dropped.
+
+Layout:
+    logs/outbox/<channel>/pending/<item>.json
+    logs/outbox/<channel>/failed/<item>.json
+    logs/outbox/<channel>/worker.lock
+
+Usage from a hook:
+    outbox = Outbox('discord')
+    outbox.enqueue({'title': title, 'message': message},
+                   coalesce_key=session_id, coalesce_window=2.0)
+    outbox.spawn_worker([sys.executable, __file__, '--drain-outbox'])
+
+and in the worker process:
+    Outbox('discord').run_worker(deliver, deliver_batch)
+    # deliver(payload) / deliver_batch([payload, ...]) -> (sent, retry_after)
+"""
+
+import hashlib
+import json
+import os
+import random
+import subprocess
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+OUTBOX_DIR = Path("logs") / "outbox"
+MAX_ATTEMPTS = 8
+BASE_BACKOFF = 2.0
+MAX_BACKOFF = 300.0
+WORKER_IDLE_EXIT = 5.0
+WORKER_POLL_INTERVAL = 0.5
+
+
+def _try_lock(fd: int) -> bool:
+    """Take an exclusive, non-blocking lock on an open file."""
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+
+
+def payload_digest(payload) -> str:
+    """Stable hash of a payload, used to drop duplicate events."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def batch_progress(payloads: list, content) -> dict:
+    """
+    Progress of a coalesced delivery, for resuming it on retry.
+
+    The group and its digest are rebuilt on every attempt, and may change in
+    between (an item is coalesced in, or one moves to failed/). Progress is
+    therefore kept under 'batch_progress' in every payload of the group,
+    tagged with the hash of the delivered content, and only resumes a retry
+    of the same content; a changed digest is delivered from the start.
+
+    Args:
+        payloads: Payloads delivered together (updated in place)
+        content: The digest about to be delivered (any JSON-serializable value)
+
+    Returns:
+        dict: Progress shared by the payloads, for the sender to update
+    """
+    key = payload_digest(content)
+    progress = next(
+        (payload['batch_progress'] for payload in payloads
+         if isinstance(payload.get('batch_progress'), dict) and payload['batch_progress'].get('key') == key),
+        {'key': key}
+    )
+    for payload in payloads:
+        payload['batch_progress'] = progress
+    return progress
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the given number of failed attempts."""
+    delay = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class Outbox:
+    """A durable queue of payloads for one delivery channel."""
+
+    def __init__(self, channel: str, root=OUTBOX_DIR, max_attempts: int = MAX_ATTEMPTS):
+        self.channel = channel
+        self.dir = Path(root) / channel
+        self.pending_dir = self.dir / 'pending'
+        self.failed_dir = self.dir / 'failed'
+        self.lock_file = self.dir / 'worker.lock'
+        self.max_attempts = max_attempts
+
+    def _write(self, path: Path, item: dict) -> None:
+        """Atomically write an item file."""
+        tmp_path = self.dir / f".{path.name}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(item, f)
+        os.replace(tmp_path, path)
+
+    def enqueue(self, payload: dict, coalesce_key: str | None = None,
+                coalesce_window: float = 0.0, dedupe_key: str | None = None, **metadata) -> Path:
+        """
+        Add a payload to the queue.
+
+        Items with the same coalesce_key that arrive within coalesce_window
+        seconds of each other are handed to the worker's deliver_batch callback
+        together, once the first item's window has passed.
+
+        Args:
+            payload: JSON-serializable data handed to the deliver callback
+            coalesce_key: Grouping key (e.g. the session ID), or None to never group
+            coalesce_window: Seconds to hold the item for later events to join it
+            dedupe_key: Identity used to drop duplicates within a group
+                (default: a hash of the whole payload)
+            **metadata: Extra item fields (e.g. session_id) stored next to the payload
+
+        Returns:
+            Path: The queued item file
+        """
+        self.pending_dir.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        # Names sort in enqueue order
+        name = f"{time.time_ns():020d}-{os.getpid()}-{random.getrandbits(32):08x}.json"
+        item = {
+            **metadata,
+            'created': now,
+            'attempts': 0,
+            'next_attempt': now + (coalesce_window if coalesce_key is not None else 0.0),
+            'coalesce_key': coalesce_key,
+            'digest': dedupe_key or payload_digest(payload),
+            'payload': payload,
+        }
+        path = self.pending_dir / name
+        self._write(path, item)
+        return path
+
+    def pending(self) -> list[tuple[Path, dict]]:
+        """Return all queued (path, item) pairs in enqueue order."""
+        if not self.pending_dir.exists():
+            return []
+        items = []
+        for path in sorted(self.pending_dir.glob('*.json')):
+            try:
+                with open(path, 'r') as f:
+                    items.append((path, json.load(f)))
+            except FileNotFoundError:
+                continue  # Delivered by another worker in the meantime
+            except (json.JSONDecodeError, ValueError):
+                # Keep unreadable items for inspection instead of retrying forever
+                self.failed_dir.mkdir(parents=True, exist_ok=True)
+                os.replace(path, self.failed_dir / path.name)
+        return items
+
+    def complete(self, path: Path) -> None:
+        """Remove a delivered item."""
+        path.unlink(missing_ok=True)
+
+    def retry(self, path: Path, item: dict, retry_after: float | None = None, error: str | None = None) -> None:
+        """
+        Reschedule a failed item, or move it to failed/ after max_attempts.
+
+        Args:
+            path: Item file
+            item: Item contents (the payload may have been updated by the deliver callback)
+            retry_after: Delay requested by the server (e.g. HTTP 429 Retry-After)
+            error: Description of the failure, kept in the item
+        """
+        item['attempts'] = item.get('attempts', 0) + 1
+        if error:
+            item['last_error'] = error
+
+        if item['attempts'] >= self.max_attempts:
+            self.failed_dir.mkdir(parents=True, exist_ok=True)
+            self._write(self.failed_dir / path.name, item)
+            path.unlink(missing_ok=True)
+            return
+
+        delay = retry_after if retry_after is not None else backoff_delay(item['attempts'])
+        item['next_attempt'] = time.time() + delay
+        self._write(path, item)
+
+    def _group(self, items: list, index: int, now: float) -> list:
+        """
+        Collect the items delivered together with items[index].
+
+        Items sharing a coalesce_key are grouped with it if they are due too,
+        or if they are still waiting out their first coalescing window.
+        Identical payloads (same digest) are delivered once.
+        """
+        path, item = items[index]
+        group = [(path, item)]
+        key = item.get('coalesce_key')
+        if key is None:
+            return group
+
+        digests = {item.get('digest')}
+        for other_path, other in items[index + 1:]:
+            if other.get('coalesce_key') != key:
+                continue
+            if other.get('next_attempt', 0) > now and other.get('attempts', 0) > 0:
+                continue  # Backing off after a failed delivery of its own
+            if other.get('digest') in digests:
+                self.complete(other_path)
+                continue
+            digests.add(other.get('digest'))
+            group.append((other_path, other))
+        return group
+
+    def deliver_due(self, deliver, deliver_batch=None, now: float | None = None) -> float | None:
+        """
+        Deliver every item whose retry time has come.
+
+        Args:
+            deliver: Callable taking a payload and returning (sent, retry_after)
+            deliver_batch: Optional callable taking a list of payloads from the
+                same coalesce_key and returning (sent, retry_after); without it
+                every item is delivered on its own
+            now: Current time (defaults to time.time())
+
+        Returns:
+            Seconds until the next pending item is due, or None if the queue is empty
+        """
+        now = time.time() if now is None else now
+        next_due = None
+        items = self.pending()
+        handled = set()
+        for index, (path, item) in enumerate(items):
+            if path in handled or not path.exists():
+                continue
+            if item.get('next_attempt', 0) > now:
+                wait = item['next_attempt'] - now
+                next_due = wait if next_due is None else min(next_due, wait)
+                continue
+
+            group = self._group(items, index, now) if deliver_batch else [(path, item)]
+            handled.update(group_path for group_path, _ in group)
+            try:
+                if len(group) == 1:
+                    sent, retry_after = deliver(item['payload'])
+                else:
+                    sent, retry_after = deliver_batch([group_item['payload'] for _, group_item in group])
+                error = None
+            except Exception as e:
+                sent, retry_after, error = False, None, str(e)
+
+            if sent:
+                for group_path, _ in group:
+                    self.complete(group_path)
+                continue
+
+            # Keep the group together for the next attempt
+            if retry_after is None:
+                retry_after = backoff_delay(max(group_item.get('attempts', 0) for _, group_item in group) + 1)
+            for group_path, group_item in group:
+                self.retry(group_path, group_item, retry_after, error)
+                if group_path.exists():
+                    wait = group_item['next_attempt'] - time.time()
+                    next_due = wait if next_due is None else min(next_due, wait)
+        return next_due
+
+    def run_worker(self, deliver, deliver_batch=None, idle_exit: float = WORKER_IDLE_EXIT) -> bool:
+        """
+        Deliver queued items until the queue has been empty for `idle_exit` seconds.
+
+        Only one worker per channel runs at a time; a second call returns
+        immediately.
+
+        Args:
+            deliver: Callable taking a payload and returning (sent, retry_after)
+            deliver_batch: Optional callable delivering coalesced payloads as one digest
+            idle_exit: Seconds to linger on an empty queue before exiting
+
+        Returns:
+            bool: False if another worker already held the lock
+        """
+        self.dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not _try_lock(fd):
+                return False
+
+            idle_since = None
+            while True:
+                next_due = self.deliver_due(deliver, deliver_batch)
+                if next_due is None:
+                    idle_since = idle_since or time.monotonic()
+                    if time.monotonic() - idle_since >= idle_exit:
+                        _unlock(fd)
+                        # An item enqueued while we held the lock would not have
+                        # spawned a worker; pick it up before leaving
+                        if self.pending() and _try_lock(fd):
+                            idle_since = None
+                            continue
+                        return True
+                else:
+                    idle_since = None
+                # Poll so newly enqueued items are picked up promptly
+                time.sleep(max(0.0, min(
+                    next_due if next_due is not None else WORKER_POLL_INTERVAL,
+                    WORKER_POLL_INTERVAL
+                )))
+        finally:
+            os.close(fd)
+
+    def worker_running(self) -> bool:
+        """True if a worker currently holds this channel's lock."""
+        if not self.lock_file.exists():
+            return False
+        fd = os.open(self.lock_file, os.O_RDWR)
+        try:
+            if _try_lock(fd):
+                _unlock(fd)
+                return False
+            return True
+        finally:
+            os.close(fd)
+
+    def spawn_worker(self, command: list[str], env: dict | None = None) -> bool:
+        """
+        Start a detached worker process unless one is already running.
+
+        Args:
+            command: Command that runs `run_worker` for this channel
+            env: Environment of the worker (default: inherited)
+
+        Returns:
+            bool: True if a new worker was started
+        """
+        if self.worker_running():
+            return False
+
+        kwargs = {}
+        if os.name == 'posix':
+            kwargs['start_new_session'] = True
+        else:
+            kwargs['creationflags'] = (
+                subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+            )
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            env=env,
+            **kwargs
+        )
+        return True
@@ -0,0 +1,165 @@
+"""
+Per-session state shared by the hooks of one Claude Code session.
+
+Each hook process used to re-derive what an earlier hook of the same session
+already knew: the transcript path (via the logs/.current-transcript side
+file), how far the transcript had been read, the SessionStart context and
+the Slack thread of the session. They now keep it in one small JSON file
+per session:
+
+    logs/sessions/<session_id>.json
+    {
+        "transcript_path": "...",
+        "transcript_index": {"path": "...", "entry": 10240, "end": 20480},
+        "context": {"key": {...}, "context": "..."},
+        "notification_threads": {"slack": "1712345678.000100"},
+        "tts_prewarmed": 1712345670.1,
+        "updated": 1712345678.9
+    }
+
+Updates are read-modify-write under a lock and written atomically, so hooks
+and background workers of one session can update different fields at the
+same time. Only the newest MAX_SESSIONS files are kept.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from utils.transcript import safe_session_name
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are not serialized
+    fcntl = None
+
+SESSIONS_DIR = Path("logs") / "sessions"
+LEGACY_TRANSCRIPT_FILE = Path("logs") / ".current-transcript"
+MAX_SESSIONS = 200
+
+# Fields whose updates are merged into the stored dict instead of replacing it
+MERGED_FIELDS = ('notification_threads',)
+
+
+def state_path(session_id: str) -> Path:
+    """Path of a session's state file."""
+    return SESSIONS_DIR / f"{safe_session_name(session_id)}.json"
+
+
+def load(session_id: str) -> dict:
+    """
+    Load a session's state.
+
+    Returns:
+        dict: The stored fields, or an empty dict for an unknown session
+    """
+    if not session_id:
+        return {}
+    try:
+        with open(state_path(session_id), 'r') as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+@contextmanager
+def _locked():
+    """Serialize read-modify-write updates of the session files."""
+    SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    with open(SESSIONS_DIR / '.lock', 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def update(session_id: str, **fields) -> dict:
+    """
+    Set fields of a session's state.
+
+    Updates of MERGED_FIELDS are merged into the stored dict (so
+    notification_threads={'slack': ts} keeps other channels' threads); a
+    value of None removes the field.
+
+    Returns:
+        dict: The updated state (empty if it could not be written)
+    """
+    if not session_id:
+        return {}
+    path = state_path(session_id)
+    try:
+        with _locked():
+            is_new = not path.exists()
+            state = load(session_id)
+            for name, value in fields.items():
+                if value is None:
+                    state.pop(name, None)
+                elif name in MERGED_FIELDS and isinstance(state.get(name), dict):
+                    state[name] = {**state[name], **value}
+                else:
+                    state[name] = value
+            state['updated'] = time.time()
+
+            tmp_path = path.parent / f".{path.name}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+            if is_new:
+                prune()
+        return state
+    except OSError:
+        return {}
+
+
+def prune(keep: int = MAX_SESSIONS) -> None:
+    """Delete the state files of all but the `keep` most recently updated sessions."""
+    try:
+        files = sorted(
+            (path for path in SESSIONS_DIR.glob('*.json') if not path.name.startswith('.')),
+            key=lambda path: path.stat().st_mtime
+        )
+    except OSError:
+        return
+    for path in files[:-keep] if keep else files:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def transcript_path(session_id: str, reported: str = '') -> str:
+    """
+    The session's transcript path.
+
+    Claude Code sometimes passes a stale transcript_path in resumed sessions,
+    so the path recorded at SessionStart wins, then the legacy
+    logs/.current-transcript file, then the reported path.
+    """
+    recorded = load(session_id).get('transcript_path')
+    if recorded and os.path.exists(recorded):
+        return recorded
+    try:
+        cached = LEGACY_TRANSCRIPT_FILE.read_text().strip()
+        if cached and os.path.exists(cached):
+            return cached
+    except OSError:
+        pass
+    return reported
+
+
+def record_transcript(session_id: str, path: str) -> None:
+    """Remember the transcript path of a session (and in the legacy side file)."""
+    if not path:
+        return
+    update(session_id, transcript_path=path)
+    try:
+        LEGACY_TRANSCRIPT_FILE.parent.mkdir(exist_ok=True)
+        LEGACY_TRANSCRIPT_FILE.write_text(path)
+    except OSError:
+        pass
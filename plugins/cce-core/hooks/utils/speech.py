@@ -0,0 +1,115 @@
+"""
+Queued TTS playback.
+
+Hooks used to run the TTS script and wait for synthesis and playback to
+finish (up to 10 s per announcement). speak() instead enqueues the utterance
+in the 'tts' outbox (see utils/outbox.py) and returns; a single background
+player process speaks queued utterances one at a time, so announcements from
+concurrent hooks never talk over each other. Utterances that waited longer
+than TTS_MAX_AGE seconds (default 15) are dropped rather than spoken late.
+
+pyttsx3 utterances go straight to its resident engine's local socket when
+one is running (see tts/pyttsx3_tts.py, TTS_RESIDENT=false to disable), so
+they cost no `uv run` start-up; other scripts, and pyttsx3 without a
+resident engine, are run as `uv run <script> <text>`.
+
+Worker:
+    python -m utils.speech --drain-outbox
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from utils.notifications import report_to_breaker
+from utils.outbox import Outbox
+
+DEFAULT_MAX_AGE = 15.0
+PLAYBACK_TIMEOUT = 30
+HOOKS_DIR = Path(__file__).resolve().parent.parent
+TTS_DIR = Path(__file__).resolve().parent / 'tts'
+
+
+def max_age() -> float:
+    """Seconds an utterance may wait in the queue before it is dropped."""
+    try:
+        return float(os.getenv('TTS_MAX_AGE', DEFAULT_MAX_AGE))
+    except ValueError:
+        return DEFAULT_MAX_AGE
+
+
+def speak(text: str, tts_script: str) -> bool:
+    """
+    Queue an utterance for the background player and return immediately.
+
+    Args:
+        text: Text to speak
+        tts_script: TTS script that speaks it (run with `uv run <script> <text>`)
+
+    Returns:
+        bool: True if the utterance was queued
+    """
+    outbox = Outbox('tts', max_attempts=2)
+    try:
+        outbox.enqueue({'text': text, 'tts_script': str(tts_script), 'expires': time.time() + max_age()})
+        # The worker imports utils.speech as a module from the hooks directory
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join(
+            filter(None, [str(HOOKS_DIR), os.getenv('PYTHONPATH')])
+        )}
+        outbox.spawn_worker([sys.executable, '-m', 'utils.speech', '--drain-outbox'], env=env)
+        return True
+    except OSError:
+        return False
+
+
+def speak_resident(text: str, tts_script: str) -> bool:
+    """
+    Hand an utterance to the resident pyttsx3 engine over its local socket.
+
+    Returns:
+        bool: True if the resident engine spoke it; False if the script is not
+            pyttsx3_tts.py, the resident engine is disabled or not running
+    """
+    if (Path(tts_script).name != 'pyttsx3_tts.py' or not hasattr(socket, 'AF_UNIX')
+            or os.getenv('TTS_RESIDENT', 'true').lower() == 'false'):
+        return False
+    # pyttsx3_tts imports its sibling audio_cache top-level, like when run as a script
+    if str(TTS_DIR) not in sys.path:
+        sys.path.insert(0, str(TTS_DIR))
+    import pyttsx3_tts
+
+    if not pyttsx3_tts.socket_path().exists():
+        return False
+    return pyttsx3_tts.send_to_server(text, pyttsx3_tts.voice_settings())
+
+
+def play(payload: dict) -> tuple[bool, float | None]:
+    """
+    Speak one queued utterance (the outbox worker's deliver callback).
+
+    Returns:
+        tuple[bool, float | None]: (done, retry delay); stale utterances count as done
+    """
+    if time.time() > payload.get('expires', 0):
+        return True, None  # Too late to be useful
+    if speak_resident(payload['text'], payload['tts_script']):
+        return True, None
+    result = subprocess.run(
+        ["uv", "run", payload['tts_script'], payload['text']],
+        capture_output=True,
+        timeout=PLAYBACK_TIMEOUT
+    )
+    return result.returncode == 0, None
+
+
+def main():
+    """Run the background player until the queue is idle."""
+    if '--drain-outbox' in sys.argv[1:]:
+        Outbox('tts', max_attempts=2).run_worker(report_to_breaker('tts', play))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""
+Transcript helpers shared by the lifecycle hooks.
+
+Claude Code transcripts are append-only JSONL files. Hooks that need the new
+part of a transcript can resume from a remembered byte offset instead of
+re-parsing the whole file on every event.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import re
+import select
+import sys
+import time
+from pathlib import Path
+
+from utils import json_codec
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+
+# Stat polling backoff used where inotify is unavailable
+POLL_INITIAL_DELAY = 0.01
+POLL_MAX_DELAY = 0.2
+
+
+def safe_session_name(session_id: str) -> str:
+    """Return a filesystem-safe version of a session ID."""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', session_id or 'unknown')
+
+
+def read_new_lines(transcript_path: str, offset: int = 0) -> tuple[list[bytes], int]:
+    """
+    Read complete JSONL lines appended to a transcript after a byte offset.
+
+    A trailing line without a newline is still being written by Claude Code,
+    so it is left for the next call.
+
+    Args:
+        transcript_path: Path to the JSONL transcript file
+        offset: Byte offset returned by a previous call (0 to start over)
+
+    Returns:
+        tuple[list[bytes], int]: (raw non-empty lines, offset after the last complete line)
+    """
+    with open(transcript_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+
+    end = data.rfind(b'\n') + 1
+    lines = [line for line in data[:end].split(b'\n') if line.strip()]
+    return lines, offset + end
+
+
+def assistant_text(entry) -> str | None:
+    """
+    Extract the text of an assistant transcript entry.
+
+    Args:
+        entry: Parsed transcript entry
+
+    Returns:
+        The concatenated text blocks (thinking and tool blocks are skipped),
+        or None if the entry is not an assistant message with text
+    """
+    if not isinstance(entry, dict):
+        return None
+
+    # Assistant messages are nested under the 'message' key
+    message = entry.get('message', entry)
+    if not isinstance(message, dict) or message.get('role') != 'assistant':
+        return None
+
+    content = message.get('content', [])
+    if isinstance(content, str):
+        return content or None
+    if isinstance(content, list):
+        text_parts = [
+            block.get('text', '') for block in content
+            if isinstance(block, dict) and block.get('type') == 'text'
+        ]
+        if text_parts:
+            return '\n'.join(text_parts)
+    return None
+
+
+def parse_lines(lines: list[bytes]) -> list:
+    """Parse raw JSONL lines, skipping any that are not valid JSON."""
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json_codec.loads(line))
+        except (json.JSONDecodeError, ValueError):
+            continue
+    return entries
+
+
+def last_assistant_entry(transcript_path: str, offset: int = 0) -> tuple[str | None, int | None, int]:
+    """
+    Find the last assistant message with text after a byte offset.
+
+    Passing back the returned entry offset on the next call resumes the scan
+    at that message instead of at the start of the transcript.
+
+    Args:
+        transcript_path: Path to the JSONL transcript file
+        offset: Byte offset of a line start to scan from
+
+    Returns:
+        tuple[str | None, int | None, int]: (message text, byte offset of its
+            line, offset after the last complete line)
+    """
+    with open(transcript_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+
+    end = data.rfind(b'\n') + 1
+    text, entry_offset = None, None
+    position = 0
+    while position < end:
+        line_end = data.index(b'\n', position)
+        line = data[position:line_end]
+        if line.strip():
+            try:
+                entry_text = assistant_text(json_codec.loads(line))
+            except (json.JSONDecodeError, ValueError):
+                entry_text = None
+            if entry_text:
+                text, entry_offset = entry_text, offset + position
+        position = line_end + 1
+    return text, entry_offset, offset + end
+
+
+def _inotify_watch(path: str) -> int | None:
+    """
+    Watch a file for writes with inotify.
+
+    Returns:
+        A non-blocking inotify file descriptor, or None where inotify is unavailable
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF
+        if libc.inotify_add_watch(fd, os.fsencode(path), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def wait_for_entry(transcript_path: str, offset: int, predicate, timeout: float = 0.6) -> tuple[list, int]:
+    """
+    Wait for an entry matching `predicate` to be appended to a transcript.
+
+    Claude Code may still be flushing the transcript when a hook fires. This
+    returns as soon as a matching entry lands, or once `timeout` expires. Writes
+    are detected with inotify on Linux and with stat polling (exponential
+    backoff) elsewhere.
+
+    Args:
+        transcript_path: Path to the JSONL transcript file
+        offset: Byte offset to read new lines from
+        predicate: Callable taking a parsed entry, True when it is the awaited one
+        timeout: Seconds to wait before giving up
+
+    Returns:
+        tuple[list, int]: (all entries appended while waiting, new offset)
+    """
+    deadline = time.monotonic() + timeout
+    entries = []
+    fd = _inotify_watch(transcript_path)
+    delay = POLL_INITIAL_DELAY
+    try:
+        while True:
+            lines, offset = read_new_lines(transcript_path, offset)
+            new_entries = parse_lines(lines)
+            entries.extend(new_entries)
+            if any(predicate(entry) for entry in new_entries):
+                return entries, offset
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return entries, offset
+
+            if fd is not None:
+                ready, _, _ = select.select([fd], [], [], remaining)
+                if ready:
+                    # Drain queued events; the next read picks up all new lines
+                    try:
+                        while os.read(fd, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+            else:
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, POLL_MAX_DELAY)
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
+def export_chat(transcript_path: str, session_id: str, log_dir: str) -> int:
+    """
+    Append the new part of a transcript to logs/chat/<session_id>.jsonl.
+
+    The byte offset of the last exported transcript line is kept next to the
+    export, so each call only reads and validates the lines written since the
+    previous Stop. The export starts over if the transcript was replaced or
+    shrank, or if the export file was removed.
+
+    Args:
+        transcript_path: Path to the JSONL transcript file
+        session_id: Claude Code session ID
+        log_dir: Directory holding the hook logs
+
+    Returns:
+        int: Number of entries appended
+    """
+    chat_dir = Path(log_dir) / 'chat'
+    chat_dir.mkdir(parents=True, exist_ok=True)
+    name = safe_session_name(session_id)
+    export_file = chat_dir / f'{name}.jsonl'
+    state_file = chat_dir / f'.{name}.offset'
+
+    state = {}
+    if state_file.exists():
+        try:
+            state = json.loads(state_file.read_text())
+        except (json.JSONDecodeError, ValueError):
+            state = {}
+
+    offset = state.get('offset', 0)
+    if (
+        state.get('transcript_path') != transcript_path
+        or not export_file.exists()
+        or os.path.getsize(transcript_path) < offset
+    ):
+        offset = 0
+
+    lines, new_offset = read_new_lines(transcript_path, offset)
+
+    valid_lines = []
+    for line in lines:
+        try:
+            json_codec.loads(line)
+            valid_lines.append(line.strip())
+        except (json.JSONDecodeError, ValueError):
+            pass  # Skip invalid lines
+
+    # Start a fresh export when re-reading from the beginning
+    with open(export_file, 'ab' if offset else 'wb') as f:
+        for line in valid_lines:
+            f.write(line + b'\n')
+
+    state_file.write_text(json.dumps({
+        'transcript_path': transcript_path,
+        'offset': new_offset,
+    }))
+
+    return len(valid_lines)
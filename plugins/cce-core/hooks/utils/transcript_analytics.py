@@ -0,0 +1,489 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "orjson",
+# ]
+# ///
+
+"""
+Transcript Analytics for Claude Code
+
+Streams Claude Code transcripts (JSONL) and PreCompact backups and reports
+per-session token usage, estimated cost, tool calls, turn latencies and
+compaction events. Files are read line by line, so memory use does not
+grow with transcript size; directories are spread across worker processes.
+
+A session is often present in several transcripts: PreCompact backups are
+prefixes of the live transcript, and a rewritten transcript starts a new
+backup chain that repeats its earlier entries. Transcripts of a session that
+start with the same entry are prefixes of one another, so only the longest
+of them is counted. Within a transcript, repeated entries and the token usage
+repeated across the entries of one API message are dropped using a window of
+the RECENT_IDS most recent ids, which keeps memory use bounded.
+
+Usage:
+    ./transcript_analytics.py ~/.claude/projects/my-project/
+    ./transcript_analytics.py session.jsonl logs/transcript_backups --json report.json
+    ./transcript_analytics.py ~/.claude/projects --workers 8 --top 20
+
+Inputs:
+    - *.jsonl transcript files
+    - directories (searched recursively for *.jsonl and backup manifests)
+    - logs/transcript_backups/<session>/manifest.json (newest snapshot of each chain)
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import json_codec
+from transcript_backups import MANIFEST_NAME, iter_snapshot_chunks, load_manifest
+
+USAGE_FIELDS = (
+    'input_tokens',
+    'output_tokens',
+    'cache_creation_input_tokens',
+    'cache_read_input_tokens',
+)
+
+# Approximate list prices in USD per million tokens (input, output), matched
+# by substring against the model name in order. Cache writes are billed at
+# 1.25x and cache reads at 0.1x the input price. Override with --prices.
+DEFAULT_PRICES = [
+    ('opus-4-5', 5.0, 25.0),
+    ('opus', 15.0, 75.0),
+    ('sonnet', 3.0, 15.0),
+    ('haiku-4-5', 1.0, 5.0),
+    ('3-5-haiku', 0.8, 4.0),
+    ('haiku', 0.25, 1.25),
+]
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+
+# Entry uuids and API message ids remembered for dropping duplicates
+RECENT_IDS = 4096
+
+
+def new_session_stats(session_id: str) -> dict:
+    """Return an empty per-session accumulator."""
+    return {
+        'session_id': session_id,
+        'sources': [],
+        'entries': 0,
+        'assistant_messages': 0,
+        'turns': 0,
+        'tool_calls': 0,
+        'tools': {},
+        'usage': {field: 0 for field in USAGE_FIELDS},
+        'usage_by_model': {},
+        'compactions': 0,
+        'compact_summaries': 0,
+        'latency_total': 0.0,
+        'latency_max': 0.0,
+        'latency_count': 0,
+        'first_timestamp': None,
+        'last_timestamp': None,
+        # Uuid of the session's first entry in the source (not part of the report)
+        'first_entry_id': None,
+    }
+
+
+def _parse_timestamp(value) -> float | None:
+    """Convert an ISO 8601 transcript timestamp to epoch seconds."""
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _is_user_prompt(entry: dict) -> bool:
+    """True for entries holding a prompt typed by the user (not tool results)."""
+    if entry.get('type') != 'user' or entry.get('isMeta') or entry.get('isCompactSummary'):
+        return False
+    content = entry.get('message', {}).get('content')
+    if isinstance(content, list):
+        return not any(
+            isinstance(block, dict) and block.get('type') == 'tool_result'
+            for block in content
+        )
+    return bool(content)
+
+
+class RecentIds:
+    """The `size` most recently added ids, for spotting repeats in a stream."""
+
+    def __init__(self, size: int = RECENT_IDS):
+        self._order = deque()
+        self._ids = set()
+        self.size = size
+
+    def add(self, value: str) -> bool:
+        """Remember an id; False if it is already among the recent ones."""
+        if value in self._ids:
+            return False
+        self._ids.add(value)
+        self._order.append(value)
+        if len(self._order) > self.size:
+            self._ids.discard(self._order.popleft())
+        return True
+
+
+class SessionAccumulator:
+    """Folds transcript entries into per-session statistics, one entry at a time."""
+
+    def __init__(self, source: str):
+        self.source = source
+        # Recent entry uuids and API message ids, already counted
+        self.seen = RecentIds()
+        # Entries without a sessionId fall back to the transcript (or backup) name
+        path = Path(source)
+        self.default_session = path.parent.name if path.name == MANIFEST_NAME else path.stem
+        self.sessions = {}
+        # Per-session streaming state that is not part of the report
+        self._turn_start = {}
+        self._turn_end = {}
+
+    def _close_turn(self, session_id: str) -> None:
+        start = self._turn_start.pop(session_id, None)
+        end = self._turn_end.pop(session_id, None)
+        if start is not None and end is not None and end >= start:
+            stats = self.sessions[session_id]
+            latency = end - start
+            stats['latency_total'] += latency
+            stats['latency_count'] += 1
+            stats['latency_max'] = max(stats['latency_max'], latency)
+
+    def add(self, entry) -> None:
+        """Account for one parsed transcript entry."""
+        if not isinstance(entry, dict):
+            return
+
+        session_id = entry.get('sessionId') or self.default_session
+        entry_id = entry.get('uuid')
+        if entry_id and not self.seen.add(entry_id):
+            return  # Same entry from an overlapping snapshot
+
+        stats = self.sessions.get(session_id)
+        if stats is None:
+            stats = self.sessions[session_id] = new_session_stats(session_id)
+            stats['sources'].append(self.source)
+            stats['first_entry_id'] = entry_id
+        stats['entries'] += 1
+
+        timestamp = _parse_timestamp(entry.get('timestamp'))
+        if timestamp is not None:
+            if stats['first_timestamp'] is None or timestamp < stats['first_timestamp']:
+                stats['first_timestamp'] = timestamp
+            if stats['last_timestamp'] is None or timestamp > stats['last_timestamp']:
+                stats['last_timestamp'] = timestamp
+
+        entry_type = entry.get('type')
+
+        if entry_type == 'system' and entry.get('subtype') == 'compact_boundary':
+            stats['compactions'] += 1
+            return
+
+        if entry.get('isCompactSummary'):
+            stats['compact_summaries'] += 1
+            return
+
+        if _is_user_prompt(entry):
+            self._close_turn(session_id)
+            stats['turns'] += 1
+            if timestamp is not None:
+                self._turn_start[session_id] = timestamp
+            return
+
+        if entry_type != 'assistant':
+            return
+
+        message = entry.get('message', {})
+        if timestamp is not None:
+            self._turn_end[session_id] = timestamp
+
+        # One API response is written as several entries (one per content
+        # block) that repeat the same usage, so count usage once per message
+        message_id = message.get('id') or entry.get('requestId')
+        usage = message.get('usage')
+        if message_id is None or self.seen.add(f"message:{message_id}"):
+            stats['assistant_messages'] += 1
+            if isinstance(usage, dict):
+                model = message.get('model', 'unknown')
+                model_usage = stats['usage_by_model'].setdefault(
+                    model, {field: 0 for field in USAGE_FIELDS}
+                )
+                for field in USAGE_FIELDS:
+                    value = usage.get(field) or 0
+                    stats['usage'][field] += value
+                    model_usage[field] += value
+
+        content = message.get('content')
+        if isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and block.get('type') == 'tool_use':
+                    name = block.get('name', 'unknown')
+                    stats['tool_calls'] += 1
+                    stats['tools'][name] = stats['tools'].get(name, 0) + 1
+
+    def finish(self) -> dict:
+        """Close open turns and return the per-session statistics."""
+        for session_id in list(self._turn_start):
+            self._close_turn(session_id)
+        return self.sessions
+
+
+def _file_lines(path: Path):
+    with open(path, 'rb') as f:
+        yield from f
+
+
+def _snapshot_lines(session_dir: Path, snapshot: dict):
+    pending = b''
+    for chunk in iter_snapshot_chunks(session_dir, snapshot):
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        yield from lines
+    if pending:
+        yield pending
+
+
+def iter_streams(source: str):
+    """
+    Yield the transcripts held by a source, each as an iterator of raw JSONL
+    lines: the file itself, or the newest snapshot of each backup chain.
+    """
+    path = Path(source)
+    if path.name != MANIFEST_NAME:
+        yield _file_lines(path)
+        return
+
+    # Each chain's newest snapshot contains all of its earlier ones
+    newest = {}
+    for snapshot in load_manifest(path.parent)['snapshots']:
+        newest[snapshot['chain']] = snapshot
+    for snapshot in newest.values():
+        yield _snapshot_lines(path.parent, snapshot)
+
+
+def analyze_source(source: str) -> list[dict]:
+    """
+    Analyze one transcript or backup manifest.
+
+    Returns:
+        list[dict]: Per-session statistics of each transcript in the source
+            (backup chains of one session may overlap, see combine_sources)
+    """
+    results = []
+    try:
+        for lines in iter_streams(source):
+            accumulator = SessionAccumulator(source)
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    accumulator.add(json_codec.loads(line))
+                except (json.JSONDecodeError, ValueError):
+                    continue
+            results.append(accumulator.finish())
+    except OSError as e:
+        print(f"Warning: could not read {source}: {e}", file=sys.stderr)
+    return results
+
+
+def merge_stats(target: dict, stats: dict) -> None:
+    """Merge one session's statistics into an accumulated entry for the same session."""
+    for key in ('entries', 'assistant_messages', 'turns', 'tool_calls', 'compactions',
+                'compact_summaries', 'latency_total', 'latency_count'):
+        target[key] += stats[key]
+    target['latency_max'] = max(target['latency_max'], stats['latency_max'])
+    target['sources'].extend(stats['sources'])
+    for name, count in stats['tools'].items():
+        target['tools'][name] = target['tools'].get(name, 0) + count
+    for field in USAGE_FIELDS:
+        target['usage'][field] += stats['usage'][field]
+    for model, usage in stats['usage_by_model'].items():
+        model_usage = target['usage_by_model'].setdefault(model, {field: 0 for field in USAGE_FIELDS})
+        for field in USAGE_FIELDS:
+            model_usage[field] += usage[field]
+    for key, pick in (('first_timestamp', min), ('last_timestamp', max)):
+        values = [v for v in (target[key], stats[key]) if v is not None]
+        target[key] = pick(values) if values else None
+
+
+def estimate_cost(usage_by_model: dict, prices: list) -> float:
+    """Estimate the cost in USD of a session's token usage."""
+    total = 0.0
+    for model, usage in usage_by_model.items():
+        price = next(((i, o) for key, i, o in prices if key in model), None)
+        if price is None:
+            continue
+        input_price, output_price = price
+        total += (
+            usage['input_tokens'] * input_price
+            + usage['output_tokens'] * output_price
+            + usage['cache_creation_input_tokens'] * input_price * CACHE_WRITE_MULTIPLIER
+            + usage['cache_read_input_tokens'] * input_price * CACHE_READ_MULTIPLIER
+        ) / 1_000_000
+    return total
+
+
+def discover_sources(paths: list[str]) -> list[str]:
+    """Expand files and directories into transcript files and backup manifests."""
+    sources = []
+    for raw in paths:
+        path = Path(raw).expanduser()
+        if path.is_dir():
+            for root, _, files in os.walk(path):
+                for name in files:
+                    if name.endswith('.jsonl') or name == MANIFEST_NAME:
+                        sources.append(str(Path(root) / name))
+        elif path.exists():
+            sources.append(str(path))
+        else:
+            print(f"Warning: {raw} not found", file=sys.stderr)
+    return sorted(sources)
+
+
+def combine_sources(session_id: str, candidates: list[dict]) -> dict:
+    """
+    Combine one session's statistics from several sources.
+
+    Sources starting with the same entry are snapshots of one transcript
+    taken at different times, so only the one with the most entries is
+    counted; sources with different first entries are added up.
+    """
+    longest = {}
+    for index, stats in enumerate(candidates):
+        key = stats['first_entry_id'] or index  # Without uuids every source stands alone
+        if key not in longest or stats['entries'] > longest[key]['entries']:
+            longest[key] = stats
+
+    kept = list(longest.values())
+    combined = kept[0] if len(kept) == 1 else new_session_stats(session_id)
+    if len(kept) > 1:
+        for stats in kept:
+            merge_stats(combined, stats)
+    combined['sources'] = list(dict.fromkeys(source for stats in candidates for source in stats['sources']))
+    return combined
+
+
+def build_report(sources: list[str], workers: int, prices: list) -> dict:
+    """Analyze all sources, in parallel when there are several, and combine them per session."""
+    if workers > 1 and len(sources) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyze_source, sources, chunksize=4))
+    else:
+        results = [analyze_source(source) for source in sources]
+
+    by_session = {}
+    for result in results:
+        for sessions in result:
+            for session_id, stats in sessions.items():
+                by_session.setdefault(session_id, []).append(stats)
+    sessions = {
+        session_id: candidates[0] if len(candidates) == 1 else combine_sources(session_id, candidates)
+        for session_id, candidates in by_session.items()
+    }
+
+    totals = new_session_stats('TOTAL')
+    for stats in sessions.values():
+        stats['cost_usd'] = round(estimate_cost(stats['usage_by_model'], prices), 4)
+        stats['latency_avg'] = (
+            stats['latency_total'] / stats['latency_count'] if stats['latency_count'] else 0.0
+        )
+        merge_stats(totals, stats)
+    totals['sources'] = []
+    for stats in [totals, *sessions.values()]:
+        del stats['first_entry_id']
+    totals['cost_usd'] = round(sum(s['cost_usd'] for s in sessions.values()), 4)
+    totals['latency_avg'] = (
+        totals['latency_total'] / totals['latency_count'] if totals['latency_count'] else 0.0
+    )
+
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'source_count': len(sources),
+        'session_count': len(sessions),
+        'totals': totals,
+        'sessions': sorted(
+            sessions.values(),
+            key=lambda s: sum(s['usage'].values()),
+            reverse=True,
+        ),
+    }
+
+
+def _compact(n: float) -> str:
+    """Format a count as 1.2k / 3.4M."""
+    for unit, size in (('B', 1e9), ('M', 1e6), ('k', 1e3)):
+        if abs(n) >= size:
+            return f"{n / size:.1f}{unit}"
+    return str(int(n))
+
+
+def print_summary(report: dict, top: int) -> None:
+    """Print the compact per-session summary table."""
+    header = (f"{'session':<10} {'turns':>6} {'tools':>6} {'input':>8} {'output':>8} "
+              f"{'cache_w':>8} {'cache_r':>8} {'cost$':>8} {'compact':>7} {'avg_s':>6} {'max_s':>6}  top tools")
+    print(header)
+    print('-' * len(header))
+
+    rows = report['sessions'][:top] if top else report['sessions']
+    for stats in rows + [report['totals']]:
+        usage = stats['usage']
+        top_tools = ', '.join(
+            f"{name}:{count}" for name, count in
+            sorted(stats['tools'].items(), key=lambda item: item[1], reverse=True)[:3]
+        )
+        compactions = max(stats['compactions'], stats['compact_summaries'])
+        if stats['session_id'] == 'TOTAL':
+            print('-' * len(header))
+        print(f"{stats['session_id'][:10]:<10} {stats['turns']:>6} {stats['tool_calls']:>6} "
+              f"{_compact(usage['input_tokens']):>8} {_compact(usage['output_tokens']):>8} "
+              f"{_compact(usage['cache_creation_input_tokens']):>8} "
+              f"{_compact(usage['cache_read_input_tokens']):>8} {stats['cost_usd']:>8.2f} "
+              f"{compactions:>7} {stats['latency_avg']:>6.1f} {stats['latency_max']:>6.1f}  {top_tools}")
+
+    print(f"\n{report['session_count']} session(s) from {report['source_count']} source(s)")
+
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description='Per-session token, tool and cost report for Claude Code transcripts')
+    parser.add_argument('paths', nargs='+', help='Transcript files, backup manifests or directories')
+    parser.add_argument('--json', dest='json_path', help='Write the full report to this JSON file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes for multiple sources (default: CPU count)')
+    parser.add_argument('--top', type=int, default=25, help='Sessions shown in the table (0 for all)')
+    parser.add_argument('--prices', help='JSON file of [model_substring, input_usd_per_mtok, output_usd_per_mtok] rows')
+    args = parser.parse_args()
+
+    prices = DEFAULT_PRICES
+    if args.prices:
+        with open(args.prices, 'r') as f:
+            prices = [tuple(row) for row in json.load(f)]
+
+    sources = discover_sources(args.paths)
+    if not sources:
+        print("No transcripts found", file=sys.stderr)
+        sys.exit(1)
+
+    report = build_report(sources, args.workers, prices)
+    print_summary(report, args.top)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
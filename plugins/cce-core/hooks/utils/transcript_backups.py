@@ -0,0 +1,336 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.11"
+# dependencies = []
+# ///
+
+"""
+Compressed, delta-based transcript backups for the PreCompact hook.
+
+Transcripts are append-only, so each session keeps a gzip "chain": the first
+backup compresses the whole transcript, and every later backup appends only
+the bytes written since the previous one as a new gzip member. Concatenated
+gzip members form a valid gzip stream, so snapshot N is simply the chain's
+first `compressed_size` bytes, decompressed.
+
+Layout:
+    logs/transcript_backups/<session>/manifest.json
+    logs/transcript_backups/<session>/<chain>.jsonl.gz
+
+A new chain is started when the transcript no longer extends the last
+snapshot (it shrank or its tail changed).
+
+Usage:
+    ./transcript_backups.py list
+    ./transcript_backups.py restore <session> <snapshot_id> [-o output.jsonl]
+    ./transcript_backups.py prune [--keep-days 30] [--max-snapshots 20]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_BACKUP_DIR = Path("logs") / "transcript_backups"
+MANIFEST_NAME = "manifest.json"
+COMPRESS_LEVEL = 6
+CHUNK_SIZE = 1024 * 1024
+FINGERPRINT_SIZE = 4096
+
+
+def _tail_fingerprint(path, size: int) -> str:
+    """Hash the bytes just before `size` to check the file was only appended to."""
+    start = max(0, size - FINGERPRINT_SIZE)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(size - start)).hexdigest()
+
+
+def load_manifest(session_dir: Path) -> dict:
+    """Load a session's backup manifest, or an empty one."""
+    manifest_file = session_dir / MANIFEST_NAME
+    if manifest_file.exists():
+        try:
+            with open(manifest_file, 'r') as f:
+                manifest = json.load(f)
+                if isinstance(manifest, dict):
+                    manifest.setdefault('snapshots', [])
+                    return manifest
+        except (json.JSONDecodeError, ValueError):
+            pass
+    return {'snapshots': []}
+
+
+def save_manifest(session_dir: Path, manifest: dict) -> None:
+    """Atomically write a session's backup manifest."""
+    tmp_file = session_dir / f".{MANIFEST_NAME}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, session_dir / MANIFEST_NAME)
+
+
+def _append_member(chain_file: Path, transcript_path, start: int, end: int) -> None:
+    """Compress transcript bytes [start, end) as a new gzip member of the chain."""
+    with open(transcript_path, 'rb') as src, open(chain_file, 'ab') as dst:
+        src.seek(start)
+        remaining = end - start
+        with gzip.GzipFile(fileobj=dst, mode='wb', compresslevel=COMPRESS_LEVEL) as gz:
+            while remaining > 0:
+                chunk = src.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                gz.write(chunk)
+                remaining -= len(chunk)
+
+
+def backup_transcript(transcript_path, trigger: str, backup_dir=DEFAULT_BACKUP_DIR) -> dict | None:
+    """
+    Record a snapshot of the transcript, storing only the bytes added since the last one.
+
+    Args:
+        transcript_path: Path to the JSONL transcript file
+        trigger: Compaction trigger ("manual" or "auto")
+        backup_dir: Root directory for transcript backups
+
+    Returns:
+        dict: The new snapshot record (with a 'session' key), or None if the transcript is missing
+    """
+    if not os.path.exists(transcript_path):
+        return None
+
+    session = Path(transcript_path).stem
+    session_dir = Path(backup_dir) / session
+    session_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(session_dir)
+    snapshots = manifest['snapshots']
+    last = snapshots[-1] if snapshots else None
+    size = os.path.getsize(transcript_path)
+
+    snapshot_id = last['id'] + 1 if last else 1
+
+    extends_last = False
+    if last:
+        chain_file = session_dir / last['chain']
+        extends_last = (
+            chain_file.exists()
+            and os.path.getsize(chain_file) >= last['compressed_size']
+            and size >= last['size']
+            and _tail_fingerprint(transcript_path, last['size']) == last['tail_sha256']
+        )
+
+    if extends_last:
+        chain = last['chain']
+        chain_file = session_dir / chain
+        # Drop any partial member left behind by an interrupted backup
+        if os.path.getsize(chain_file) > last['compressed_size']:
+            with open(chain_file, 'r+b') as f:
+                f.truncate(last['compressed_size'])
+        if size > last['size']:
+            _append_member(chain_file, transcript_path, last['size'], size)
+    else:
+        # Chains are named after their first snapshot, so two chains started
+        # within the same second never share a file
+        base = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{snapshot_id}_{trigger}"
+        referenced = {snapshot['chain'] for snapshot in snapshots}
+        chain, suffix = f"{base}.jsonl.gz", 1
+        while chain in referenced:
+            suffix += 1
+            chain = f"{base}_{suffix}.jsonl.gz"
+        chain_file = session_dir / chain
+        chain_file.unlink(missing_ok=True)  # Unreferenced leftover of an interrupted backup
+        _append_member(chain_file, transcript_path, 0, size)
+
+    snapshot = {
+        'id': snapshot_id,
+        'trigger': trigger,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'chain': chain,
+        'size': size,
+        'compressed_size': os.path.getsize(chain_file),
+        'tail_sha256': _tail_fingerprint(transcript_path, size),
+    }
+    snapshots.append(snapshot)
+    manifest['transcript_path'] = str(transcript_path)
+    save_manifest(session_dir, manifest)
+
+    return {**snapshot, 'session': session}
+
+
+def iter_snapshot_chunks(session_dir: Path, snapshot: dict):
+    """
+    Yield the decompressed bytes of a snapshot, a chunk at a time.
+
+    Args:
+        session_dir: Directory holding the session's manifest and chains
+        snapshot: Snapshot record from the manifest
+    """
+    remaining = snapshot['compressed_size']
+    decompressor = zlib.decompressobj(wbits=31)
+    with open(Path(session_dir) / snapshot['chain'], 'rb') as f:
+        while remaining > 0:
+            data = f.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            # Each appended backup is a separate gzip member
+            while data:
+                yield decompressor.decompress(data)
+                if decompressor.eof:
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(wbits=31)
+                else:
+                    data = b''
+    yield decompressor.flush()
+
+
+def restore_snapshot(session_dir: Path, snapshot_id: int, output_path) -> int:
+    """
+    Rebuild a snapshot of a transcript from its chain.
+
+    Args:
+        session_dir: Directory holding the session's manifest and chains
+        snapshot_id: ID of the snapshot to restore
+        output_path: File to write the rebuilt transcript to
+
+    Returns:
+        int: Number of bytes written
+
+    Raises:
+        KeyError: If the snapshot does not exist
+        ValueError: If the restored size does not match the manifest
+    """
+    manifest = load_manifest(Path(session_dir))
+    snapshot = next((s for s in manifest['snapshots'] if s['id'] == snapshot_id), None)
+    if snapshot is None:
+        raise KeyError(f"Snapshot {snapshot_id} not found in {session_dir}")
+
+    written = 0
+    with open(output_path, 'wb') as out:
+        for chunk in iter_snapshot_chunks(session_dir, snapshot):
+            out.write(chunk)
+            written += len(chunk)
+
+    if written != snapshot['size']:
+        raise ValueError(f"Restored {written} bytes, expected {snapshot['size']}")
+    return written
+
+
+def prune_backups(backup_dir=DEFAULT_BACKUP_DIR, keep_days: float | None = None,
+                  max_snapshots: int | None = None) -> int:
+    """
+    Apply the retention policy to the transcript backups.
+
+    Sessions whose newest backup is older than `keep_days` are removed along
+    with legacy full-copy backups of the same age. Within a session, only the
+    newest `max_snapshots` snapshots are kept; a chain file is deleted once no
+    remaining snapshot refers to it.
+
+    Args:
+        backup_dir: Root directory for transcript backups
+        keep_days: Maximum age of a session's newest backup, in days
+        max_snapshots: Maximum number of snapshots kept per session
+
+    Returns:
+        int: Number of files and session directories removed
+    """
+    backup_dir = Path(backup_dir)
+    if not backup_dir.exists():
+        return 0
+
+    removed = 0
+    cutoff = time.time() - keep_days * 86400 if keep_days is not None else None
+
+    for entry in backup_dir.iterdir():
+        if entry.is_file():
+            # Full copies written before backups were stored as chains
+            if cutoff is not None and entry.suffix == '.jsonl' and entry.stat().st_mtime < cutoff:
+                entry.unlink()
+                removed += 1
+            continue
+
+        manifest_file = entry / MANIFEST_NAME
+        if not manifest_file.exists():
+            continue
+
+        if cutoff is not None and manifest_file.stat().st_mtime < cutoff:
+            shutil.rmtree(entry)
+            removed += 1
+            continue
+
+        if max_snapshots is not None:
+            manifest = load_manifest(entry)
+            snapshots = manifest['snapshots']
+            if len(snapshots) > max_snapshots:
+                manifest['snapshots'] = snapshots[-max_snapshots:]
+                save_manifest(entry, manifest)
+                in_use = {s['chain'] for s in manifest['snapshots']}
+                for chain_file in entry.glob('*.jsonl.gz'):
+                    if chain_file.name not in in_use:
+                        chain_file.unlink()
+                        removed += 1
+
+    return removed
+
+
+def list_backups(backup_dir=DEFAULT_BACKUP_DIR):
+    """Yield (session, snapshot) pairs for every recorded snapshot."""
+    backup_dir = Path(backup_dir)
+    if not backup_dir.exists():
+        return
+    for manifest_file in sorted(backup_dir.glob(f'*/{MANIFEST_NAME}')):
+        for snapshot in load_manifest(manifest_file.parent)['snapshots']:
+            yield manifest_file.parent.name, snapshot
+
+
+def main():
+    """Command line interface for listing, restoring and pruning backups."""
+    parser = argparse.ArgumentParser(description='Manage compressed transcript backups')
+    parser.add_argument('--backup-dir', default=str(DEFAULT_BACKUP_DIR),
+                        help='Backup root directory (default: logs/transcript_backups)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='List sessions and snapshots')
+
+    restore_parser = subparsers.add_parser('restore', help='Rebuild a snapshot')
+    restore_parser.add_argument('session', help='Session name (transcript file stem)')
+    restore_parser.add_argument('snapshot_id', type=int, help='Snapshot ID from "list"')
+    restore_parser.add_argument('-o', '--output', help='Output file (default: <session>_<id>.jsonl)')
+
+    prune_parser = subparsers.add_parser('prune', help='Apply the retention policy')
+    prune_parser.add_argument('--keep-days', type=float, help='Remove sessions older than this')
+    prune_parser.add_argument('--max-snapshots', type=int, help='Snapshots to keep per session')
+
+    args = parser.parse_args()
+    backup_dir = Path(args.backup_dir)
+
+    if args.command == 'list':
+        for session, snapshot in list_backups(backup_dir):
+            ratio = snapshot['compressed_size'] / snapshot['size'] if snapshot['size'] else 0
+            print(f"{session}  #{snapshot['id']:<3} {snapshot['timestamp']}  "
+                  f"{snapshot['trigger']:<6} {snapshot['size']:>12,} bytes  "
+                  f"(chain {snapshot['chain']}, {ratio:.0%} of original)")
+
+    elif args.command == 'restore':
+        output = args.output or f"{args.session}_{args.snapshot_id}.jsonl"
+        try:
+            written = restore_snapshot(backup_dir / args.session, args.snapshot_id, output)
+        except (KeyError, ValueError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Restored {written:,} bytes to {output}")
+
+    elif args.command == 'prune':
+        removed = prune_backups(backup_dir, args.keep_days, args.max_snapshots)
+        print(f"Removed {removed} backup file(s)")
+
+
+if __name__ == '__main__':
+    main()
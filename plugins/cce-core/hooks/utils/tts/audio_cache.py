@@ -0,0 +1,200 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+"""
+Rendered-audio cache shared by the TTS scripts.
+
+Announcements are mostly the same short phrases ("All done!", "Resuming
+previous session"), so each script stores the audio it synthesizes in
+$XDG_CACHE_HOME/claude-code-extensions/tts/, keyed by (engine, voice, model,
+text), and plays a cached clip directly instead of synthesizing it again.
+Clips are touched when played; the least recently played are evicted once
+the cache exceeds TTS_CACHE_MAX_MB (default 50).
+
+The TTS scripts accept --prewarm PHRASE... to fill the cache without
+speaking; session_start.py does this in the background for the hooks' fixed
+messages.
+
+Usage:
+    ./audio_cache.py --stats
+    ./audio_cache.py --clear
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+DEFAULT_MAX_MB = 50
+
+
+def cache_dir():
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'claude-code-extensions' / 'tts'
+
+
+def clip_path(engine, voice, model, text, extension):
+    """Path of the cached clip for a phrase (which may not exist yet)."""
+    key = hashlib.sha256(json.dumps([engine, voice, model, text]).encode('utf-8')).hexdigest()
+    return cache_dir() / f"{key}.{extension}"
+
+
+def lookup(engine, voice, model, text, extension):
+    """
+    Find a cached clip and mark it as recently used.
+
+    Returns:
+        Path: The clip, or None if the phrase was not cached
+    """
+    path = clip_path(engine, voice, model, text, extension)
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+
+def store(engine, voice, model, text, extension, chunks):
+    """
+    Write synthesized audio to the cache.
+
+    Args:
+        engine, voice, model, text: Cache key
+        extension: Audio file extension ('mp3', 'wav')
+        chunks: Audio as bytes or an iterable of byte chunks
+
+    Returns:
+        Path: The cached clip
+    """
+    path = clip_path(engine, voice, model, text, extension)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.parent / f".{path.name}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        if isinstance(chunks, (bytes, bytearray)):
+            f.write(chunks)
+        else:
+            for chunk in chunks:
+                f.write(chunk)
+    os.replace(tmp_path, path)
+    evict()
+    return path
+
+
+def temporary_path(engine, voice, model, text, extension):
+    """Path an engine can render a file to before store_file() moves it into the cache."""
+    path = clip_path(engine, voice, model, text, extension)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path.parent / f".{path.stem}.{os.getpid()}.tmp.{extension}"
+
+
+def store_file(engine, voice, model, text, extension, rendered):
+    """Move a file rendered at temporary_path() into the cache."""
+    path = clip_path(engine, voice, model, text, extension)
+    os.replace(rendered, path)
+    evict()
+    return path
+
+
+def evict(max_bytes=None):
+    """Delete the least recently used clips until the cache fits its size limit."""
+    if max_bytes is None:
+        try:
+            max_bytes = float(os.getenv('TTS_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024
+        except ValueError:
+            max_bytes = DEFAULT_MAX_MB * 1024 * 1024
+
+    clips = []
+    for path in cache_dir().glob('*.*'):
+        if path.name.startswith('.'):
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        clips.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in clips)
+    for _, size, path in sorted(clips):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+            total -= size
+        except OSError:
+            pass
+
+
+def player_command(path):
+    """
+    Command line of an installed audio player for a clip.
+
+    Returns:
+        list: Command, or None if no suitable player is installed
+    """
+    path = str(path)
+    candidates = [
+        ['afplay', path],                                                  # macOS
+        ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet', path],
+        ['mpg123', '-q', path] if path.endswith('.mp3') else None,
+        ['paplay', path] if path.endswith('.wav') else None,
+        ['aplay', '-q', path] if path.endswith('.wav') else None,
+    ]
+    for command in candidates:
+        if command and shutil.which(command[0]):
+            return command
+    return None
+
+
+def has_player(extension):
+    """Whether an installed audio player can play clips of a format."""
+    return player_command(f"clip.{extension}") is not None
+
+
+def play_file(path, timeout=30):
+    """
+    Play a clip with an installed audio player.
+
+    Returns:
+        bool: True if the clip was played, False if no player could play it
+    """
+    command = player_command(path)
+    if command is None:
+        if sys.platform == 'win32' and str(path).endswith('.wav'):
+            import winsound
+            winsound.PlaySound(str(path), winsound.SND_FILENAME)
+            return True
+        return False
+    try:
+        return subprocess.run(command, capture_output=True, timeout=timeout).returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+
+def prewarm_phrases(argv):
+    """Phrases after a leading --prewarm flag, or None if the flag is absent."""
+    if len(argv) > 1 and argv[1] == '--prewarm':
+        return [phrase for phrase in argv[2:] if phrase.strip()]
+    return None
+
+
+def main():
+    """Command line interface for inspecting the cache."""
+    if len(sys.argv) > 1 and sys.argv[1] == '--stats':
+        clips = [path for path in cache_dir().glob('*.*') if not path.name.startswith('.')]
+        size = sum(path.stat().st_size for path in clips)
+        print(f"{len(clips)} clips, {size / 1024:.0f} KB in {cache_dir()}")
+    elif len(sys.argv) > 1 and sys.argv[1] == '--clear':
+        shutil.rmtree(cache_dir(), ignore_errors=True)
+        print("Cache cleared")
+    else:
+        print("Usage: ./audio_cache.py --stats or ./audio_cache.py --clear")
+
+
+if __name__ == '__main__':
+    main()
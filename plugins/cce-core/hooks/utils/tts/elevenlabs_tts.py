@@ -11,6 +11,75 @@ import os
 import sys
 from dotenv import load_dotenv
 
+import audio_cache
+import streaming
+
+VOICE_ID = "WejK3H1m7MI9CHnIjW9K"
+MODEL_ID = "eleven_turbo_v2_5"
+OUTPUT_FORMAT = "mp3_44100_128"
+
+# Reused for every utterance of this process
+_client = None
+
+
+def get_client(api_key):
+    """Return the process-wide ElevenLabs client."""
+    global _client
+    if _client is None:
+        from elevenlabs.client import ElevenLabs
+        # ELEVENLABS_BASE_URL points the client at another endpoint (e.g. the latency benchmark's stub)
+        base_url = os.getenv('ELEVENLABS_BASE_URL')
+        _client = ElevenLabs(api_key=api_key, base_url=base_url) if base_url else ElevenLabs(api_key=api_key)
+    return _client
+
+
+def synthesize(elevenlabs, text):
+    """Return the cached clip of a phrase, synthesizing it into the cache on a miss."""
+    clip = audio_cache.lookup('elevenlabs', VOICE_ID, MODEL_ID, text, 'mp3')
+    if clip is None:
+        audio = elevenlabs.text_to_speech.convert(
+            text=text,
+            voice_id=VOICE_ID,  # Specified voice
+            model_id=MODEL_ID,
+            output_format=OUTPUT_FORMAT,
+        )
+        clip = audio_cache.store('elevenlabs', VOICE_ID, MODEL_ID, text, 'mp3', audio)
+    return clip
+
+
+def stream(elevenlabs, text):
+    """Play a phrase while it is synthesized, then cache the clip."""
+    with streaming.StreamPlayer(bitrate_kbps=128) as player:
+        for chunk in elevenlabs.text_to_speech.stream(
+            text=text,
+            voice_id=VOICE_ID,
+            model_id=MODEL_ID,
+            output_format=OUTPUT_FORMAT,
+        ):
+            player.feed(chunk)
+    audio_cache.store('elevenlabs', VOICE_ID, MODEL_ID, text, 'mp3', player.audio())
+    streaming.report_ttfa('elevenlabs', player.ttfa, text)
+
+
+def speak(elevenlabs, text):
+    """
+    Speak a phrase: a cached clip directly, a new one streamed as it arrives.
+
+    Falls back to synthesizing the whole clip when no streaming player is installed.
+    """
+    clip = audio_cache.lookup('elevenlabs', VOICE_ID, MODEL_ID, text, 'mp3')
+    if clip is not None and audio_cache.play_file(clip):
+        return
+    if clip is None and streaming.stream_player_command():
+        stream(elevenlabs, text)
+        return
+
+    clip = synthesize(elevenlabs, text)
+    if not audio_cache.play_file(clip):
+        from elevenlabs import play
+        play(clip.read_bytes())
+
+
 def main():
     """
     ElevenLabs Turbo v2.5 TTS Script
@@ -21,12 +90,15 @@ def main():
     Usage:
     - ./eleven_turbo_tts.py                    # Uses default text
     - ./eleven_turbo_tts.py "Your custom text" # Uses provided text
+    - ./eleven_turbo_tts.py --prewarm "A" "B"  # Caches phrases without playing
     
     Features:
     - Fast generation (optimized for real-time use)
     - High-quality voice synthesis
     - Stable production model
     - Cost-effective for high-volume usage
+    - Streaming playback with a jitter buffer (see streaming.py)
+    - Cached clips for repeated phrases (see audio_cache.py)
     """
     
     # Load environment variables
@@ -41,12 +113,15 @@ def main():
         sys.exit(1)
     
     try:
-        from elevenlabs.client import ElevenLabs
-        from elevenlabs import play
-        
         # Initialize client
-        elevenlabs = ElevenLabs(api_key=api_key)
+        elevenlabs = get_client(api_key)
         
+        prewarm = audio_cache.prewarm_phrases(sys.argv)
+        if prewarm is not None:
+            for phrase in prewarm:
+                synthesize(elevenlabs, phrase)
+            return
+
         print("🎙️  ElevenLabs Turbo v2.5 TTS")
         print("=" * 40)
         
@@ -60,15 +135,8 @@ def main():
         print("🔊 Generating and playing...")
         
         try:
-            # Generate and play audio directly
-            audio = elevenlabs.text_to_speech.convert(
-                text=text,
-                voice_id="WejK3H1m7MI9CHnIjW9K",  # Specified voice
-                model_id="eleven_turbo_v2_5",
-                output_format="mp3_44100_128",
-            )
-            
-            play(audio)
+            # Play the cached clip, or stream a new one while it is generated
+            speak(elevenlabs, text)
             print("✅ Playback complete!")
             
         except Exception as e:
@@ -13,6 +13,79 @@ import sys
 import asyncio
 from dotenv import load_dotenv
 
+import audio_cache
+import streaming
+
+MODEL = "gpt-4o-mini-tts"
+VOICE = "nova"
+INSTRUCTIONS = "Speak in a cheerful, positive yet professional tone."
+
+# Reused for every utterance of this process
+_client = None
+
+
+def get_client(api_key):
+    """Return the process-wide OpenAI client."""
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+        _client = AsyncOpenAI(api_key=api_key)
+    return _client
+
+
+def create_speech(openai, text):
+    """Start a streaming speech request (an async context manager)."""
+    return openai.audio.speech.with_streaming_response.create(
+        model=MODEL,
+        voice=VOICE,
+        input=text,
+        instructions=INSTRUCTIONS,
+        response_format="mp3",
+    )
+
+
+async def synthesize(openai, text):
+    """Return the cached clip of a phrase, synthesizing it into the cache on a miss."""
+    clip = audio_cache.lookup('openai', VOICE, [MODEL, INSTRUCTIONS], text, 'mp3')
+    if clip is None:
+        async with create_speech(openai, text) as response:
+            audio = await response.read()
+        clip = audio_cache.store('openai', VOICE, [MODEL, INSTRUCTIONS], text, 'mp3', audio)
+    return clip
+
+
+async def stream(openai, text):
+    """Play a phrase while it is synthesized, then cache the clip."""
+    with streaming.StreamPlayer(bitrate_kbps=128) as player:
+        async with create_speech(openai, text) as response:
+            async for chunk in response.iter_bytes():
+                player.feed(chunk)
+    audio_cache.store('openai', VOICE, [MODEL, INSTRUCTIONS], text, 'mp3', player.audio())
+    streaming.report_ttfa('openai', player.ttfa, text)
+
+
+async def speak(openai, text):
+    """
+    Speak a phrase: a cached clip directly, a new one streamed as it arrives.
+
+    Without a streaming player the whole clip is synthesized first; without
+    any player OpenAI's LocalAudioPlayer is used.
+    """
+    clip = audio_cache.lookup('openai', VOICE, [MODEL, INSTRUCTIONS], text, 'mp3')
+    if clip is not None and audio_cache.play_file(clip):
+        return
+    if streaming.stream_player_command():
+        await stream(openai, text)
+        return
+
+    if audio_cache.has_player('mp3'):
+        audio_cache.play_file(await synthesize(openai, text))
+        return
+
+    from openai.helpers import LocalAudioPlayer
+    async with create_speech(openai, text) as response:
+        await LocalAudioPlayer().play(response)
+
 
 async def main():
     """
@@ -24,12 +97,15 @@ async def main():
     Usage:
     - ./openai_tts.py                    # Uses default text
     - ./openai_tts.py "Your custom text" # Uses provided text
+    - ./openai_tts.py --prewarm "A" "B"  # Caches phrases without playing
 
     Features:
     - OpenAI gpt-4o-mini-tts model (latest)
     - Nova voice (engaging and warm)
     - Streaming audio with instructions support
     - Live audio playback via LocalAudioPlayer
+    - Streaming playback with a jitter buffer (see streaming.py)
+    - Cached clips for repeated phrases (see audio_cache.py)
     """
 
     # Load environment variables
@@ -44,11 +120,14 @@ async def main():
         sys.exit(1)
 
     try:
-        from openai import AsyncOpenAI
-        from openai.helpers import LocalAudioPlayer
-
         # Initialize OpenAI client
-        openai = AsyncOpenAI(api_key=api_key)
+        openai = get_client(api_key)
+
+        prewarm = audio_cache.prewarm_phrases(sys.argv)
+        if prewarm is not None:
+            for phrase in prewarm:
+                await synthesize(openai, phrase)
+            return
 
         print("🎙️  OpenAI TTS")
         print("=" * 20)
@@ -63,15 +142,8 @@ async def main():
         print("🔊 Generating and streaming...")
 
         try:
-            # Generate and stream audio using OpenAI TTS
-            async with openai.audio.speech.with_streaming_response.create(
-                model="gpt-4o-mini-tts",
-                voice="nova",
-                input=text,
-                instructions="Speak in a cheerful, positive yet professional tone.",
-                response_format="mp3",
-            ) as response:
-                await LocalAudioPlayer().play(response)
+            # Play the cached clip, or stream a new one while it is generated
+            await speak(openai, text)
 
             print("✅ Playback complete!")
 
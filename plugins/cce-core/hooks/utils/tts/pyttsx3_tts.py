@@ -6,40 +6,215 @@
 # ]
 # ///
 
-import sys
+import json
+import os
 import random
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import audio_cache
+
+DEFAULT_RATE = 180
+
+# The resident engine exits after this many idle seconds
+SERVER_IDLE_EXIT = 600
+CONNECT_TIMEOUT = 0.5
+SPEAK_TIMEOUT = 30
+
+
+def voice_settings():
+    """Voice, rate and volume from TTS_VOICE, TTS_RATE and TTS_VOLUME."""
+    settings = {'voice': os.getenv('TTS_VOICE') or None, 'rate': DEFAULT_RATE, 'volume': None}
+    try:
+        settings['rate'] = int(os.getenv('TTS_RATE', DEFAULT_RATE))
+    except ValueError:
+        pass
+    try:
+        if os.getenv('TTS_VOLUME'):
+            settings['volume'] = min(1.0, max(0.0, float(os.getenv('TTS_VOLUME'))))
+    except ValueError:
+        pass
+    return settings
+
+
+def apply_settings(engine, settings):
+    """Configure the engine for an utterance."""
+    if settings.get('voice'):
+        engine.setProperty('voice', settings['voice'])
+    engine.setProperty('rate', settings['rate'])    # Speech rate (words per minute)
+    if settings.get('volume') is not None:
+        engine.setProperty('volume', settings['volume'])  # Volume (0.0 to 1.0)
+
+
+def _cache_key(settings):
+    """Voice and model fields of the audio cache key."""
+    return settings.get('voice') or 'default', [settings['rate'], settings.get('volume')]
+
+
+def speak(engine, text, settings):
+    """Play the cached clip of a phrase, rendering it into the cache first if needed."""
+    apply_settings(engine, settings)
+    voice, model = _cache_key(settings)
+    clip = None
+    if audio_cache.has_player('wav'):
+        clip = audio_cache.lookup('pyttsx3', voice, model, text, 'wav') or render(engine, text, settings)
+    if clip is None or not audio_cache.play_file(clip):
+        # No audio player (or rendering unsupported): speak directly
+        engine.say(text)
+        engine.runAndWait()
+
+
+def render(engine, text, settings):
+    """Render a phrase to a WAV clip in the audio cache."""
+    voice, model = _cache_key(settings)
+    rendered = audio_cache.temporary_path('pyttsx3', voice, model, text, 'wav')
+    try:
+        engine.save_to_file(text, str(rendered))
+        engine.runAndWait()
+        if not rendered.exists() or rendered.stat().st_size == 0:
+            return None
+        return audio_cache.store_file('pyttsx3', voice, model, text, 'wav', rendered)
+    except Exception:
+        rendered.unlink(missing_ok=True)
+        return None
+
+
+def socket_path():
+    """Local socket of the resident engine."""
+    return audio_cache.cache_dir().parent / 'pyttsx3.sock'
+
+
+def send_to_server(text, settings):
+    """
+    Ask the resident engine to speak and wait until it has.
+
+    Returns:
+        bool: True if the resident engine spoke the text
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(CONNECT_TIMEOUT)
+            client.connect(str(socket_path()))
+            client.settimeout(SPEAK_TIMEOUT)
+            client.sendall(json.dumps({'text': text, 'settings': settings}).encode('utf-8') + b'\n')
+            reply = client.makefile('rb').readline()
+        return bool(json.loads(reply).get('ok'))
+    except (OSError, ValueError):
+        return False
+
+
+def spawn_server():
+    """Start the resident engine in the background."""
+    if not hasattr(socket, 'AF_UNIX') or os.getenv('TTS_RESIDENT', 'true').lower() == 'false':
+        return
+    try:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), '--serve'],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except OSError:
+        pass
+
+
+def serve(idle_exit=SERVER_IDLE_EXIT):
+    """
+    Run the resident engine: initialize pyttsx3 once, then speak the
+    utterances sent to the local socket one at a time.
+    """
+    import pyttsx3
+
+    path = socket_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        if send_to_server('', voice_settings()):
+            return  # Another resident engine is running
+        path.unlink(missing_ok=True)  # Left behind by a crashed engine
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(str(path))
+    except OSError:
+        server.close()
+        return  # Another engine started at the same time
+    server.listen(8)
+    server.settimeout(idle_exit)
+
+    try:
+        engine = pyttsx3.init()
+        while True:
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                break
+            with connection:
+                connection.settimeout(5)
+                try:
+                    request = json.loads(connection.makefile('rb').readline())
+                    if request.get('text'):
+                        speak(engine, request['text'], request.get('settings') or voice_settings())
+                    ok = True
+                except Exception:
+                    ok = False
+                try:
+                    connection.sendall(json.dumps({'ok': ok}).encode('utf-8') + b'\n')
+                except OSError:
+                    pass
+    finally:
+        server.close()
+        path.unlink(missing_ok=True)
+
 
 def main():
     """
     pyttsx3 TTS Script
-    
+
     Uses pyttsx3 for offline text-to-speech synthesis.
     Accepts optional text prompt as command-line argument.
-    
+
     Usage:
     - ./pyttsx3_tts.py                    # Uses default text
     - ./pyttsx3_tts.py "Your custom text" # Uses provided text
-    
+    - ./pyttsx3_tts.py --prewarm "A" "B"  # Renders phrases into the audio cache
+    - ./pyttsx3_tts.py --serve            # Runs the resident engine
+
     Features:
     - Offline TTS (no API key required)
     - Cross-platform compatibility
-    - Configurable voice settings
-    - Immediate audio playback
+    - Configurable voice settings (TTS_VOICE, TTS_RATE, TTS_VOLUME)
+    - Cached clips for repeated phrases (see audio_cache.py)
+    - Resident engine: the first call starts a background process that keeps
+      pyttsx3 initialized and speaks later utterances sent over a local
+      socket (TTS_RESIDENT=false to disable)
     """
-    
+
     try:
-        import pyttsx3
-        
-        # Initialize TTS engine
-        engine = pyttsx3.init()
-        
-        # Configure engine settings
-        engine.setProperty('rate', 180)    # Speech rate (words per minute)
-        # engine.setProperty('volume', 0.4)  # Volume (0.0 to 1.0)
-        
+        if len(sys.argv) > 1 and sys.argv[1] == '--serve':
+            serve()
+            return
+
+        settings = voice_settings()
+
+        prewarm = audio_cache.prewarm_phrases(sys.argv)
+        if prewarm is not None:
+            import pyttsx3
+            engine = pyttsx3.init()
+            apply_settings(engine, settings)
+            voice, model = _cache_key(settings)
+            for phrase in prewarm:
+                if audio_cache.lookup('pyttsx3', voice, model, phrase, 'wav') is None:
+                    render(engine, phrase, settings)
+            return
+
         print("🎙️  pyttsx3 TTS")
         print("=" * 15)
-        
+
         # Get text from command line argument or use default
         if len(sys.argv) > 1:
             text = " ".join(sys.argv[1:])  # Join all arguments as text
@@ -53,16 +228,20 @@ def main():
                 "Ready for next task!"
             ]
             text = random.choice(completion_messages)
-        
+
         print(f"🎯 Text: {text}")
         print("🔊 Speaking...")
-        
-        # Speak the text
-        engine.say(text)
-        engine.runAndWait()
-        
+
+        # Hand the text to the resident engine; start one for next time if there is none
+        if not send_to_server(text, settings):
+            spawn_server()
+
+            import pyttsx3
+            engine = pyttsx3.init()
+            speak(engine, text, settings)
+
         print("✅ Playback complete!")
-        
+
     except ImportError:
         print("❌ Error: pyttsx3 package not installed")
         print("This script uses UV to auto-install dependencies.")
@@ -72,4 +251,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
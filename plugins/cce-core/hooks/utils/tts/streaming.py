@@ -0,0 +1,142 @@
+"""
+Streaming playback for the cloud TTS scripts.
+
+Audio chunks are piped into a player process (ffplay or mpg123 reading
+stdin) as they arrive from the API, so speech starts with the first chunks
+instead of after the whole clip has been synthesized. A small jitter buffer
+(TTS_JITTER_BUFFER_MS, default 150) is filled before playback starts so a
+slow chunk does not cause a gap. Time to first audio (request to first
+bytes handed to the player) is reported and logged to logs/tts_latency.json.
+
+Without a stdin-capable player (e.g. macOS with only afplay) the scripts
+fall back to synthesizing the whole clip and playing the cached file.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_JITTER_BUFFER_MS = 150
+
+
+def jitter_buffer_ms():
+    try:
+        return max(0.0, float(os.getenv('TTS_JITTER_BUFFER_MS', DEFAULT_JITTER_BUFFER_MS)))
+    except ValueError:
+        return DEFAULT_JITTER_BUFFER_MS
+
+
+def stream_player_command():
+    """Command of an installed player that plays MP3 from stdin, or None."""
+    candidates = [
+        ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet', '-i', 'pipe:0'],
+        ['mpg123', '-q', '-'],
+    ]
+    for command in candidates:
+        if shutil.which(command[0]):
+            return command
+    return None
+
+
+class StreamPlayer:
+    """
+    Feed MP3 chunks to a player process as they arrive.
+
+    Create it right before sending the request, so time to first audio
+    includes the request itself.
+    """
+
+    def __init__(self, bitrate_kbps=128, buffer_ms=None):
+        self.command = stream_player_command()
+        buffer_ms = jitter_buffer_ms() if buffer_ms is None else buffer_ms
+        self.buffer_bytes = int(buffer_ms * bitrate_kbps / 8)
+        self.buffer = []
+        self.buffered = 0
+        self.chunks = []
+        self.process = None
+        self.started = time.monotonic()
+        self.ttfa = None
+
+    def __enter__(self):
+        return self
+
+    def _write(self, data):
+        if self.process is None:
+            self.process = subprocess.Popen(
+                self.command, stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            self.ttfa = time.monotonic() - self.started
+        try:
+            self.process.stdin.write(data)
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            pass
+
+    def feed(self, chunk):
+        """Hand a chunk to the player once the jitter buffer is full."""
+        if not chunk:
+            return
+        self.chunks.append(chunk)
+        if self.process is None and self.buffered + len(chunk) < self.buffer_bytes:
+            self.buffer.append(chunk)
+            self.buffered += len(chunk)
+            return
+        if self.buffer:
+            chunk = b''.join(self.buffer) + chunk
+            self.buffer, self.buffered = [], 0
+        self._write(chunk)
+
+    def audio(self):
+        """Everything received so far (for the audio cache)."""
+        return b''.join(self.chunks)
+
+    def __exit__(self, *exc):
+        # Short clips may never fill the buffer
+        if self.buffer:
+            self._write(b''.join(self.buffer))
+            self.buffer = []
+        if self.process is not None:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def report_ttfa(engine, ttfa, text):
+    """Print the time to first audio and append it to logs/tts_latency.json."""
+    if ttfa is None:
+        return
+    print(f"⏱️  Time to first audio: {ttfa * 1000:.0f} ms")
+    try:
+        log_dir = Path('logs')
+        log_dir.mkdir(exist_ok=True)
+        log_file = log_dir / 'tts_latency.json'
+        try:
+            with open(log_file, 'r') as f:
+                log_data = json.load(f)
+                if not isinstance(log_data, list):
+                    log_data = []
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            log_data = []
+
+        log_data.append({
+            'engine': engine,
+            'ttfa_ms': round(ttfa * 1000, 1),
+            'buffer_ms': jitter_buffer_ms(),
+            'chars': len(text),
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        })
+        with open(log_file, 'w') as f:
+            json.dump(log_data, f, indent=2)
+    except OSError as e:
+        print(f"Warning: Failed to log TTS latency: {e}", file=sys.stderr)